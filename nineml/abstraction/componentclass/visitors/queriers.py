@@ -6,13 +6,29 @@ from sympy.logic.boolalg import BooleanTrue, BooleanFalse
 from sympy.functions.elementary.piecewise import ExprCondPair
 from ...expressions import reserved_identifiers
 from nineml.visitors import BaseVisitor, BaseVisitorWithContext
-from nineml.units import Dimension
+from nineml.units import Dimension, cache_dimensions
 from nineml.abstraction.ports import SendPortBase
 from nineml.abstraction.expressions import Expression
 from nineml.exceptions import NineMLNameError
 import operator
 from functools import reduce
 
+# Dimensions inferred for expressions, keyed on the expression and the
+# dimensions of its free symbols so that they can be shared between
+# structurally identical component classes (e.g. clones). Dimensions inferred
+# by DimensionalityComponentValidator have been checked for consistency and
+# so can also be used by the ComponentDimensionResolver but not vice-versa.
+validated_dimensions_cache = {}
+inferred_dimensions_cache = {}
+
+
+def dimensions_cache_key(expr, symbol_dims):
+    """
+    Returns a key for the dimensions caches from an expression and a
+    dictionary of the (already resolved) dimensions of its free symbols
+    """
+    return (expr, frozenset(symbol_dims.items()))
+
 
 class ComponentClassInterfaceInferer(BaseVisitor):
 
@@ -227,10 +243,24 @@ class ComponentDimensionResolver(BaseVisitorWithContext):
             flattened = self._dims[sym]
         except KeyError:
             element = self.find_element(sym)
-            flattened = self._flatten(element.rhs)
+            flattened = self._flatten_cached(element.rhs)
             self._dims[sym] = flattened
         return flattened
 
+    def _flatten_cached(self, expr):
+        expr = sympify(expr)
+        key = dimensions_cache_key(
+            expr, dict((s, self._flatten(s)) for s in expr.free_symbols))
+        try:
+            flattened = validated_dimensions_cache[key]
+        except KeyError:
+            try:
+                flattened = inferred_dimensions_cache[key]
+            except KeyError:
+                flattened = self._flatten(expr)
+                cache_dimensions(inferred_dimensions_cache, key, flattened)
+        return flattened
+
     def _flatten_boolean(self, expr, **kwargs):  # @UnusedVariable
         return 0
 
@@ -16,6 +16,8 @@ from nineml.base import SendPortBase
 from sympy.logic.boolalg import BooleanTrue, BooleanFalse
 from nineml.visitors import BaseVisitor, BaseVisitorWithContext
 from functools import reduce
+from ..queriers import (
+    validated_dimensions_cache, dimensions_cache_key, cache_dimensions)
 
 
 class AliasesAreNotRecursiveComponentValidator(BaseVisitor):
@@ -137,8 +139,9 @@ class CheckNoLHSAssignmentsToMathsNamespaceComponentValidator(
         assert isinstance(symbol, basestring)
 
         if not is_valid_lhs_target(symbol):
-            err = 'Symbol: %s found on left-hand-side of an equation'
-            raise NineMLUsageError(err)
+            raise NineMLUsageError(
+                "Symbol: {} found on left-hand-side of an equation"
+                .format(symbol))
 
     def action_parameter(self, parameter, **kwargs):  # @UnusedVariable
         self.check_lhssymbol_is_valid(parameter.name)
@@ -157,6 +160,10 @@ class DimensionalityComponentValidator(BaseVisitorWithContext):
 
     _RECURSION_MAX = 450
 
+    # The dimensions of the free symbols of the expression being flattened,
+    # which have already been resolved to look up the dimensions cache
+    _symbol_dims = {}
+
     class DeclaredDimensionsVisitor(BaseVisitor):
         """
         Inserts declared dimensions into dimensionality dictionary
@@ -231,17 +238,42 @@ class DimensionalityComponentValidator(BaseVisitorWithContext):
                                     self.as_class.nineml_children)))
                     ))
             self._recursion_count += 1
-            dims = self._flatten_dims(expr, element)
+            dims = self._flatten_dims_cached(expr, element)
             self._dimensions[element.id] = dims
         return dims
 
+    def _flatten_dims_cached(self, expr, element):
+        """
+        Looks up the dimensions of the expression in the cache shared between
+        component classes before checking and inferring them
+        """
+        if not isinstance(expr, sympy.Basic):
+            return self._flatten_dims(expr, element)
+        symbol_dims = dict((s, self._get_dimensions(s))
+                           for s in expr.free_symbols)
+        key = dimensions_cache_key(expr, symbol_dims)
+        try:
+            dims = validated_dimensions_cache[key]
+        except KeyError:
+            outer_symbol_dims, self._symbol_dims = (self._symbol_dims,
+                                                    symbol_dims)
+            try:
+                dims = self._flatten_dims(expr, element)
+            finally:
+                self._symbol_dims = outer_symbol_dims
+            cache_dimensions(validated_dimensions_cache, key, dims)
+        return dims
+
     def _flatten_dims(self, expr, element):
         if isinstance(expr, (sympy.Integer, sympy.Float, int, float)):
             dims = 1
         elif isinstance(expr, (BooleanTrue, BooleanFalse)):
             dims = 0
         elif isinstance(expr, sympy.Symbol):
-            dims = self._get_dimensions(expr)
+            try:
+                dims = self._symbol_dims[expr]
+            except KeyError:
+                dims = self._get_dimensions(expr)
         elif isinstance(expr, sympy.Mul):
             dims = reduce(operator.mul,
                           (self._flatten_dims(a, element) for a in expr.args))
@@ -257,6 +257,14 @@ class Dynamics(ComponentClass, DynamicPortsObject):
         """
         return DynamicsIsLinear().is_linear(self, outputs=outputs)
 
+    def transition_table(self):
+        """
+        Returns the transitions between the regimes of the Dynamics class
+        compiled into a DynamicsTransitionTable, in which the regimes are
+        identified by integer IDs
+        """
+        return DynamicsTransitionTable(self)
+
     def is_flat(self):
         return True
 
@@ -537,6 +545,7 @@ from .visitors.queriers import (DynamicsRequiredDefinitions,  # @IgnorePep8
                                 DynamicsDimensionResolver,
                                 DynamicsHasRandomProcess,
                                 DynamicsIsLinear,
-                                DynamicsInterfaceInferer)
+                                DynamicsInterfaceInferer,
+                                DynamicsTransitionTable)
 from .visitors.modifiers import (  # @IgnorePep8
     DynamicsRenameSymbol, DynamicsSubstituteAliases)
@@ -1,11 +1,13 @@
+from builtins import object
 from itertools import chain
+import numpy
 import sympy
 from ...componentclass.visitors.queriers import (
     ComponentClassInterfaceInferer,
     ComponentRequiredDefinitions, ComponentExpressionExtractor,
     ComponentDimensionResolver)
 from .base import BaseDynamicsVisitor
-from nineml.exceptions import NineMLStopVisitException
+from nineml.exceptions import NineMLStopVisitException, NineMLNameError
 from sympy.polys.polyerrors import PolynomialError
 
 
@@ -186,4 +188,102 @@ class DynamicsIsLinear(BaseDynamicsVisitor):
         pass
 
 
+class DynamicsTransitionTable(object):
+    """
+    The transitions of a Dynamics class compiled into arrays indexed by
+    integer regime IDs (the positions of the regimes in sorted order), so
+    the transition out of a regime can be looked up without iterating
+    through the regimes and transitions. For MultiDynamics objects the
+    multi-regimes are only combined once, when the table is built.
+
+    Parameters
+    ----------
+    dynamics : Dynamics
+        The dynamics class to tabulate the transitions of
+
+    Attributes
+    ----------
+    regime_names : tuple(str)
+        The names of the regimes in the order of their IDs
+    on_events : dict(str, list(OnEvent | None))
+        The OnEvent transition (or None) of each regime for each event
+        receive port
+    event_targets : dict(str, numpy.ndarray(int))
+        The target regime ID (or -1 if the event isn't handled) of each
+        regime for each event receive port
+    on_conditions : list(OnCondition)
+        The OnConditions of all regimes, ordered by their source regime
+        and then by their order within the regime
+    condition_sources : numpy.ndarray(int)
+        The source regime ID of each OnCondition
+    condition_targets : numpy.ndarray(int)
+        The target regime ID of each OnCondition
+    condition_offsets : numpy.ndarray(int)
+        The offsets of the OnConditions of each regime in ``on_conditions``,
+        i.e. the OnConditions of regime i are ``on_conditions[
+        condition_offsets[i]:condition_offsets[i + 1]]``
+    """
+
+    def __init__(self, dynamics):
+        self.dynamics = dynamics
+        regimes = sorted(dynamics.regimes, key=lambda r: r.name)
+        self.regime_names = tuple(r.name for r in regimes)
+        self._regime_index = dict(
+            (n, i) for i, n in enumerate(self.regime_names))
+        num_regimes = len(regimes)
+        self.on_events = dict((p, [None] * num_regimes)
+                              for p in dynamics.event_receive_port_names)
+        self.on_conditions = []
+        self.condition_offsets = numpy.zeros(num_regimes + 1, dtype=int)
+        condition_sources = []
+        condition_targets = []
+        for index, regime in enumerate(regimes):
+            for on_event in regime.on_events:
+                self.on_events.setdefault(
+                    on_event.src_port_name,
+                    [None] * num_regimes)[index] = on_event
+            for on_condition in regime.on_conditions:
+                self.on_conditions.append(on_condition)
+                condition_sources.append(index)
+                condition_targets.append(self.regime_index(
+                    on_condition.target_regime_name))
+            self.condition_offsets[index + 1] = len(self.on_conditions)
+        self.condition_sources = numpy.array(condition_sources, dtype=int)
+        self.condition_targets = numpy.array(condition_targets, dtype=int)
+        self.event_targets = dict(
+            (port_name, numpy.array(
+                [self.regime_index(oe.target_regime_name)
+                 if oe is not None else -1 for oe in on_events], dtype=int))
+            for port_name, on_events in self.on_events.items())
+
+    @property
+    def num_regimes(self):
+        return len(self.regime_names)
+
+    def regime_index(self, name):
+        try:
+            return self._regime_index[name]
+        except KeyError:
+            raise NineMLNameError(
+                "No regime named '{}' in '{}' (available '{}')".format(
+                    name, self.dynamics.name, "', '".join(self.regime_names)))
+
+    def on_event(self, port_name, regime_index):
+        """
+        Returns the OnEvent triggered by the event receive port in the regime
+        (or None if the event isn't handled in that regime)
+        """
+        try:
+            return self.on_events[port_name][regime_index]
+        except KeyError:
+            raise NineMLNameError(
+                "No event receive port named '{}' in '{}'".format(
+                    port_name, self.dynamics.name))
+
+    def regime_on_conditions(self, regime_index):
+        "The OnConditions of the regime"
+        return self.on_conditions[self.condition_offsets[regime_index]:
+                                  self.condition_offsets[regime_index + 1]]
+
+
 from .modifiers import DynamicsSubstituteAliases  # @IgnorePep8
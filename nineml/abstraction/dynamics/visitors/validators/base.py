@@ -24,6 +24,7 @@ from .ports import (
     EventPortsDynamicsValidator, OutputAnalogPortsDynamicsValidator)
 from .types import (
     TypesDynamicsValidator)
+from .fused import FusedDynamicsValidator
 
 
 class DynamicsValidator(object):
@@ -37,6 +38,21 @@ class DynamicsValidator(object):
         Tests a componentclassclass against a variety of tests, to verify its
         internal structure
         """
+        # Check class structure (types, names, ports, symbols and the
+        # regime graph) in a single traversal
+        NoDuplicatedObjectsValidator(component_class, **kwargs)
+        FusedDynamicsValidator(component_class, **kwargs)
+        if validate_dimensions:
+            DimensionalityDynamicsValidator(component_class, **kwargs)
+
+    @classmethod
+    def validate_componentclass_by_parts(cls, component_class,
+                                         validate_dimensions=True, **kwargs):
+        """
+        Runs each of the structural tests as a separate visitor. Equivalent
+        to ``validate_componentclass`` but slower, retained for debugging
+        individual checks
+        """
         # Check class structure:
         TypesDynamicsValidator(component_class, **kwargs)
         NoDuplicatedObjectsValidator(component_class, **kwargs)
@@ -0,0 +1,354 @@
+"""
+Single-pass validation of Dynamics component classes.
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from past.builtins import basestring
+from collections import defaultdict, OrderedDict
+from nineml.exceptions import NineMLUsageError, NineMLNameError
+from nineml.visitors import BaseVisitorWithContext
+from nineml.utils import assert_no_duplicates
+from nineml.units import Dimension, Unit
+from nineml.abstraction.expressions import (
+    Alias, Constant, reserved_identifiers)
+from nineml.abstraction.expressions.utils import is_valid_lhs_target
+from ....componentclass.base import Parameter
+from ....ports import (AnalogSendPort, AnalogReceivePort, AnalogReducePort,
+                       EventSendPort, EventReceivePort)
+from ...base import Dynamics
+from ...regimes import Regime, StateVariable, TimeDerivative
+from ...transitions import (OutputEvent, StateAssignment, Trigger,
+                            OnCondition, OnEvent)
+
+
+class FusedDynamicsValidator(BaseVisitorWithContext):
+    """
+    Performs the structural checks of the separate Dynamics validators
+    (types, names, ports, state variables, aliases, unresolved symbols,
+    regime graph, event handlers and LHS symbols) in a single traversal of
+    the component class.
+
+    The symbol tables required by each check are collected into sets and
+    dicts during the traversal and the checks are then evaluated against
+    them. Errors found during the traversal are deferred so that the error
+    raised is the same one the separate validators raise when run in the
+    order of ``DynamicsValidator.validate_componentclass``.
+    """
+
+    as_class = Dynamics
+
+    # Checks in the order the separate validators are run
+    CHECKS = ('duplicate_regime_names', 'local_name_conflicts',
+              'dimension_name_conflicts', 'event_ports',
+              'output_analog_ports', 'time_derivatives_are_declared',
+              'state_assignments_are_on_state_variables',
+              'aliases_are_not_recursive', 'no_unresolved_symbols',
+              'regime_graph', 'one_handler_per_event',
+              'no_lhs_assignments_to_maths_namespace')
+
+    def __init__(self, component_class, **kwargs):  # @UnusedVariable
+        BaseVisitorWithContext.__init__(self)
+        self.component_class = component_class
+        self.errors = {}
+        # Symbol tables
+        self.lower_symbols = set()
+        self.dimensions = {}
+        self.state_variables = set()
+        self.top_aliases = OrderedDict()
+        self.analog_inputs = set()
+        self.parameters = set()
+        self.constants = set()
+        self.event_send_ports = OrderedDict()
+        self.event_receive_ports = OrderedDict()
+        self.analog_send_ports = []
+        self.output_events = []
+        self.input_events = []
+        self.output_symbols = []
+        self.time_derivatives = []
+        self.state_assignments = []
+        self.regimes = OrderedDict()
+        self.transitions = []
+        self.visit(component_class)
+        for check in self.CHECKS:
+            if check in self.errors:
+                raise self.errors[check]
+            try:
+                check_method = getattr(self, '_check_' + check)
+            except AttributeError:
+                continue  # Check is fully evaluated during the traversal
+            check_method()
+
+    def record_error(self, check, error):
+        """Keeps the first error found by each check during the traversal"""
+        if check not in self.errors:
+            self.errors[check] = error
+
+    @property
+    def is_top_level(self):
+        return self.context.parent is self.component_class
+
+    def check_conflicting_symbol(self, symbol):
+        symbol = symbol.lower()
+        if symbol in self.lower_symbols:
+            self.record_error('local_name_conflicts', NineMLUsageError(
+                "Found duplication of '{}' symbol in {} "
+                "(Note that symbols must be case-insensitively unique despite "
+                "being case-sensitive in general)"
+                .format(symbol, self.component_class)))
+        self.lower_symbols.add(symbol)
+
+    def check_conflicting_dimension(self, dimension):
+        try:
+            if dimension != self.dimensions[dimension.name]:
+                self.record_error('dimension_name_conflicts', NineMLUsageError(
+                    "Duplication of dimension name '{}' for differing "
+                    "dimensions ('{}', '{}')"
+                    .format(dimension.name, dimension,
+                            self.dimensions[dimension.name])))
+        except KeyError:
+            self.dimensions[dimension.name] = dimension
+
+    def check_lhssymbol_is_valid(self, symbol):
+        if not isinstance(symbol, basestring):
+            self.record_error('no_lhs_assignments_to_maths_namespace',
+                              AssertionError())
+        elif not is_valid_lhs_target(symbol):
+            self.record_error(
+                'no_lhs_assignments_to_maths_namespace', NineMLUsageError(
+                    "Symbol: {} found on left-hand-side of an equation"
+                    .format(symbol)))
+
+    def action_dynamics(self, component_class, **kwargs):  # @UnusedVariable
+        assert isinstance(component_class, Dynamics)
+        try:
+            assert_no_duplicates(r.name for r in component_class.regimes)
+        except NineMLUsageError as e:
+            self.record_error('duplicate_regime_names', e)
+
+    def action_parameter(self, parameter, **kwargs):  # @UnusedVariable
+        assert isinstance(parameter, Parameter), \
+            "{} != {}".format(type(parameter), Parameter)
+        self.check_conflicting_symbol(parameter.name)
+        self.check_conflicting_dimension(parameter.dimension)
+        self.parameters.add(parameter.name)
+        self.check_lhssymbol_is_valid(parameter.name)
+
+    def action_alias(self, alias, **kwargs):  # @UnusedVariable
+        assert isinstance(alias, Alias)
+        if self.is_top_level:
+            self.top_aliases[alias.lhs] = alias
+            self.output_symbols.append(alias.lhs)
+            self.check_conflicting_symbol(alias.lhs)
+        else:
+            # Aliases in regime scopes are only checked for conflicts if they
+            # are equal to an alias in the outer scope
+            try:
+                outer = self.component_class.alias(alias.lhs)
+            except NineMLNameError:
+                outer = None
+            if outer is not None and outer == alias:
+                self.check_conflicting_symbol(alias.lhs)
+        self.check_lhssymbol_is_valid(alias.lhs)
+
+    def action_constant(self, constant, **kwargs):  # @UnusedVariable
+        assert isinstance(constant, Constant)
+        self.check_conflicting_symbol(constant.name)
+        self.check_conflicting_dimension(constant.units.dimension)
+        self.constants.add(constant.name)
+        self.check_lhssymbol_is_valid(constant.name)
+
+    def action_dimension(self, dimension, **kwargs):  # @UnusedVariable
+        assert isinstance(dimension, Dimension)
+
+    def action_unit(self, unit, **kwargs):  # @UnusedVariable
+        assert isinstance(unit, Unit)
+
+    def action_regime(self, regime, **kwargs):  # @UnusedVariable
+        assert isinstance(regime, Regime)
+        self.regimes[regime.id] = regime
+        try:
+            assert_no_duplicates(oe.src_port_name for oe in regime.on_events)
+        except NineMLUsageError as e:
+            self.record_error('one_handler_per_event', e)
+
+    def action_statevariable(self, state_variable, **kwargs):  # @UnusedVariable @IgnorePep8
+        assert isinstance(state_variable, StateVariable)
+        self.check_conflicting_symbol(state_variable.name)
+        self.check_conflicting_dimension(state_variable.dimension)
+        self.state_variables.add(state_variable.name)
+        self.output_symbols.append(state_variable.name)
+        self.check_lhssymbol_is_valid(state_variable.name)
+
+    def action_analogsendport(self, port, **kwargs):  # @UnusedVariable
+        assert isinstance(port, AnalogSendPort)
+        self.check_conflicting_dimension(port.dimension)
+        self.analog_send_ports.append(port.name)
+
+    def action_analogreceiveport(self, port, **kwargs):  # @UnusedVariable
+        assert isinstance(port, AnalogReceivePort)
+        self.check_conflicting_symbol(port.name)
+        self.check_conflicting_dimension(port.dimension)
+        self.analog_inputs.add(port.name)
+
+    def action_analogreduceport(self, port, **kwargs):  # @UnusedVariable
+        assert isinstance(port, AnalogReducePort)
+        self.check_conflicting_symbol(port.name)
+        self.check_conflicting_dimension(port.dimension)
+        self.analog_inputs.add(port.name)
+
+    def action_eventsendport(self, port, **kwargs):  # @UnusedVariable
+        assert isinstance(port, EventSendPort)
+        self.event_send_ports[port.name] = port
+
+    def action_eventreceiveport(self, port, **kwargs):  # @UnusedVariable
+        assert isinstance(port, EventReceivePort)
+        self.check_conflicting_symbol(port.name)
+        self.event_receive_ports[port.name] = port
+
+    def action_outputevent(self, event_out, **kwargs):  # @UnusedVariable
+        assert isinstance(event_out, OutputEvent)
+        self.output_events.append(event_out.port_name)
+
+    def action_stateassignment(self, assignment, **kwargs):  # @UnusedVariable
+        assert isinstance(assignment, StateAssignment)
+        self.state_assignments.append(assignment)
+        self.check_lhssymbol_is_valid(assignment.lhs)
+
+    def action_timederivative(self, time_derivative, **kwargs):  # @UnusedVariable @IgnorePep8
+        assert isinstance(time_derivative, TimeDerivative)
+        self.time_derivatives.append(time_derivative)
+        self.check_lhssymbol_is_valid(time_derivative.variable)
+
+    def action_trigger(self, trigger, **kwargs):  # @UnusedVariable
+        assert isinstance(trigger, Trigger)
+
+    def action_oncondition(self, on_condition, **kwargs):  # @UnusedVariable
+        assert isinstance(on_condition, OnCondition)
+        self.transitions.append((self.context.parent, on_condition))
+
+    def action_onevent(self, on_event, **kwargs):  # @UnusedVariable
+        assert isinstance(on_event, OnEvent)
+        self.input_events.append(on_event.src_port_name)
+        self.transitions.append((self.context.parent, on_event))
+
+    def _check_event_ports(self):
+        for output_event in self.output_events:
+            if output_event not in self.event_send_ports:
+                raise NineMLUsageError(
+                    "Can't find port definition matching OutputEvent: {}"
+                    .format(output_event))
+        for input_event in self.input_events:
+            if input_event not in self.event_receive_ports:
+                raise NineMLUsageError(
+                    "Can't find port definition matching input event: {}"
+                    .format(input_event))
+        output_events = set(self.output_events)
+        for port_name in self.event_send_ports:
+            if port_name not in output_events:
+                raise NineMLUsageError(
+                    "Unable to find events generated for '{}' in '{}'"
+                    .format(port_name, self.component_class.name))
+        input_events = set(self.input_events)
+        for port_name in self.event_receive_ports:
+            if port_name not in input_events:
+                raise NineMLUsageError(
+                    "Unable to find event transitions triggered by '{}' in "
+                    "'{}'".format(port_name, self.component_class.name))
+
+    def _check_output_analog_ports(self):
+        output_symbols = set(self.output_symbols)
+        for port_name in self.analog_send_ports:
+            if port_name not in output_symbols:
+                raise NineMLUsageError(
+                    "Unable to find an Alias or State variable for "
+                    "analog-port '{}' (available '{}')"
+                    .format(port_name, "', '".join(self.output_symbols)))
+
+    def _check_time_derivatives_are_declared(self):
+        for td in self.time_derivatives:
+            if td.variable not in self.state_variables:
+                raise NineMLUsageError(
+                    "StateVariable '{}' not declared".format(td.variable))
+
+    def _check_state_assignments_are_on_state_variables(self):
+        for sa in self.state_assignments:
+            if sa.lhs not in self.state_variables:
+                raise NineMLUsageError(
+                    "Not Assigning to state-variable: {}".format(sa.lhs))
+
+    def _check_aliases_are_not_recursive(self):
+        # Resolve aliases in dependency order, counting the number of
+        # unresolved aliases each alias refers to
+        dependents = defaultdict(list)
+        num_unresolved = {}
+        resolved = []
+        for lhs, alias in self.top_aliases.items():
+            deps = set(s for s in alias.rhs_symbol_names
+                       if s in self.top_aliases)
+            for dep in deps:
+                dependents[dep].append(lhs)
+            num_unresolved[lhs] = len(deps)
+            if not deps:
+                resolved.append(lhs)
+        while resolved:
+            lhs = resolved.pop()
+            del num_unresolved[lhs]
+            for dependent in dependents[lhs]:
+                num_unresolved[dependent] -= 1
+                if not num_unresolved[dependent]:
+                    resolved.append(dependent)
+        if num_unresolved:
+            raise NineMLUsageError(
+                "Unable to resolve all aliases, you may have a recursion "
+                "issue. Remaining Aliases: {}".format(
+                    ','.join(a for a in self.top_aliases
+                             if a in num_unresolved)))
+
+    def _check_no_unresolved_symbols(self):
+        available = self.analog_inputs.union(
+            self.state_variables, self.top_aliases, self.parameters,
+            self.constants, reserved_identifiers)
+        for alias in self.top_aliases.values():
+            for rhs_atom in alias.rhs_symbol_names:
+                if rhs_atom not in available:
+                    raise NineMLUsageError(
+                        "Unresolved Symbol in Alias: {} [{}]"
+                        .format(rhs_atom, alias))
+        for timederivative in self.time_derivatives:
+            for rhs_atom in timederivative.rhs_symbol_names:
+                if rhs_atom not in available:
+                    raise NineMLUsageError(
+                        "Unresolved Symbol in Time Derivative: {} [{}]"
+                        .format(rhs_atom, timederivative))
+        for state_assignment in self.state_assignments:
+            for rhs_atom in state_assignment.rhs_symbol_names:
+                if rhs_atom not in available:
+                    raise NineMLUsageError(
+                        'Unresolved Symbol in Assignment: {} [{}]'
+                        .format(rhs_atom, state_assignment))
+
+    def _check_regime_graph(self):
+        if not self.regimes:
+            return
+        connected_regimes = defaultdict(set)
+        for regime, transition in self.transitions:
+            target_id = transition.target_regime.id
+            connected_regimes[regime.id].add(target_id)
+            connected_regimes[target_id].add(regime.id)
+        first_id = next(iter(self.regimes))
+        connected = set([first_id])
+        stack = [first_id]
+        while stack:
+            for id_ in connected_regimes[stack.pop()]:
+                if id_ not in connected:
+                    connected.add(id_)
+                    stack.append(id_)
+        if len(connected) < len(self.regimes):
+            raise NineMLUsageError(
+                "Transition graph of {} contains islands: {} regimes "
+                "('{}') and {} connected ('{}')".format(
+                    self.component_class, len(self.regimes),
+                    "', '".join(r.name for r in self.regimes.values()),
+                    len(connected),
+                    "', '".join(self.regimes[i].name for i in connected)))
@@ -122,13 +122,13 @@ class RegimeGraphDynamicsValidator(BaseDynamicsVisitor):
                 # FIXME: This should probably be a warning not an error
                 raise NineMLUsageError(
                     "Transition graph of {} contains islands: {} regimes "
-                    "('{}') and {} connected ('{}'):\n\n{}".format(
+                    "('{}') and {} connected ('{}')".format(
                         component_class,
                         len(self.regimes),
-                        "', '".join(r.name for r in self.regimes),
+                        "', '".join(r.name for r in self.regimes.values()),
                         len(self.connected),
-                        "', '".join(r.name for r in self.connected),
-                        self.connected_regimes_from_regime))
+                        "', '".join(self.regimes[i].name
+                                    for i in self.connected)))
             elif len(self.connected) > len(self.regimes):
                 assert False
 
@@ -208,7 +208,7 @@ class DimensionalityDynamicsValidator(DimensionalityComponentValidator,
         self._check_send_port(port)
 
     def action_trigger(self, trigger, **kwargs):  # @UnusedVariable
-        self._flatten_dims(trigger.rhs, trigger)
+        self._flatten_dims_cached(trigger.rhs, trigger)
 
     def default_action(self, obj, nineml_cls, **kwargs):
         pass
@@ -47,6 +47,12 @@ class BaseVisitor(with_metaclass(ABCMeta, object)):
     # stage.
     supports_bodies = False
 
+    # A flag to determine whether the serialization form can store numeric
+    # arrays in bulk (see set_array and get_array), which is only true of
+    # HDF5 amongst the supported formats at this stage (and only when its
+    # serializer is created with array_datasets=True).
+    supports_arrays = False
+
     def __init__(self, version, document):
         self._version = self.standardize_version(version)
         self._document = document
@@ -280,6 +286,26 @@ class BaseSerializer(with_metaclass(ABCMeta, BaseVisitor)):
             Serialization format-specific options for the method
         """
 
+    def set_array(self, serial_elem, name, values, **options):  # @UnusedVariable @IgnorePep8
+        """
+        Stores a numeric array in a serial element in bulk. Only needs to be
+        implemented by serializers that set ``supports_arrays``
+
+        Parameters
+        ----------
+        serial_elem : <serial-element>
+            The serial element (dependent on the serialization type)
+        name : str
+            The name of the array
+        values : numpy.ndarray
+            The array to store
+        options : dict(str, object)
+            Serialization format-specific options for the method
+        """
+        raise NotImplementedError(
+            "'{}' doesn't support storing arrays in bulk"
+            .format(type(self).__name__))
+
     @abstractmethod
     def set_body(self, serial_elem, value, **options):
         """
@@ -664,6 +690,30 @@ class BaseUnserializer(with_metaclass(ABCMeta, BaseVisitor)):
             The attribute named
         """
 
+    def get_array(self, serial_elem, name, **options):  # @UnusedVariable
+        """
+        Extracts a numeric array stored in bulk in the serial element. Only
+        needs to be implemented by unserializers that set
+        ``supports_arrays``
+
+        Parameters
+        ----------
+        serial_elem : <serial-element>
+            A serial element
+        name : str
+            The name of the array
+        options : dict(str, object)
+            Serialization format-specific options for the method
+
+        Returns
+        -------
+        array : numpy.ndarray | None
+            The array named, or None if the element doesn't contain it
+        """
+        raise NotImplementedError(
+            "'{}' doesn't support reading arrays in bulk"
+            .format(type(self).__name__))
+
     @abstractmethod
     def get_body(self, serial_elem, **options):
         """
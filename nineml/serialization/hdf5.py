@@ -17,9 +17,20 @@ from nineml.utils import is_file_handle
 class HDF5Serializer(BaseSerializer):
     """
     A Serializer class that serializes to the HDF5 format
+
+    Parameters
+    ----------
+    fname : str | file
+        The file to write to
+    array_datasets : bool
+        Whether array values are written in bulk as datasets instead of a
+        group for each row. Files written with datasets can't be read by
+        versions of the library that predate them or by other 9ML tools
+        that only read rows, so rows are written by default
     """
 
-    def __init__(self, fname, **kwargs):  # @UnusedVariable @IgnorePep8 @ReservedAssignment
+    def __init__(self, fname, array_datasets=False, **kwargs):  # @UnusedVariable @IgnorePep8 @ReservedAssignment
+        self.supports_arrays = array_datasets
         if is_file_handle(fname):
             # Close the file and reopen with the h5py File object
             file_ = fname
@@ -56,6 +67,9 @@ class HDF5Serializer(BaseSerializer):
     def set_attr(self, serial_elem, name, value, **options):  # @UnusedVariable
         serial_elem.attrs[name] = value
 
+    def set_array(self, serial_elem, name, values, **options):  # @UnusedVariable @IgnorePep8
+        serial_elem.create_dataset(name, data=values)
+
     def set_body(self, serial_elem, value, **options):  # @UnusedVariable @IgnorePep8
         self.set_attr(serial_elem, self.BODY_ATTR, value, **options)
 
@@ -79,6 +93,10 @@ class HDF5Unserializer(BaseUnserializer):
     A Unserializer class unserializes the HDF5 format.
     """
 
+    # Array values written as datasets are read in bulk, and those written
+    # as rows are read as before
+    supports_arrays = True
+
     def get_child(self, parent, nineml_type, **options):  # @UnusedVariable
         try:
             elem = parent[nineml_type]
@@ -103,11 +121,23 @@ class HDF5Unserializer(BaseUnserializer):
         return iter(children.values())
 
     def get_all_children(self, parent, **options):  # @UnusedVariable
+        # Datasets hold arrays (see get_array) rather than child elements
+        groups = [(n, e) for n, e in parent.items()
+                  if not isinstance(e, h5py.Dataset)]
         return chain(
-            ((n, e) for n, e in parent.items() if not e.attrs[self.MULT_ATTR]),
-            *(zip(repeat(n), iter(e.values())) for n, e in parent.items()
+            ((n, e) for n, e in groups if not e.attrs[self.MULT_ATTR]),
+            *(zip(repeat(n), iter(e.values())) for n, e in groups
               if e.attrs[self.MULT_ATTR]))
 
+    def get_array(self, serial_elem, name, **options):  # @UnusedVariable
+        try:
+            dataset = serial_elem[name]
+        except KeyError:
+            return None
+        if not isinstance(dataset, h5py.Dataset):
+            return None
+        return dataset[()]
+
     def get_attr(self, serial_elem, name, **options):  # @UnusedVariable
         return serial_elem.attrs[name]
 
@@ -0,0 +1,13 @@
+"""
+Reference simulation engines for 9ML models, implemented with NumPy. They
+are intended for checking the behaviour of model descriptions rather than as
+replacements for dedicated simulators. All values are in SI units.
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from .utils import SI_value, SI_time  # @IgnorePep8
+from .linear import LinearDynamicsIntegrator, matrix_exponential  # @IgnorePep8
+from .dynamics import DynamicsSimulator  # @IgnorePep8
+from .events import EventDelivery, EventRingBuffer  # @IgnorePep8
+from .reduce import AnalogReduction, compile_analog_reductions  # @IgnorePep8
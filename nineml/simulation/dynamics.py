@@ -0,0 +1,502 @@
+"""
+A vectorized reference simulator for populations of 9ML Dynamics
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from __future__ import division
+from builtins import object
+from collections import defaultdict
+import weakref
+import numpy
+import sympy
+from nineml.units import Quantity
+from nineml.exceptions import NineMLUsageError, NineMLNameError
+from .utils import SI_value, SI_time, IdentityCache
+
+
+class CompiledDynamics(object):
+    """
+    The expressions of a Dynamics class (with aliases substituted) compiled
+    into vectorized NumPy functions of time, the state variables, the analog
+    inputs and the parameters (in that order), along with the regime
+    structure indexed by integers (from the transition table of the class).
+
+    Parameters
+    ----------
+    component_class : Dynamics
+        The Dynamics class to compile
+    """
+
+    def __init__(self, component_class):
+        # Only a proxy to the class is held so that the cache entry (keyed
+        # on a weak reference to the class) doesn't keep the class alive
+        self.component_class = weakref.proxy(component_class)
+        substituted = component_class.substitute_aliases()
+        self.state_variable_names = tuple(
+            sorted(component_class.state_variable_names))
+        self.input_names = tuple(sorted(
+            list(component_class.analog_receive_port_names) +
+            list(component_class.analog_reduce_port_names)))
+        self.parameter_names = tuple(sorted(component_class.parameter_names))
+        self.transition_table = substituted.transition_table()
+        self.regime_names = self.transition_table.regime_names
+        self.event_send_port_names = tuple(
+            sorted(component_class.event_send_port_names))
+        self._state_index = dict(
+            (n, i) for i, n in enumerate(self.state_variable_names))
+        self._args = [sympy.Symbol('t')] + [
+            sympy.Symbol(n) for n in (self.state_variable_names +
+                                      self.input_names +
+                                      self.parameter_names)]
+        self._constants = dict(
+            (sympy.Symbol(c.name), SI_value(Quantity(c.value, c.units)))
+            for c in substituted.constants)
+        self.time_derivatives = []
+        self.on_conditions = []
+        for index, regime_name in enumerate(self.regime_names):
+            regime = substituted.regime(regime_name)
+            tds = sorted(regime.time_derivatives, key=lambda td: td.variable)
+            self.time_derivatives.append((
+                numpy.array([self._state_index[td.variable] for td in tds],
+                            dtype=int),
+                self._lambdify([td.rhs for td in tds], tds)))
+            self.on_conditions.append([
+                (self._lambdify(oc.trigger.rhs, [oc.trigger]),
+                 self._compile_transition(oc))
+                for oc in self.transition_table.regime_on_conditions(index)])
+        # The compiled OnEvent transition (or None) of each regime for each
+        # event receive port
+        self.on_events = dict(
+            (port_name, [self._compile_transition(oe) if oe is not None
+                         else None for oe in on_events])
+            for port_name, on_events in
+            self.transition_table.on_events.items())
+        self._analog_send_port_funcs = {}
+        self._substituted = substituted
+
+    def regime_index(self, name):
+        return self.transition_table.regime_index(name)
+
+    def state_index(self, name):
+        try:
+            return self._state_index[name]
+        except KeyError:
+            raise NineMLNameError(
+                "No state variable named '{}' in '{}' (available '{}')".format(
+                    name, self.component_class.name,
+                    "', '".join(self.state_variable_names)))
+
+    def analog_send_port_func(self, name):
+        """
+        Returns a function that evaluates the value of the analog send port
+        (if it is mapped to an alias) or None if it is mapped to a state
+        variable
+        """
+        try:
+            return self._analog_send_port_funcs[name]
+        except KeyError:
+            pass
+        port = self.component_class.analog_send_port(name)
+        if port.name in self._state_index:
+            func = None
+        else:
+            alias = self._substituted.alias(port.name)
+            func = self._lambdify(alias.rhs, [alias])
+        self._analog_send_port_funcs[name] = func
+        return func
+
+    def _compile_transition(self, transition):
+        assignments = sorted(transition.state_assignments,
+                             key=lambda sa: sa.variable)
+        return (
+            numpy.array([self._state_index[sa.variable]
+                         for sa in assignments], dtype=int),
+            self._lambdify([sa.rhs for sa in assignments], assignments),
+            tuple(oe.port_name for oe in transition.output_events),
+            self.transition_table.regime_index(
+                transition.target_regime_name))
+
+    def _lambdify(self, exprs, elements):
+        for element in elements:
+            if list(element.rhs_random_distributions):
+                raise NineMLUsageError(
+                    "Inline random distributions in '{}' are not supported by "
+                    "the reference simulator".format(element))
+        if isinstance(exprs, list):
+            exprs = [sympy.sympify(e).xreplace(self._constants)
+                     for e in exprs]
+        else:
+            exprs = sympy.sympify(exprs).xreplace(self._constants)
+        return sympy.lambdify(self._args, exprs, 'numpy')
+
+
+class DynamicsSimulator(object):
+    """
+    A NumPy reference engine that advances N instances of a DynamicsProperties
+    object with a fixed time step. The state of the instances is stored in a
+    (num_state_variables x N) array and the regime each instance is in is
+    tracked as an integer array.
+
+    Time derivatives are integrated with either the forward Euler or classic
+    fourth-order Runge-Kutta method separately for the instances in each
+    regime. At the end of each step the triggers of the OnConditions of each
+    regime are evaluated as vectorized masks and the instances for which a
+    trigger has changed from false to true undergo the transition, i.e. their
+    state assignments are applied, output events emitted and regimes
+    switched. Only the first transition triggered per instance in a step is
+    applied.
+
+    All values are in SI units (e.g. V, A, s).
+
+    Parameters
+    ----------
+    dynamics_properties : DynamicsProperties
+        The parameterised Dynamics class to simulate. Properties may have
+        array values to specify different values for each instance
+    size : int
+        The number of instances to simulate
+    dt : Quantity | float
+        The time step (in seconds if a float)
+    method : str
+        The integration method, either 'rk4' or 'euler'
+    initial_states : dict(str, float | numpy.ndarray) | None
+        Initial values of state variables, which override those in the
+        dynamics properties
+    """
+
+    methods = ('rk4', 'euler')
+
+    def __init__(self, dynamics_properties, size, dt, method='rk4',
+                 initial_states=None):
+        if method not in self.methods:
+            raise NineMLUsageError(
+                "Unrecognised integration method '{}' (can be '{}')"
+                .format(method, "', '".join(self.methods)))
+        self._dynamics_properties = dynamics_properties
+        self._compiled = compiled_dynamics.get(
+            dynamics_properties.component_class, CompiledDynamics)
+        self._size = size
+        self._dt = SI_time(dt)
+        self._method = method
+        self._t = 0.0
+        if initial_states is None:
+            initial_states = {}
+        self._states = numpy.empty((len(self.state_variable_names), size))
+        for i, name in enumerate(self.state_variable_names):
+            try:
+                value = initial_states[name]
+            except KeyError:
+                try:
+                    value = dynamics_properties.initial_value(name)
+                except NineMLNameError:
+                    raise NineMLUsageError(
+                        "Initial value for '{}' state variable was not "
+                        "provided".format(name))
+            self._states[i] = SI_value(value, size=size)
+        self._inputs = numpy.zeros((len(self.input_names), size))
+        self._parameters = []
+        for name in self._compiled.parameter_names:
+            value = SI_value(dynamics_properties.property(name), size=size)
+            if numpy.all(value == value[0]):
+                value = float(value[0])  # Avoid indexing homogeneous values
+            self._parameters.append(value)
+        self._regimes = numpy.empty(size, dtype=int)
+        self._regimes.fill(self._compiled.regime_index(
+            dynamics_properties.initial_regime))
+        self._events = defaultdict(list)
+        self._triggered = [[None] * len(ocs)
+                           for ocs in self._compiled.on_conditions]
+        self._update_triggered(numpy.arange(size))
+
+    @property
+    def dynamics_properties(self):
+        return self._dynamics_properties
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def dt(self):
+        return self._dt
+
+    @property
+    def t(self):
+        return self._t
+
+    @property
+    def state_variable_names(self):
+        return self._compiled.state_variable_names
+
+    @property
+    def input_names(self):
+        return self._compiled.input_names
+
+    @property
+    def regime_names(self):
+        "The regime names in the order of their indices in ``regimes``"
+        return self._compiled.regime_names
+
+    @property
+    def states(self):
+        "The states of the instances (num_state_variables x N)"
+        return self._states
+
+    @property
+    def regimes(self):
+        "The index of the regime of each instance"
+        return self._regimes
+
+    def state(self, name):
+        """The values of the state variable for each instance"""
+        return self._states[self._compiled.state_index(name)]
+
+    def set_input(self, name, value):
+        """
+        Sets the value of an analog receive or reduce port, which is held
+        until it is set again
+
+        Parameters
+        ----------
+        name : str
+            Name of the analog receive/reduce port
+        value : float | numpy.ndarray
+            The value (in SI units) for all instances or each instance
+        """
+        self._inputs[self._input_index(name)] = value
+
+    def analog_output(self, name):
+        """The value of the analog send port for each instance"""
+        func = self._compiled.analog_send_port_func(name)
+        if func is None:
+            return self.state(name)
+        return numpy.broadcast_to(
+            func(*self._args(self._t, self._states, slice(None))),
+            (self._size,))
+
+    def receive_events(self, port_name, indices, inputs=None):
+        """
+        Delivers events received on an event receive port to the instances
+        at the indices (which may contain repeated indices for multiple
+        events), applying the OnEvent transitions of the regimes they are in
+
+        Parameters
+        ----------
+        port_name : str
+            Name of the event receive port
+        indices : numpy.ndarray(int)
+            Indices of the instances that receive an event
+        inputs : dict(str, numpy.ndarray) | None
+            Values of analog receive ports carried by each event (e.g. the
+            weight of the connection it was delivered through), which
+            override the set inputs while its transition is applied
+        """
+        indices = numpy.asarray(indices, dtype=int)
+        try:
+            transitions = self._compiled.on_events[port_name]
+        except KeyError:
+            raise NineMLNameError(
+                "No event receive port named '{}' in '{}'".format(
+                    port_name, self._compiled.component_class.name))
+        if inputs is None:
+            inputs = {}
+        inputs = [(self._input_index(n), numpy.broadcast_to(
+            numpy.asarray(v, dtype=float), indices.shape))
+            for n, v in inputs.items()]
+        # Events delivered to the same instance are applied in rounds so that
+        # repeated indices are all applied
+        while indices.size:
+            unique, first = numpy.unique(indices, return_index=True)
+            held = [(i, self._inputs[i, unique]) for i, _ in inputs]
+            for i, values in inputs:
+                self._inputs[i, unique] = values[first]
+            regimes = self._regimes[unique]
+            for regime_index in numpy.unique(regimes):
+                transition = transitions[regime_index]
+                if transition is not None:
+                    self._transition(unique[regimes == regime_index],
+                                     transition)
+            for i, values in held:
+                self._inputs[i, unique] = values
+            indices = numpy.delete(indices, first)
+            inputs = [(i, numpy.delete(v, first)) for i, v in inputs]
+
+    def step(self):
+        """
+        Advances the instances by one time step
+
+        Returns
+        -------
+        events : dict(str, numpy.ndarray)
+            The indices of the instances that emitted an event on each event
+            send port during the step
+        """
+        dt = self._dt
+        for regime_index, (td_indices, td_func) in enumerate(
+                self._compiled.time_derivatives):
+            if not td_indices.size:
+                continue
+            indices = self._regime_indices(regime_index)
+            if indices is None:
+                continue
+            # Only the states with time derivatives are integrated, the
+            # others are passed through as constants
+            rows = list(self._states[:, indices])
+            fixed_args = self._fixed_args(indices)
+            x = numpy.array([rows[i] for i in td_indices])
+
+            def derivatives(t, x):
+                for i, row in zip(td_indices, x):
+                    rows[i] = row
+                dxdt = numpy.empty_like(x)
+                for j, value in enumerate(td_func(t, *(rows + fixed_args))):
+                    dxdt[j] = value
+                return dxdt
+
+            t = self._t
+            if self._method == 'euler':
+                x += dt * derivatives(t, x)
+            else:
+                k1 = derivatives(t, x)
+                k2 = derivatives(t + dt / 2, x + dt / 2 * k1)
+                k3 = derivatives(t + dt / 2, x + dt / 2 * k2)
+                k4 = derivatives(t + dt, x + dt * k3)
+                x += dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            for i, row in zip(td_indices, x):
+                self._states[i, indices] = row
+        self._t += dt
+        # Check triggers of OnConditions
+        triggers = []
+        for regime_index, on_conditions in enumerate(
+                self._compiled.on_conditions):
+            if not on_conditions:
+                continue
+            selection = self._regime_indices(regime_index)
+            if selection is None:
+                continue
+            if isinstance(selection, slice):
+                indices = numpy.arange(self._size)
+            else:
+                indices = selection
+            remaining = numpy.ones(len(indices), dtype=bool)
+            for oc_index, (trigger_func, transition) in enumerate(
+                    on_conditions):
+                triggered = self._evaluate_trigger(trigger_func, selection,
+                                                   len(indices))
+                previous = self._triggered[regime_index][oc_index]
+                fired = triggered & ~previous[selection] & remaining
+                previous[selection] = triggered
+                if fired.any():
+                    triggers.append((indices[fired], transition))
+                    remaining &= ~fired
+        for indices, transition in triggers:
+            self._transition(indices, transition)
+        events = dict((p, numpy.concatenate(i))
+                      for p, i in self._events.items())
+        self._events.clear()
+        return events
+
+    def run(self, duration):
+        """
+        Advances the instances for the duration
+
+        Parameters
+        ----------
+        duration : Quantity | float
+            The duration to simulate (in seconds if a float)
+
+        Returns
+        -------
+        events : dict(str, (numpy.ndarray, numpy.ndarray))
+            The indices of the instances that emitted an event on each event
+            send port and the times of the events
+        """
+        num_steps = int(round(SI_time(duration) / self._dt))
+        indices = defaultdict(list)
+        times = defaultdict(list)
+        for _ in range(num_steps):
+            for port_name, port_indices in self.step().items():
+                indices[port_name].append(port_indices)
+                times[port_name].append(numpy.repeat(self._t,
+                                                     len(port_indices)))
+        return dict((p, (numpy.concatenate(indices[p]),
+                         numpy.concatenate(times[p]))) for p in indices)
+
+    def _input_index(self, name):
+        try:
+            return self.input_names.index(name)
+        except ValueError:
+            raise NineMLNameError(
+                "No analog receive or reduce port named '{}' (available '{}')"
+                .format(name, "', '".join(self.input_names)))
+
+    def _regime_indices(self, regime_index):
+        """
+        Returns the indices of the instances in the regime, a slice if all the
+        instances are in it or None if there aren't any
+        """
+        if len(self._compiled.regime_names) == 1:
+            return slice(None)
+        in_regime = self._regimes == regime_index
+        if in_regime.all():
+            return slice(None)
+        elif not in_regime.any():
+            return None
+        return numpy.flatnonzero(in_regime)
+
+    def _args(self, t, states, indices):
+        args = [t]
+        args.extend(states)
+        args.extend(self._fixed_args(indices))
+        return args
+
+    def _fixed_args(self, indices):
+        "The inputs and parameters of the instances, fixed over a time step"
+        args = list(self._inputs[:, indices])
+        args.extend(p if isinstance(p, float) else p[indices]
+                    for p in self._parameters)
+        return args
+
+    def _evaluate_trigger(self, trigger_func, indices, size):
+        triggered = trigger_func(*self._args(
+            self._t, self._states[:, indices], indices))
+        return numpy.broadcast_to(numpy.asarray(triggered, dtype=bool),
+                                  (size,))
+
+    def _transition(self, indices, transition):
+        sa_indices, sa_func, output_port_names, target_regime = transition
+        if sa_indices.size:
+            # Evaluate all the assignments before applying any of them
+            values = sa_func(*self._args(self._t, self._states[:, indices],
+                                         indices))
+            for i, value in zip(sa_indices, values):
+                self._states[i, indices] = value
+        for port_name in output_port_names:
+            self._events[port_name].append(indices)
+        switched = indices[self._regimes[indices] != target_regime]
+        self._regimes[indices] = target_regime
+        # Reset the trigger states of the instances that have had their state
+        # or regime changed so that triggers that are already true on entry
+        # to a regime don't fire
+        if sa_indices.size:
+            self._update_triggered(indices)
+        elif switched.size:
+            self._update_triggered(switched)
+
+    def _update_triggered(self, indices):
+        for regime_index, on_conditions in enumerate(
+                self._compiled.on_conditions):
+            in_regime = indices[self._regimes[indices] == regime_index]
+            for oc_index, (trigger_func, _) in enumerate(on_conditions):
+                triggered = self._triggered[regime_index][oc_index]
+                if triggered is None:
+                    triggered = self._triggered[regime_index][oc_index] = (
+                        numpy.zeros(self._size, dtype=bool))
+                if in_regime.size:
+                    triggered[in_regime] = self._evaluate_trigger(
+                        trigger_func, in_regime, len(in_regime))
+
+
+# Compiled expressions of each Dynamics class
+compiled_dynamics = IdentityCache()
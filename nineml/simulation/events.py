@@ -0,0 +1,245 @@
+"""
+Delivery of events through the event connection groups of flattened 9ML
+networks, with the connections compiled into compressed sparse row (CSR)
+arrays and the delays handled by ring buffers
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from __future__ import division
+from builtins import object
+from itertools import chain
+import numpy
+from nineml.exceptions import NineMLUsageError
+from .utils import SI_value, SI_time
+
+
+class EventRingBuffer(object):
+    """
+    A ring buffer of batches of events (destination indices and weights) to
+    be delivered after integer numbers of time steps
+
+    Parameters
+    ----------
+    num_slots : int
+        The number of slots in the buffer, i.e. the maximum delay (in time
+        steps) that can be pushed plus one
+    """
+
+    def __init__(self, num_slots):
+        self._slots = [[] for _ in range(num_slots)]
+        self._head = 0
+
+    @property
+    def num_slots(self):
+        return len(self._slots)
+
+    def __len__(self):
+        "The number of events waiting in the buffer"
+        return sum(len(d) for d, _ in chain(*self._slots))
+
+    def push(self, delays, destinations, weights):
+        """
+        Adds events to the buffer
+
+        Parameters
+        ----------
+        delays : int | numpy.ndarray(int)
+            The number of time steps before each event is delivered, where 0
+            delivers them at the next ``pop``
+        destinations : numpy.ndarray(int)
+            The indices of the instances that receive each event
+        weights : numpy.ndarray | None
+            The weight of each event
+        """
+        num_slots = len(self._slots)
+        if numpy.ndim(delays) == 0:
+            if delays >= num_slots:
+                raise NineMLUsageError(
+                    "Delay of {} steps exceeds the size of the event buffer "
+                    "({} slots)".format(delays, num_slots))
+            self._slots[(self._head + delays) % num_slots].append(
+                (destinations, weights))
+            return
+        if delays.size and delays.max() >= num_slots:
+            raise NineMLUsageError(
+                "Delay of {} steps exceeds the size of the event buffer "
+                "({} slots)".format(delays.max(), num_slots))
+        # Group the events by delay so they are stored in one chunk per slot
+        order = numpy.argsort(delays, kind='stable')
+        sorted_delays = delays[order]
+        unique, starts = numpy.unique(sorted_delays, return_index=True)
+        ends = numpy.append(starts[1:], len(order))
+        for delay, start, end in zip(unique, starts, ends):
+            selected = order[start:end]
+            self._slots[(self._head + delay) % num_slots].append(
+                (destinations[selected],
+                 weights[selected] if weights is not None else None))
+
+    def pop(self):
+        """
+        Returns the events due at the current time step and advances the
+        buffer by one step
+
+        Returns
+        -------
+        destinations : numpy.ndarray(int)
+            The indices of the instances that receive each event
+        weights : numpy.ndarray | None
+            The weight of each event, or None if the events don't have weights
+        """
+        slot = self._slots[self._head]
+        self._slots[self._head] = []
+        self._head = (self._head + 1) % len(self._slots)
+        if not slot:
+            return numpy.empty(0, dtype=int), None
+        elif len(slot) == 1:
+            return slot[0]
+        destinations, weights = zip(*slot)
+        if weights[0] is not None:
+            weights = numpy.concatenate(weights)
+        else:
+            weights = None
+        return numpy.concatenate(destinations), weights
+
+
+class EventDelivery(object):
+    """
+    Compiles an event connection group into CSR arrays, i.e. the indices
+    of the destinations of the connections sorted by their source, along with
+    the delay (in time steps) and optional weight of each connection. Events
+    sent from batches of source indices are then expanded to their
+    destinations and queued in a ring buffer with NumPy operations.
+
+    Parameters
+    ----------
+    connection_group : EventConnectionGroup
+        The connection group to compile
+    dt : Quantity | float
+        The time step of the simulation (in seconds if a float), which the
+        delays are rounded to
+    weights : Property | Quantity | numpy.ndarray | None
+        The weight of each connection, in the order they are generated by
+        the connectivity of the group, e.g. an ArrayValue property
+    weight_port : str | None
+        The name of the analog receive port of the destination Dynamics the
+        weights are passed to when the events are received
+    """
+
+    def __init__(self, connection_group, dt, weights=None, weight_port=None):
+        self._connection_group = connection_group
+        self._dt = SI_time(dt)
+        self._weight_port = weight_port
+        sources, destinations = connection_group.connection_arrays()
+        num_connections = len(sources)
+        order = numpy.argsort(sources, kind='stable')
+        self._indptr = numpy.zeros(connection_group.source.size + 1,
+                                   dtype=int)
+        numpy.cumsum(numpy.bincount(sources,
+                                    minlength=connection_group.source.size),
+                     out=self._indptr[1:])
+        self._destinations = destinations[order]
+        if connection_group.delay is None:
+            delays = 0
+        else:
+            delays = numpy.rint(
+                SI_value(connection_group.delay, size=num_connections) /
+                self._dt).astype(int)
+            if not num_connections:
+                delays = 0
+            elif numpy.all(delays == delays[0]):
+                delays = int(delays[0])
+            else:
+                delays = delays[order]
+        self._delays = delays
+        if weights is not None:
+            weights = SI_value(weights, size=num_connections)[order]
+        elif weight_port is not None:
+            raise NineMLUsageError(
+                "Weights must be provided to pass them to '{}' port"
+                .format(weight_port))
+        self._weights = weights
+        self._buffer = EventRingBuffer(numpy.max(delays) + 1)
+
+    @property
+    def connection_group(self):
+        return self._connection_group
+
+    @property
+    def indptr(self):
+        "Offsets of the connections from each source in ``destinations``"
+        return self._indptr
+
+    @property
+    def destinations(self):
+        "Destination indices of the connections sorted by source"
+        return self._destinations
+
+    @property
+    def delays(self):
+        "Delays of the connections in time steps (an int if homogeneous)"
+        return self._delays
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @property
+    def num_pending(self):
+        "The number of events in transit"
+        return len(self._buffer)
+
+    def connection_indices(self, source_indices):
+        """
+        Returns the (CSR) indices of the connections from the sources,
+        including a copy for each repeat of a source index
+        """
+        source_indices = numpy.asarray(source_indices, dtype=int)
+        starts = self._indptr[source_indices]
+        counts = self._indptr[source_indices + 1] - starts
+        offsets = numpy.cumsum(counts) - counts
+        return (numpy.arange(counts.sum()) +
+                numpy.repeat(starts - offsets, counts))
+
+    def send(self, source_indices):
+        """
+        Queues the events emitted by the source instances for delivery to
+        the destinations of their connections after the connection delays
+        """
+        indices = self.connection_indices(source_indices)
+        if not indices.size:
+            return
+        delays = self._delays
+        if not isinstance(delays, int):
+            delays = delays[indices]
+        self._buffer.push(
+            delays, self._destinations[indices],
+            self._weights[indices] if self._weights is not None else None)
+
+    def receive(self):
+        """
+        Returns the destination indices (and weights) of the events due at
+        the current time step and advances the delay buffer by one step
+        """
+        return self._buffer.pop()
+
+    def deliver(self, simulator):
+        """
+        Delivers the events due at the current time step to the destination
+        port of the connection group in the simulator of the destination
+        component array
+
+        Parameters
+        ----------
+        simulator : DynamicsSimulator
+            The simulator of the destination component array
+        """
+        destinations, weights = self.receive()
+        if destinations.size:
+            if self._weight_port is not None:
+                inputs = {self._weight_port: weights}
+            else:
+                inputs = None
+            simulator.receive_events(
+                self._connection_group.destination_port, destinations,
+                inputs=inputs)
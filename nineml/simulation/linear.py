@@ -0,0 +1,291 @@
+"""
+Exact integration of the linear dynamics of 9ML Dynamics classes using
+matrix-exponential propagators
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from __future__ import division
+from builtins import object
+import weakref
+import numpy
+import sympy
+from sympy.polys.polyerrors import PolynomialError
+from nineml.units import Quantity
+from nineml.exceptions import NineMLUsageError
+from .utils import SI_value, SI_time, IdentityCache
+try:
+    from scipy.linalg import expm
+except ImportError:
+    expm = None
+
+
+class LinearDynamicsIntegrator(object):
+    """
+    Advances N instances of a DynamicsProperties object whose time derivatives
+    (in the given regime) are linear in its state variables and analog
+    inputs,
+
+        dx/dt = A x + B u + c
+
+    exactly, assuming the inputs u are constant over each time step, i.e.
+
+        x(t + dt) = Phi x(t) + Gamma u(t) + gamma
+
+    where Phi, Gamma and gamma are blocks of the exponential of the augmented
+    system matrix. The propagators are cached per parameter values and time
+    step so they are only computed once for each (DynamicsProperties, dt)
+    combination. Triggers and state assignments (e.g. the reset of an
+    integrate-and-fire neuron) are not handled by the integrator.
+
+    All values are in SI units (e.g. V, A, s).
+
+    Parameters
+    ----------
+    dynamics_properties : DynamicsProperties
+        The parameterised Dynamics class to integrate. Properties must have
+        single values (i.e. be homogeneous across the instances)
+    regime_name : str | None
+        The name of the regime whose time derivatives are integrated. If None
+        the initial regime of the dynamics properties is used
+    """
+
+    def __init__(self, dynamics_properties, regime_name=None):
+        component_class = dynamics_properties.component_class
+        if regime_name is None:
+            regime_name = dynamics_properties.initial_regime
+        self._dynamics_properties = dynamics_properties
+        self._regime_name = regime_name
+        self._system = linear_systems.get(component_class, LinearSystem)
+        parameter_values = []
+        for name in self._system.parameter_names:
+            value = SI_value(dynamics_properties.property(name))
+            if not isinstance(value, float):
+                raise NineMLUsageError(
+                    "Cannot integrate '{}' exactly as '{}' property is not a "
+                    "single value".format(dynamics_properties.name, name))
+            parameter_values.append(value)
+        self._parameter_values = tuple(parameter_values)
+        # Derive the system matrices up front so that dynamics that aren't
+        # linear are rejected when the integrator is created
+        self._system.matrices(regime_name, self._parameter_values)
+
+    @property
+    def dynamics_properties(self):
+        return self._dynamics_properties
+
+    @property
+    def regime_name(self):
+        return self._regime_name
+
+    @property
+    def state_variable_names(self):
+        "The order of the columns of the state arrays"
+        return self._system.state_variable_names
+
+    @property
+    def input_names(self):
+        "The order of the columns of the input arrays"
+        return self._system.input_names
+
+    def propagator(self, dt):
+        """
+        Returns the (Phi, Gamma, gamma) propagator matrices for the time step
+
+        Parameters
+        ----------
+        dt : Quantity | float
+            The time step (in seconds if a float)
+        """
+        return self._system.propagator(self._regime_name,
+                                       self._parameter_values, SI_time(dt))
+
+    def step(self, states, inputs=None, dt=None):
+        """
+        Advances the states of the instances by one time step
+
+        Parameters
+        ----------
+        states : numpy.ndarray
+            The states of the instances (N x num_state_variables)
+        inputs : numpy.ndarray | None
+            The analog inputs to the instances (N x num_inputs), held
+            constant over the time step. Can be None if there are no inputs
+        dt : Quantity | float
+            The time step (in seconds if a float)
+
+        Returns
+        -------
+        states : numpy.ndarray
+            The states of the instances after the time step
+        """
+        if dt is None:
+            raise NineMLUsageError("Time step 'dt' was not provided")
+        phi, gamma, offset = self.propagator(dt)
+        new_states = numpy.dot(states, phi.T)
+        new_states += offset
+        if gamma.shape[1]:
+            if inputs is None:
+                raise NineMLUsageError(
+                    "Inputs are required to integrate '{}' ('{}')".format(
+                        self._dynamics_properties.name,
+                        "', '".join(self.input_names)))
+            new_states += numpy.dot(inputs, gamma.T)
+        return new_states
+
+    def initial_states(self, size):
+        """
+        Returns an array of the initial states for ``size`` instances from
+        the initial values of the dynamics properties
+        """
+        states = numpy.empty((size, len(self.state_variable_names)))
+        for i, name in enumerate(self.state_variable_names):
+            states[:, i] = SI_value(
+                self._dynamics_properties.initial_value(name), size=size)
+        return states
+
+
+class LinearSystem(object):
+    """
+    The system matrices of the linear time derivatives of each regime of a
+    Dynamics class, expressed as functions of its parameters, along with a
+    cache of the propagators calculated from them.
+
+    Parameters
+    ----------
+    component_class : Dynamics
+        The Dynamics class to derive the system matrices from
+    """
+
+    MAX_CACHED_PROPAGATORS = 1000
+
+    def __init__(self, component_class):
+        # Only a proxy to the class is held so that the cache entry (keyed
+        # on a weak reference to the class) doesn't keep the class alive
+        self.component_class = weakref.proxy(component_class)
+        self.state_variable_names = tuple(
+            sorted(component_class.state_variable_names))
+        self.input_names = tuple(sorted(
+            list(component_class.analog_receive_port_names) +
+            list(component_class.analog_reduce_port_names)))
+        self.parameter_names = tuple(sorted(component_class.parameter_names))
+        self._substituted = None
+        self._matrix_funcs = {}
+        self._propagators = {}
+
+    def matrices(self, regime_name, parameter_values):
+        """
+        Returns the (A, B, c) system matrices of the regime for the parameter
+        values (in the order of ``parameter_names``)
+        """
+        try:
+            func = self._matrix_funcs[regime_name]
+        except KeyError:
+            func = self._matrix_funcs[regime_name] = self._derive(regime_name)
+        n = len(self.state_variable_names)
+        m = len(self.input_names)
+        entries = numpy.asarray(func(*parameter_values), dtype=float)
+        return (entries[:n * n].reshape((n, n)),
+                entries[n * n:n * (n + m)].reshape((n, m)),
+                entries[n * (n + m):])
+
+    def propagator(self, regime_name, parameter_values, dt):
+        key = (regime_name, parameter_values, dt)
+        try:
+            return self._propagators[key]
+        except KeyError:
+            pass
+        A, B, c = self.matrices(regime_name, parameter_values)
+        n, m = B.shape
+        augmented = numpy.zeros((n + m + 1, n + m + 1))
+        augmented[:n, :n] = A
+        augmented[:n, n:n + m] = B
+        augmented[:n, n + m] = c
+        exponential = matrix_exponential(augmented * dt)
+        propagator = (exponential[:n, :n], exponential[:n, n:n + m],
+                      exponential[:n, n + m])
+        if len(self._propagators) >= self.MAX_CACHED_PROPAGATORS:
+            self._propagators.clear()
+        self._propagators[key] = propagator
+        return propagator
+
+    def _derive(self, regime_name):
+        if self._substituted is None:
+            self._substituted = self.component_class.substitute_aliases()
+        regime = self._substituted.regime(regime_name)
+        states = [sympy.Symbol(n) for n in self.state_variable_names]
+        inputs = [sympy.Symbol(n) for n in self.input_names]
+        parameters = [sympy.Symbol(n) for n in self.parameter_names]
+        constants = dict(
+            (sympy.Symbol(c.name), SI_value(Quantity(c.value, c.units)))
+            for c in self._substituted.constants)
+        allowed = set(states + inputs + parameters)
+        derivatives = []
+        for name in self.state_variable_names:
+            try:
+                td = regime.time_derivative(name)
+            except KeyError:
+                derivatives.append(sympy.Integer(0))
+                continue
+            if list(td.rhs_random_distributions):
+                raise NineMLUsageError(
+                    "Cannot integrate stochastic time derivative of '{}' in "
+                    "'{}' regime of '{}' exactly".format(
+                        name, regime_name, self.component_class.name))
+            rhs = sympy.sympify(td.rhs).xreplace(constants)
+            unrecognised = rhs.free_symbols - allowed
+            if unrecognised:
+                raise NineMLUsageError(
+                    "Time derivative of '{}' in '{}' regime of '{}' depends "
+                    "on {}, so cannot be integrated exactly".format(
+                        name, regime_name, self.component_class.name,
+                        ', '.join(str(s) for s in unrecognised)))
+            try:
+                linear = sympy.poly(rhs, *(states + inputs)).is_linear
+            except PolynomialError:
+                linear = False
+            if not linear:
+                raise NineMLUsageError(
+                    "Time derivative of '{}' in '{}' regime of '{}' is not "
+                    "linear in the state variables and inputs ({})".format(
+                        name, regime_name, self.component_class.name, rhs))
+            derivatives.append(rhs)
+        zeros = dict((s, 0) for s in states + inputs)
+        entries = ([d.diff(s) for d in derivatives for s in states] +
+                   [d.diff(i) for d in derivatives for i in inputs] +
+                   [d.xreplace(zeros) for d in derivatives])
+        return sympy.lambdify(parameters, entries, 'numpy')
+
+
+def matrix_exponential(matrix):
+    """
+    Returns the exponential of a square matrix, using SciPy if it is
+    installed and otherwise a Pade approximation with scaling and squaring
+    """
+    if expm is not None:
+        return expm(matrix)
+    identity = numpy.eye(matrix.shape[0])
+    norm = numpy.linalg.norm(matrix, numpy.inf)
+    if norm:
+        num_squarings = max(0, int(numpy.ceil(numpy.log2(norm))) + 1)
+    else:
+        num_squarings = 0
+    scaled = matrix / 2.0 ** num_squarings
+    order = 6
+    coeff = 0.5
+    power = scaled
+    numer = identity + coeff * scaled
+    denom = identity - coeff * scaled
+    for k in range(2, order + 1):
+        coeff *= (order - k + 1) / (k * (2 * order - k + 1))
+        power = numpy.dot(scaled, power)
+        numer += coeff * power
+        denom += (coeff if k % 2 == 0 else -coeff) * power
+    exponential = numpy.linalg.solve(denom, numer)
+    for _ in range(num_squarings):
+        exponential = numpy.dot(exponential, exponential)
+    return exponential
+
+
+# Linear systems derived from each Dynamics class
+linear_systems = IdentityCache()
@@ -0,0 +1,201 @@
+"""
+Aggregation of the analog connection groups that target the same analog
+reduce port of a flattened 9ML network, with the connections compiled into a
+sparse (destination x source) matrix so that the reduction is a single
+matrix-vector product per time step
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from builtins import object
+from collections import OrderedDict
+import numpy
+from nineml.user.connection_group import AnalogConnectionGroup
+from nineml.exceptions import NineMLUsageError, NineMLNameError
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+
+class AnalogReduction(object):
+    """
+    Compiles the analog connection groups that connect to the same reduce
+    port of a destination component array into a sparse matrix, which has a
+    row for each destination instance and a column for each instance of the
+    source component arrays (concatenated in the order of the connection
+    groups). Each entry counts the connections between the corresponding
+    source and destination instances, so the reduced input is the product of
+    the matrix and the concatenated source values.
+
+    If SciPy isn't installed the product is calculated from the coordinates
+    of the connections with ``numpy.bincount`` instead.
+
+    Parameters
+    ----------
+    connection_groups : iterable(AnalogConnectionGroup)
+        The connection groups to aggregate, which must all have the same
+        destination component array and port
+    """
+
+    def __init__(self, connection_groups):
+        self._connection_groups = list(connection_groups)
+        if not self._connection_groups:
+            raise NineMLUsageError(
+                "At least one connection group is required for an analog "
+                "reduction")
+        first = self._connection_groups[0]
+        self._destination = first.destination
+        self._destination_port = first.destination_port
+        for group in self._connection_groups:
+            if not isinstance(group, AnalogConnectionGroup):
+                raise NineMLUsageError(
+                    "Cannot aggregate {} as it isn't an analog connection "
+                    "group".format(group))
+            if (group.destination.name != self._destination.name or
+                    group.destination_port != self._destination_port):
+                raise NineMLUsageError(
+                    "Cannot aggregate '{}' connection group, which connects "
+                    "to '{}' port of '{}', with connection groups connected "
+                    "to '{}' port of '{}'".format(
+                        group.name, group.destination_port,
+                        group.destination.name, self._destination_port,
+                        self._destination.name))
+        try:
+            port = self._destination.component_class.analog_reduce_port(
+                self._destination_port)
+        except NineMLNameError:
+            raise NineMLUsageError(
+                "'{}' port of '{}' is not an analog reduce port".format(
+                    self._destination_port, self._destination.name))
+        if port.operator != '+':
+            raise NineMLUsageError(
+                "Unsupported operator '{}' of '{}' reduce port".format(
+                    port.operator, port.name))
+        self._offsets = numpy.zeros(len(self._connection_groups) + 1,
+                                    dtype=int)
+        numpy.cumsum([g.source.size for g in self._connection_groups],
+                     out=self._offsets[1:])
+        rows = []
+        cols = []
+        for group, offset in zip(self._connection_groups, self._offsets):
+            sources, destinations = group.connection_arrays()
+            cols.append(sources + offset)
+            rows.append(destinations)
+        self._rows = numpy.concatenate(rows)
+        self._cols = numpy.concatenate(cols)
+        if sparse is not None:
+            # Duplicate connections are summed by the conversion to CSR
+            self._matrix = sparse.coo_matrix(
+                (numpy.ones(len(self._rows)), (self._rows, self._cols)),
+                shape=self.shape).tocsr()
+        else:
+            self._matrix = None
+
+    @property
+    def connection_groups(self):
+        return iter(self._connection_groups)
+
+    @property
+    def num_connection_groups(self):
+        return len(self._connection_groups)
+
+    @property
+    def destination(self):
+        return self._destination
+
+    @property
+    def destination_port(self):
+        return self._destination_port
+
+    @property
+    def shape(self):
+        return (self._destination.size, int(self._offsets[-1]))
+
+    @property
+    def offsets(self):
+        "Offsets of the source instances of each group in the matrix columns"
+        return self._offsets
+
+    @property
+    def num_connections(self):
+        return len(self._rows)
+
+    @property
+    def matrix(self):
+        """
+        The (destination x source) matrix as a SciPy CSR matrix, or None if
+        SciPy isn't installed
+        """
+        return self._matrix
+
+    def reduce(self, source_values):
+        """
+        Returns the reduced input of each destination instance
+
+        Parameters
+        ----------
+        source_values : list(numpy.ndarray)
+            The values sent by the instances of the source component array of
+            each connection group (in the order of the groups)
+        """
+        if len(source_values) != len(self._connection_groups):
+            raise NineMLUsageError(
+                "Number of source value arrays ({}) does not match the number "
+                "of connection groups ({})".format(
+                    len(source_values), len(self._connection_groups)))
+        values = numpy.concatenate([
+            numpy.broadcast_to(numpy.asarray(v, dtype=float), (g.source.size,))
+            for v, g in zip(source_values, self._connection_groups)])
+        if self._matrix is not None:
+            return self._matrix.dot(values)
+        return numpy.bincount(self._rows, weights=values[self._cols],
+                              minlength=self._destination.size)
+
+    def update(self, simulators):
+        """
+        Reads the analog outputs of the source simulators and sets the
+        reduced values as the input of the destination simulator
+
+        Parameters
+        ----------
+        simulators : dict(str, DynamicsSimulator)
+            The simulators of the component arrays, keyed by their names
+        """
+        reduced = self.reduce([
+            simulators[g.source.name].analog_output(g.source_port)
+            for g in self._connection_groups])
+        simulators[self._destination.name].set_input(self._destination_port,
+                                                     reduced)
+
+
+def compile_analog_reductions(connection_groups):
+    """
+    Groups the analog connection groups of a flattened network (see
+    Network.flatten) by the reduce port they are connected to and compiles
+    each group into an AnalogReduction. Event connection groups and analog
+    connection groups connected to receive ports are skipped.
+
+    Parameters
+    ----------
+    connection_groups : iterable(BaseConnectionGroup)
+        The connection groups of the flattened network
+
+    Returns
+    -------
+    reductions : list(AnalogReduction)
+        An analog reduction for each reduce port that is connected to
+    """
+    grouped = OrderedDict()
+    for group in connection_groups:
+        if not isinstance(group, AnalogConnectionGroup):
+            continue
+        try:
+            group.destination.component_class.analog_reduce_port(
+                group.destination_port)
+        except NineMLNameError:
+            continue
+        grouped.setdefault(
+            (group.destination.name, group.destination_port), []).append(
+                group)
+    return [AnalogReduction(g) for g in grouped.values()]
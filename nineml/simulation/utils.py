@@ -0,0 +1,108 @@
+"""
+Helper functions shared by the reference simulation engines
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+import weakref
+import numpy
+from nineml.units import Quantity, time
+from nineml.exceptions import NineMLUsageError
+
+
+def SI_value(quantity, size=None):
+    """
+    Returns the value of a quantity (or property) in SI units, i.e. the
+    units with a power of 0 and no offset (e.g. V, A, s, K) that all values
+    are expressed in by the simulation engines. The offsets of units such
+    as degC are added after the values are scaled.
+
+    Parameters
+    ----------
+    quantity : Quantity | Property | float
+        The quantity to convert. Floats are assumed to already be in SI units
+    size : int | None
+        If provided the value is returned as an array of that size, with
+        single values broadcast and random distributions sampled (requires a
+        generator to have been set on the RandomDistributionValue)
+    """
+    try:
+        quantity = quantity.quantity  # If a Property
+    except AttributeError:
+        pass
+    if not isinstance(quantity, Quantity):
+        value = numpy.asarray(quantity, dtype=float)
+    else:
+        scale = 10.0 ** quantity.units.power
+        offset = quantity.units.offset
+        value = quantity.value
+        if value.is_single():
+            value = numpy.asarray(value.value * scale + offset)
+        elif value.is_array():
+            value = numpy.asarray(value.values, dtype=float) * scale + offset
+        elif size is None:
+            raise NineMLUsageError(
+                "Cannot convert random value {} to SI units without a size "
+                "to sample".format(value))
+        else:
+            value = numpy.fromiter(
+                (next(iter(value)) for _ in range(size)), dtype=float,
+                count=size) * scale + offset
+    if size is not None:
+        if value.ndim and len(value) != size:
+            raise NineMLUsageError(
+                "Size of array value ({}) does not match required size ({})"
+                .format(len(value), size))
+        value = numpy.array(numpy.broadcast_to(value, (size,)))
+    elif not value.ndim:
+        value = float(value)
+    return value
+
+
+def SI_time(dt):
+    """Returns a time step in seconds from a Quantity or float"""
+    if isinstance(dt, Quantity):
+        if tuple(dt.units.dimension) != tuple(time):
+            raise NineMLUsageError(
+                "Time step must have dimension of time ({})".format(dt))
+    return float(SI_value(dt))
+
+
+class IdentityCache(object):
+    """
+    A cache of objects derived from 9ML objects, keyed by the identity of the
+    9ML object rather than its (structural) hash, which is relatively costly
+    to compute. Entries are dropped when the 9ML object is garbage collected.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, obj, factory):
+        """
+        Returns the cached value for ``obj``, calling ``factory(obj)`` to
+        create it if it isn't already cached
+        """
+        key = id(obj)
+        try:
+            ref, value = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            if ref() is obj:
+                return value
+        value = factory(obj)
+        entries = self._entries
+
+        def remove(ref):
+            if key in entries and entries[key][0] is ref:
+                del entries[key]
+
+        self._entries[key] = (weakref.ref(obj, remove), value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
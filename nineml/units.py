@@ -14,6 +14,16 @@ from nineml.exceptions import (
 from nineml.utils import validate_identifier
 from functools import reduce
 
+# The maximum number of entries in the caches of dimensions (including those
+# of the dimensional analysis of component classes) before they are cleared
+DIMENSION_CACHE_SIZE = 10000
+
+
+def cache_dimensions(cache, key, dims):
+    if len(cache) >= DIMENSION_CACHE_SIZE:
+        cache.clear()
+    cache[key] = dims
+
 
 class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
     """
@@ -30,6 +40,12 @@ class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
 
     _trailing_numbers_re = re.compile(r'(.*)(\d+)$')
 
+    # Memoized conversions to and from sympy expressions, which are repeated
+    # many times during dimensional analysis (cleared once they reach
+    # DIMENSION_CACHE_SIZE entries)
+    _sympy_cache = {}
+    _from_sympy_cache = {}
+
     def __init__(self, name, dimensions=None, **kwargs):
         self._name = validate_identifier(name)
         AnnotatedNineMLObject.__init__(self)
@@ -77,12 +93,14 @@ class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
         the dimensions together
         """
         try:
-            return reduce(
+            return self._sympy_cache[self._dims]
+        except KeyError:
+            expr = reduce(
                 operator.mul,
                 (Symbol(n) ** p
                  for n, p in zip(self.dimension_symbols, self._dims)))
-        except:
-            raise
+            cache_dimensions(self._sympy_cache, self._dims, expr)
+            return expr
 
     @property
     def m(self):
@@ -228,13 +246,22 @@ class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
         return name
 
     @classmethod
-    def from_sympy(self, expr):
+    def from_sympy(cls, expr):
         if expr == 1:
             return dimensionless
         elif not isinstance(expr, sympy.Basic):
             raise NineMLUsageError(
                 "Cannot convert '{}' dimension, must be 1 or sympy expression"
                 .format(expr))
+        try:
+            name, powers = cls._from_sympy_cache[expr]
+        except KeyError:
+            name, powers = cls._name_and_powers_from_sympy(expr)
+            cache_dimensions(cls._from_sympy_cache, expr, (name, powers))
+        return Dimension(name, **powers)
+
+    @classmethod
+    def _name_and_powers_from_sympy(cls, expr):
         powers = {}
         stack = [expr]
         while stack:
@@ -248,8 +275,8 @@ class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
         name_num = []
         name_den = []
         for sym, p in powers.items():
-            name = self.dimension_names[next(
-                i for i, s in enumerate(self.dimension_symbols) if s == sym)]
+            name = cls.dimension_names[next(
+                i for i, s in enumerate(cls.dimension_symbols) if s == sym)]
             if abs(p) > 1:
                 name += str(abs(p))
             if p > 0:
@@ -261,7 +288,7 @@ class Dimension(AnnotatedNineMLObject, DocumentLevelObject):
             if name:
                 name += '_'
             name += 'per_' + '_'.join(name_den)
-        return Dimension(name, **powers)
+        return name, powers
 
     @property
     def origin(self):
@@ -617,6 +644,8 @@ class Quantity(AnnotatedNineMLObject):
             except AttributeError:
                 if isinstance(qty, (int, float)):
                     value = SingleValue(qty)
+                elif isinstance(qty, (SingleValue, ArrayValue)):
+                    value = qty  # Avoid copying the values of arrays
                 else:
                     try:
                         value = ArrayValue(qty)
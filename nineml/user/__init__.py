@@ -6,7 +6,8 @@ from .randomdistribution import RandomDistributionProperties
 from .population import Population
 from .dynamics import Initial, DynamicsProperties
 from .connectionrule import (
-    ConnectionRuleProperties, Connectivity, InverseConnectivity)
+    ConnectionRuleProperties, Connectivity, InverseConnectivity,
+    ConnectivityCache)
 from .multi import MultiDynamics, MultiDynamicsProperties, append_namespace
 from .port_connections import (
     AnalogPortConnection, EventPortConnection)
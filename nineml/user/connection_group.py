@@ -1,12 +1,15 @@
 from builtins import zip
 from abc import ABCMeta, abstractmethod
+import numpy
 from . import BaseULObject
 from nineml.abstraction.connectionrule import (
     explicit_connection_rule, one_to_one_connection_rule)
 from nineml.user.port_connections import EventPortConnection
 from nineml.user.connectionrule import (
-    ConnectionRuleProperties, Connectivity, BaseConnectivity)
+    ConnectionRuleProperties, Connectivity, BaseConnectivity, INDEX,
+    INDEX_BYTES, connection_values)
 from nineml.units import Quantity
+from nineml.values import ArrayValue
 from nineml.abstraction.ports import (
     SendPort, ReceivePort, EventPort, AnalogPort, Port)
 from nineml.user.component_array import ComponentArray
@@ -85,12 +88,96 @@ class BaseConnectionGroup(
     def connections(self):
         return self._connectivity.connections()
 
+    def connection_arrays(self):
+        "The source and destination indices of the connections"
+        return self._connectivity.connection_arrays()
+
+    def num_connections(self, exact=False):
+        "The number of connections, see BaseConnectivity.out_degrees"
+        return self._connectivity.num_connections(exact=exact)
+
+    def out_degrees(self, exact=False):
+        "The number of connections from each source instance"
+        return self._connectivity.out_degrees(exact=exact)
+
+    def in_degrees(self, exact=False):
+        "The number of connections to each destination instance"
+        return self._connectivity.in_degrees(exact=exact)
+
+    def connection_chunks(self, weights=None, chunk_size=None,
+                          max_memory=None):
+        """
+        Iterates over the connections of the group in fixed-size chunks of
+        (source indices, destination indices, weights, delays) arrays, so
+        they can be streamed without holding all of them in memory at once.
+        The weights and delays are None if weights aren't provided or the
+        group doesn't have a delay, respectively.
+
+        Parameters
+        ----------
+        weights : Property | Quantity | BaseValue | numpy.ndarray | None
+            The weights of the connections, in the order of `connections`
+        chunk_size : int | None
+            The number of connections in each chunk (except the last)
+        max_memory : int | None
+            The maximum number of bytes of the arrays of each chunk
+        """
+        bytes_per_connection = 2 * INDEX_BYTES + sum(
+            8 for v in (weights, self.delay) if v is not None)
+        chunk_size = self._connectivity._chunk_size(
+            chunk_size, max_memory, bytes_per_connection)
+        offset = 0
+        for sources, destinations in self._connectivity.connection_chunks(
+                chunk_size=chunk_size):
+            num_connections = len(sources)
+            yield (sources, destinations,
+                   (connection_values(weights, num_connections, offset)
+                    if weights is not None else None),
+                   (connection_values(self.delay, num_connections, offset)
+                    if self.delay is not None else None))
+            offset += num_connections
+
+    def to_coo(self, *data):
+        """
+        The connections as a (source x destination) sparse COO matrix, with
+        the values of each connection given in ``data`` (e.g. the weights or
+        the delay of the group) as the entries of the matrix. See
+        BaseConnectivity.to_coo
+        """
+        return self._connectivity.to_coo(*data)
+
+    def to_csr(self, *data):
+        "The connections as a sparse CSR matrix, see ``to_coo``"
+        return self._connectivity.to_csr(*data)
+
+    def to_csc(self, *data):
+        "The connections as a sparse CSC matrix, see ``to_coo``"
+        return self._connectivity.to_csc(*data)
+
     @classmethod
-    def from_port_connection(self, port_conn, projection, component_arrays):
+    def from_port_connection(self, port_conn, projection, component_arrays,
+                             connection_arrays=None):
+        """
+        Creates the connection group for a port connection of a projection
+
+        Parameters
+        ----------
+        port_conn : BasePortConnection
+            The port connection
+        projection : Projection
+            The projection the port connection belongs to
+        component_arrays : dict(str, ComponentArray)
+            The component arrays the populations and projections have been
+            flattened to, keyed by their names
+        connection_arrays : tuple(numpy.ndarray) | None
+            The source and destination indices of the connections of the
+            projection, which are generated from its connectivity if not
+            provided (see Network.flatten)
+        """
         if isinstance(port_conn, EventPortConnection):
-            cls = AnalogConnectionGroup
-        else:
             cls = EventConnectionGroup
+        else:
+            cls = AnalogConnectionGroup
         name = '__'.join((
             projection.name, port_conn.sender_role,
             port_conn.send_port_name, port_conn.receiver_role,
@@ -101,28 +188,34 @@ class BaseConnectionGroup(
                 name=name + '_connectivity',
                 definition=one_to_one_connection_rule)
         else:
+            if connection_arrays is None:
+                connection_arrays = projection.connectivity.connection_arrays()
             if (port_conn.sender_role == 'pre' and
                     port_conn.receiver_role == 'post'):
-                source_inds, dest_inds = list(zip(*projection.connections()))
+                source_inds, dest_inds = connection_arrays
             elif (port_conn.sender_role == 'post' and
                   port_conn.receiver_role == 'pre'):
-                source_inds, dest_inds = list(zip(*(
-                    (d, s) for s, d in projection.connections())))
-            elif port_conn.sender_role == 'pre':
-                source_inds, dest_inds = list(zip(*(
-                    (s, i) for i, (s, _) in enumerate(
-                        sorted(projection.connections())))))
-            elif port_conn.receiver_role == 'post':
-                source_inds, dest_inds = list(zip(*(
-                    (i, d) for i, (_, d) in enumerate(
-                        sorted(projection.connections())))))
+                # The reverse connections in the same order (without copying
+                # the arrays), as in InverseConnectivity
+                dest_inds, source_inds = connection_arrays
             else:
-                assert False
+                # The synapses are indexed in the order of their connections
+                # sorted by source then destination
+                sources, destinations = connection_arrays
+                order = numpy.lexsort((destinations, sources))
+                synapses = numpy.arange(len(order), dtype=INDEX)
+                if port_conn.sender_role == 'pre':
+                    source_inds, dest_inds = sources[order], synapses
+                elif port_conn.receiver_role == 'post':
+                    source_inds, dest_inds = synapses, destinations[order]
+                else:
+                    assert False
             conn_props = ConnectionRuleProperties(
                 name=name + '_connectivity',
                 definition=explicit_connection_rule,
-                properties={'sourceIndices': source_inds,
-                            'destinationIndices': dest_inds})
+                properties={'sourceIndices': ArrayValue.indices(source_inds),
+                            'destinationIndices': ArrayValue.indices(
+                                dest_inds)})
         # FIXME: This will need to change in version 2, when each connection
         #        has its own delay
         if port_conn.sender_role == 'pre':
@@ -1,15 +1,33 @@
 from builtins import zip
 from builtins import range
+import os
 import sys
+import shutil
+import hashlib
+from operator import attrgetter
 from itertools import chain, product
 import math
 from abc import ABCMeta, abstractmethod
 from itertools import repeat
-from random import Random, randint
+from random import randint
+import numpy
+from numpy.lib import format as npy_format
 from nineml.base import BaseNineMLObject
 from nineml.exceptions import NineMLUsageError, NineMLUsageError
 from nineml.user.component import Component
+from nineml.units import Quantity
+from nineml.values import BaseValue
+from nineml.utils.random_streams import RandomStreams
 from future.utils import with_metaclass
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+
+# The integer type of the connection index arrays
+INDEX = numpy.int64
+INDEX_BYTES = numpy.dtype(INDEX).itemsize
 
 
 class ConnectionRuleProperties(Component):
@@ -39,6 +57,9 @@ class BaseConnectivity(with_metaclass(ABCMeta, BaseNineMLObject)):
     nineml_attr = ('source_size', 'destination_size')
     nineml_child = {'rule_properties': ConnectionRuleProperties}
 
+    # The number of connections in each chunk of connection_chunks by default
+    default_chunk_size = 2 ** 20
+
     def __init__(self, rule_properties, source_size,
                  destination_size, **kwargs):  # @UnusedVariable
         if (rule_properties.lib_type == 'OneToOne' and
@@ -99,15 +120,253 @@ class BaseConnectivity(with_metaclass(ABCMeta, BaseNineMLObject)):
     def has_been_sampled(self):
         pass
 
+    def connection_arrays(self):
+        """
+        Returns the source and destination indices of all the connections
+        as a pair of int64 numpy arrays, ordered as they are by
+        `connections`
+        """
+        indices = numpy.fromiter(chain.from_iterable(self.connections()),
+                                 dtype=INDEX)
+        return indices[0::2], indices[1::2]
+
+    def connection_chunks(self, chunk_size=None, max_memory=None):
+        """
+        Iterates over the connections in chunks of source and destination
+        index arrays, in the order of `connections`, so that they can be
+        streamed (e.g. into a simulator or a file) without holding all of
+        them in memory at once.
+
+        Parameters
+        ----------
+        chunk_size : int | None
+            The number of connections in each chunk (except the last, which
+            may be smaller). Defaults to ``default_chunk_size``
+        max_memory : int | None
+            The maximum number of bytes of the index arrays of each chunk,
+            which limits the chunk size if provided
+        """
+        chunk_size = self._chunk_size(chunk_size, max_memory,
+                                      2 * INDEX_BYTES)
+        return self._rechunk(self._connection_blocks(chunk_size), chunk_size)
+
+    def _connection_blocks(self, block_size):  # @UnusedVariable
+        """
+        Generates the connections in blocks of source and destination index
+        arrays, which should contain approximately block_size connections
+        """
+        yield self.connection_arrays()
+
+    def out_degrees(self, exact=False):
+        """
+        Returns the number of connections from each source
+
+        Parameters
+        ----------
+        exact : bool
+            Whether the degrees of random connection rules are counted from
+            the (streamed) connections instead of being sampled from their
+            distribution, which is O(N) in the size of the source and
+            destination arrays
+        """
+        return self._degrees(exact)[0]
+
+    def in_degrees(self, exact=False):
+        """
+        Returns the number of connections to each destination. See
+        `out_degrees` for the exact argument
+        """
+        return self._degrees(exact)[1]
+
+    def num_connections(self, exact=False):
+        """
+        Returns the number of connections. See `out_degrees` for the exact
+        argument
+        """
+        return int(self._degrees(exact)[1].sum())
+
+    def memory_estimate(self, bytes_per_connection=2 * INDEX_BYTES,
+                        exact=False):
+        """
+        Returns an estimate of the number of bytes required to hold the
+        connections, by default as a pair of index arrays. Additional bytes
+        per connection can be included for weights and delays. See
+        `out_degrees` for the exact argument
+        """
+        return self.num_connections(exact=exact) * bytes_per_connection
+
+    def _degrees(self, exact):  # @UnusedVariable
+        "Counts the out- and in-degrees from the streamed connections"
+        out_degrees = numpy.zeros(self.source_size, dtype=INDEX)
+        in_degrees = numpy.zeros(self.destination_size, dtype=INDEX)
+        for sources, destinations in self.connection_chunks():
+            out_degrees += numpy.bincount(sources,
+                                          minlength=self.source_size)
+            in_degrees += numpy.bincount(destinations,
+                                         minlength=self.destination_size)
+        return out_degrees, in_degrees
+
+    @classmethod
+    def _chunk_size(cls, chunk_size, max_memory, bytes_per_connection):
+        if max_memory is not None:
+            limit = max(1, int(max_memory // bytes_per_connection))
+            chunk_size = limit if chunk_size is None else min(chunk_size,
+                                                              limit)
+        elif chunk_size is None:
+            chunk_size = cls.default_chunk_size
+        if chunk_size < 1:
+            raise NineMLUsageError(
+                "Chunk size must be positive ({})".format(chunk_size))
+        return int(chunk_size)
+
+    @classmethod
+    def _rechunk(cls, blocks, chunk_size):
+        "Splits and joins the blocks of connections into fixed-size chunks"
+        pending = []
+        num_pending = 0
+        for sources, destinations in blocks:
+            while len(sources):
+                num_taken = chunk_size - num_pending
+                pending.append((sources[:num_taken],
+                                destinations[:num_taken]))
+                num_pending += len(pending[-1][0])
+                sources = sources[num_taken:]
+                destinations = destinations[num_taken:]
+                if num_pending == chunk_size:
+                    yield cls._concatenate(*zip(*pending))
+                    pending = []
+                    num_pending = 0
+        if pending:
+            yield cls._concatenate(*zip(*pending))
+
+    @classmethod
+    def _concatenate(cls, sources, destinations):
+        if not sources:
+            return numpy.empty(0, dtype=INDEX), numpy.empty(0, dtype=INDEX)
+        elif len(sources) == 1:
+            return sources[0], destinations[0]
+        return numpy.concatenate(sources), numpy.concatenate(destinations)
+
+    def to_coo(self, *data):
+        """
+        Returns the connections as a (source x destination) SciPy sparse
+        matrix in coordinate (COO) format, with the entries in the order of
+        `connections`.
+
+        Parameters
+        ----------
+        data : Property | Quantity | BaseValue | numpy.ndarray
+            Values of each connection (e.g. weights or delays) to use as the
+            data of the matrix, where single values are broadcast to all
+            connections and array values must be in the order of
+            `connections`. Quantities are expressed in their own units. If
+            no data is provided the entries of the matrix are ones, and if
+            multiple data are provided a list of matrices is returned (one
+            for each)
+        """
+        sources, destinations = self.connection_arrays()
+        return self._sparse_matrices(
+            data, sources.size,
+            lambda values: sparse.coo_matrix(
+                (values, (sources, destinations)), shape=self._shape))
+
+    def to_csr(self, *data):
+        """
+        Returns the connections as a (source x destination) SciPy sparse
+        matrix in compressed sparse row (CSR) format. Repeated connections
+        between the same source and destination (e.g. from random fan-in
+        rules) are kept as separate entries. See `to_coo` for the data
+        arguments.
+        """
+        sources, destinations = self.connection_arrays()
+        order, indptr = self._compress(sources, self.source_size)
+        indices = destinations[order]
+        return self._sparse_matrices(
+            data, sources.size,
+            lambda values: sparse.csr_matrix(
+                (values[order], indices, indptr), shape=self._shape))
+
+    def to_csc(self, *data):
+        """
+        Returns the connections as a (source x destination) SciPy sparse
+        matrix in compressed sparse column (CSC) format. Repeated connections
+        between the same source and destination are kept as separate
+        entries. See `to_coo` for the data arguments.
+        """
+        sources, destinations = self.connection_arrays()
+        order, indptr = self._compress(destinations, self.destination_size)
+        indices = sources[order]
+        return self._sparse_matrices(
+            data, sources.size,
+            lambda values: sparse.csc_matrix(
+                (values[order], indices, indptr), shape=self._shape))
+
+    @property
+    def _shape(self):
+        return (self.source_size, self.destination_size)
+
+    @classmethod
+    def _compress(cls, indices, size):
+        """
+        Returns the order that sorts the connections by the given indices
+        (stably) and the offsets of each index in the sorted connections
+        """
+        order = numpy.argsort(indices, kind='stable')
+        indptr = numpy.zeros(size + 1, dtype=INDEX)
+        numpy.cumsum(numpy.bincount(indices, minlength=size),
+                     out=indptr[1:])
+        return order, indptr
+
+    @classmethod
+    def _sparse_matrices(cls, data, num_connections, create):
+        if sparse is None:
+            raise NineMLUsageError(
+                "SciPy is required to export connectivity to sparse matrices")
+        if not data:
+            return create(numpy.ones(num_connections))
+        matrices = [create(connection_values(d, num_connections))
+                    for d in data]
+        return matrices[0] if len(matrices) == 1 else matrices
+
 
 class Connectivity(BaseConnectivity):
     """
     A reference implementation of the Connectivity class.
+
+    The random connections are drawn from independent counter-based streams
+    for each block of `stream_size` destinations (or sources for the
+    RandomFanOut rule), which are keyed by the random seed and the index of
+    the block (see RandomStreams). The connections to a subset of the
+    destinations, e.g. those simulated on one rank of a distributed
+    simulation, can therefore be generated without generating the rest, and
+    the union of the subsets is identical to the connections generated in a
+    single process.
+
+    The order of the connections (which array values of weights and delays
+    follow) doesn't depend on the stream size: Probabilistic and RandomFanIn
+    connections are ordered by destination, and RandomFanOut connections by
+    source. Probabilistic connections to the same destination are ordered by
+    source. Like the seed, the stream size determines which random
+    connections are drawn, so it shouldn't be changed between runs that
+    need the same connections.
     """
     nineml_type = '_Connectivity'
 
+    # The approximate maximum number of connections that are generated at once
+    # (before they are concatenated by connection_arrays)
+    max_block_size = 2 ** 22
+    # The number of destinations (or sources) that share a random stream
+    stream_size = 1024
+    _random_streams = None
+    _explicit_indices = None
+    # The (read-only) connection arrays along with the sizes and properties
+    # of the rule they were generated for (see connection_arrays)
+    _arrays = None
+
     def __init__(self, rule_properties, source_size,
                  destination_size, random_seed=None, rng_cls=None,
+                 destinations=None, rank=None, num_ranks=None, cache=None,
+                 allow_duplicates=True, stream_name=None,
                  **kwargs):  # @UnusedVariable
         """
         Parameters
@@ -125,16 +384,80 @@ class Connectivity(BaseConnectivity):
         rng_cls : random generator class (i.e. random.Random) | None
             Class for the random generator. Can be any random generator that
             implements the 'random' method to return a float between 0 and 1
-            (e.g. numpy.Random). If not supplied then random.Random is used
+            (e.g. random.Random), in which case the connections are generated
+            one at a time. If not supplied then the connections are generated
+            in arrays by a numpy.random.Generator. NB: the default used to
+            be random.Random, so the connections drawn for a given seed
+            differ from those of earlier versions unless
+            rng_cls=random.Random is passed explicitly
+        destinations : iterable(int) | None
+            Indices of the destinations to generate the connections to (all
+            destinations if None)
+        rank : int | None
+            Rank of the process in a distributed simulation, which only
+            generates the connections to its own contiguous partition of the
+            destinations. Requires num_ranks and can't be used with
+            destinations
+        num_ranks : int | None
+            Number of processes the destinations are partitioned between
+        cache : ConnectivityCache | str | None
+            A cache (or the path of its directory) to load the connections
+            of random connection rules from, or save them to after they are
+            generated
+        allow_duplicates : bool
+            Whether the indices of Explicit connection rules may contain
+            repeated source-destination pairs
+        stream_name : str | None
+            The name the random streams are keyed by along with the seed, so
+            that connectivities that share a seed (e.g. of different
+            projections) draw different connections. Defaults to the name of
+            the rule properties (Projection passes its own name)
         """
         super(Connectivity, self).__init__(
             rule_properties, source_size, destination_size)
         if random_seed is None:
             random_seed = randint(0, sys.maxsize)
         self._seed = random_seed
-        if rng_cls is None:
-            rng_cls = Random
+        if stream_name is None:
+            stream_name = rule_properties.name
+        self._stream_name = stream_name
         self._rng_cls = rng_cls
+        if rank is not None or num_ranks is not None:
+            if destinations is not None:
+                raise NineMLUsageError(
+                    "Cannot provide both destinations and a rank partition to "
+                    "Connectivity")
+            if rank is None or num_ranks is None or not 0 <= rank < num_ranks:
+                raise NineMLUsageError(
+                    "Invalid rank partition ({} of {})".format(rank,
+                                                                num_ranks))
+            destinations = numpy.arange(
+                rank * destination_size // num_ranks,
+                (rank + 1) * destination_size // num_ranks, dtype=INDEX)
+        elif destinations is not None:
+            destinations = numpy.unique(numpy.asarray(destinations,
+                                                      dtype=INDEX))
+            if destinations.size and (
+                    destinations[0] < 0 or
+                    destinations[-1] >= destination_size):
+                raise NineMLUsageError(
+                    "Destination indices must be between 0 and {}".format(
+                        destination_size - 1))
+        self._destinations = destinations
+        if cache is not None and not isinstance(cache, ConnectivityCache):
+            cache = ConnectivityCache(cache)
+        self._cache = cache
+        self._allow_duplicates = allow_duplicates
+        if self.lib_type == 'Explicit':
+            self._explicit_indices = self._validate_explicit_indices()
+
+    @property
+    def destinations(self):
+        """
+        The (sorted) indices of the destinations the connections are
+        generated to, or None if they are generated to all destinations
+        """
+        return self._destinations
 
     def connections(self):
         """
@@ -143,6 +466,334 @@ class Connectivity(BaseConnectivity):
         `src`  -- the indices to get the connections from
         `dest` -- the indices to get the connections to
         """
+        if self._rng_cls is not None:
+            conns = self._sequential_connections()
+            if self._destinations is not None:
+                local = set(self._destinations.tolist())
+                conns = ((s, d) for s, d in conns if d in local)
+            return conns
+        # Stream the connections a chunk at a time
+        return chain.from_iterable(zip(s.tolist(), d.tolist())
+                                   for s, d in self.connection_chunks())
+
+    def connection_arrays(self):
+        """
+        Returns the source and destination indices of all the connections
+        as a pair of int64 numpy arrays, ordered as they are by
+        `connections`. The arrays are generated the first time they are
+        required and then shared (read-only) with the other methods of the
+        connectivity and its inverse until the sizes or the properties of
+        the rule change
+        """
+        arrays = self._memoized_arrays()
+        if arrays is None:
+            if self._rng_cls is not None:
+                arrays = super(Connectivity, self).connection_arrays()
+            elif self._cache is not None:
+                arrays = self._cache.connection_arrays(
+                    self, self._generate_arrays,
+                    lambda: self._generate_blocks(self.max_block_size))
+            else:
+                arrays = self._generate_arrays()
+            for array in arrays:
+                array.flags.writeable = False
+            self._arrays = (self._rule_state(), arrays)
+        return arrays
+
+    def _rule_state(self):
+        return ((self._source_size, self._destination_size),
+                tuple(self._rule_properties.properties))
+
+    def _memoized_arrays(self):
+        """
+        Returns the memoized connection arrays if they were generated for
+        the current sizes and (identical) property objects of the rule,
+        otherwise None
+        """
+        if self._arrays is None:
+            return None
+        (sizes, properties), arrays = self._arrays
+        current_sizes, current_properties = self._rule_state()
+        if (sizes != current_sizes or
+                len(properties) != len(current_properties) or
+                any(p is not c
+                    for p, c in zip(properties, current_properties))):
+            self._arrays = None
+            return None
+        return arrays
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def allow_duplicates(self):
+        return self._allow_duplicates
+
+    @property
+    def stream_name(self):
+        return self._stream_name
+
+    def _generate_arrays(self):
+        blocks = list(self._generate_blocks(self.max_block_size))
+        return self._concatenate([s for s, _ in blocks],
+                                 [d for _, d in blocks])
+
+    def _connection_blocks(self, block_size):
+        if self._memoized_arrays() is not None or self._rng_cls is not None:
+            return super(Connectivity, self)._connection_blocks(block_size)
+        if (self._cache is not None and
+                self.lib_type in self._cache.cached_types):
+            # Slice the blocks from the (memory-mapped) cached arrays, which
+            # are streamed to the cache first if they aren't cached
+            sources, destinations = self.connection_arrays()
+            return ((sources[i:i + block_size], destinations[i:i + block_size])
+                    for i in range(0, len(sources), block_size))
+        return self._generate_blocks(block_size)
+
+    def _generate_blocks(self, block_size):
+        if self.lib_type == 'AllToAll':
+            blocks = self._all_to_all_blocks(block_size)
+        elif self.lib_type == 'OneToOne':
+            blocks = self._one_to_one_blocks(block_size)
+        elif self.lib_type == 'Explicit':
+            blocks = self._explicit_connection_blocks(block_size)
+        elif self.lib_type == 'Probabilistic':
+            blocks = self._probabilistic_connectivity_blocks(block_size)
+        elif self.lib_type == 'RandomFanIn':
+            blocks = self._random_fan_in_blocks(block_size)
+        elif self.lib_type == 'RandomFanOut':
+            blocks = self._random_fan_out_blocks(block_size)
+        else:
+            assert False
+        return blocks
+
+    def _generator(self, stream):
+        """
+        Returns a generator for the given stream, reinitialized with the
+        same seed each time so that it selects the same connections
+        """
+        if self._random_streams is None:
+            self._random_streams = RandomStreams(self._seed,
+                                                 self._stream_name)
+        return self._random_streams.generator(stream)
+
+    def _streams(self, size, indices=None):
+        """
+        Returns the stream index and the start and stop of the range of
+        indices it covers for each stream that contains one of the indices
+        (or all streams if indices is None)
+        """
+        if indices is None:
+            streams = range((size + self.stream_size - 1) // self.stream_size)
+        else:
+            streams = numpy.unique(indices // self.stream_size).tolist()
+        return [(i, i * self.stream_size,
+                 min((i + 1) * self.stream_size, size)) for i in streams]
+
+    def _local_destinations(self):
+        if self._destinations is None:
+            return numpy.arange(self._destination_size, dtype=INDEX)
+        return self._destinations
+
+    def _select_local(self, sources, destinations):
+        "Selects the connections to the local destinations"
+        if self._destinations is not None:
+            local = numpy.isin(destinations, self._destinations)
+            sources = sources[local]
+            destinations = destinations[local]
+        return sources, destinations
+
+    def _all_to_all_blocks(self, block_size):
+        local = self._local_destinations()
+        if not len(local):
+            return
+        num_rows = max(1, block_size // len(local))
+        for start in range(0, self._source_size, num_rows):
+            stop = min(start + num_rows, self._source_size)
+            yield (numpy.repeat(numpy.arange(start, stop, dtype=INDEX),
+                                len(local)),
+                   numpy.tile(local, stop - start))
+
+    def _one_to_one_blocks(self, block_size):
+        assert self._source_size == self._destination_size
+        local = self._local_destinations()
+        for start in range(0, len(local), block_size):
+            indices = local[start:start + block_size]
+            yield indices.copy(), indices.copy()
+
+    def _explicit_connection_blocks(self, block_size):  # @UnusedVariable
+        # The indices are already held in memory by the properties
+        yield self._select_local(*self._explicit_indices)
+
+    def _validate_explicit_indices(self):
+        """
+        Converts the source and destination indices of an Explicit connection
+        rule to integer arrays (without copying them if they are already held
+        as int64 arrays) and checks them in bulk
+        """
+        indices = []
+        for name, size in (('sourceIndices', self._source_size),
+                           ('destinationIndices', self._destination_size)):
+            values = numpy.asarray(
+                self._rule_properties.property(name).value.values)
+            if values.ndim != 1:
+                raise NineMLUsageError(
+                    "'{}' of '{}' must be a one-dimensional array".format(
+                        name, self._rule_properties.name))
+            if values.dtype.kind in 'iu':
+                array = values.astype(INDEX, copy=False)
+            else:
+                array = values.astype(INDEX)
+                if not numpy.array_equal(array, values):
+                    raise NineMLUsageError(
+                        "'{}' of '{}' contains non-integer values".format(
+                            name, self._rule_properties.name))
+            if array.size and (array.min() < 0 or array.max() >= size):
+                raise NineMLUsageError(
+                    "'{}' of '{}' must be between 0 and {} (found {} to {})"
+                    .format(name, self._rule_properties.name, size - 1,
+                            array.min(), array.max()))
+            indices.append(array)
+        sources, destinations = indices
+        if len(sources) != len(destinations):
+            raise NineMLUsageError(
+                "Lengths of 'sourceIndices' ({}) and 'destinationIndices' "
+                "({}) of '{}' don't match".format(
+                    len(sources), len(destinations),
+                    self._rule_properties.name))
+        if not self._allow_duplicates:
+            pairs = sources * self._destination_size + destinations
+            if numpy.unique(pairs).size != pairs.size:
+                raise NineMLUsageError(
+                    "'{}' contains duplicate connections".format(
+                        self._rule_properties.name))
+        return sources, destinations
+
+    def _probabilistic_connectivity_blocks(self, block_size):
+        p = float(self._rule_properties.property('probability').value)
+        if p <= 0.0 or not self._source_size:
+            return
+        elif p >= 1.0:
+            local = self._local_destinations()
+            num_rows = max(1, block_size // self._source_size)
+            for start in range(0, len(local), num_rows):
+                destinations = local[start:start + num_rows]
+                yield (numpy.tile(numpy.arange(self._source_size, dtype=INDEX),
+                                  len(destinations)),
+                       numpy.repeat(destinations, self._source_size))
+            return
+        # The pairs of each stream are destination-major, so the connections
+        # are ordered by destination then source whatever the stream size
+        for stream, start, stop in self._streams(self._destination_size,
+                                                 self._destinations):
+            for pair_indices in self._geometric_blocks(
+                    self._generator(stream), p,
+                    self._source_size * (stop - start), block_size):
+                yield self._select_local(
+                    pair_indices % self._source_size,
+                    pair_indices // self._source_size + start)
+
+    @classmethod
+    def _geometric_blocks(cls, rng, p, num_pairs, block_size):
+        """
+        Draws the gaps between successive connections in the
+        (destination-major) list of source-destination pairs from a geometric
+        distribution so that the cost scales with the number of connections
+        made instead of the number of pairs. The gaps are drawn in blocks
+        sized to cover the expected number of connections (up to block_size)
+        """
+        block_size = int(min(p * num_pairs * 1.01 + 100, block_size))
+        last = -1
+        while last < num_pairs:
+            pair_indices = last + numpy.cumsum(
+                rng.geometric(p, size=block_size).astype(INDEX))
+            last = pair_indices[-1]
+            if last >= num_pairs:
+                pair_indices = pair_indices[
+                    :numpy.searchsorted(pair_indices, num_pairs)]
+            yield pair_indices
+
+    def _random_fan_in_blocks(self, block_size):
+        N = int(self._rule_properties.property('number').value)
+        num_rows = max(1, block_size // max(N, 1))
+        for stream, start, stop in self._streams(self._destination_size,
+                                                 self._destinations):
+            rng = self._generator(stream)
+            # Successive draws from the stream continue the same sequence
+            for row_start in range(start, stop, num_rows):
+                row_stop = min(row_start + num_rows, stop)
+                yield self._select_local(
+                    rng.integers(self._source_size,
+                                 size=(row_stop - row_start) * N,
+                                 dtype=INDEX),
+                    numpy.repeat(numpy.arange(row_start, row_stop,
+                                              dtype=INDEX), N))
+
+    def _random_fan_out_blocks(self, block_size):
+        N = int(self._rule_properties.property('number').value)
+        num_rows = max(1, block_size // max(N, 1))
+        # The destinations of each source are drawn from the streams of the
+        # sources so all of them need to be drawn
+        for stream, start, stop in self._streams(self._source_size):
+            rng = self._generator(stream)
+            for row_start in range(start, stop, num_rows):
+                row_stop = min(row_start + num_rows, stop)
+                yield self._select_local(
+                    numpy.repeat(numpy.arange(row_start, row_stop,
+                                              dtype=INDEX), N),
+                    rng.integers(self._destination_size,
+                                 size=(row_stop - row_start) * N,
+                                 dtype=INDEX))
+
+    def _degrees(self, exact):
+        out_degrees = numpy.zeros(self._source_size, dtype=INDEX)
+        in_degrees = numpy.zeros(self._destination_size, dtype=INDEX)
+        local = self._local_destinations()
+        if self.lib_type == 'AllToAll':
+            out_degrees[:] = len(local)
+            in_degrees[local] = self._source_size
+            return out_degrees, in_degrees
+        elif self.lib_type == 'OneToOne':
+            out_degrees[local] = 1
+            in_degrees[local] = 1
+            return out_degrees, in_degrees
+        elif self.lib_type == 'Explicit' or exact:
+            return super(Connectivity, self)._degrees(exact)
+        # Sample the degrees of the random side(s) of the connection rule
+        # from their distributions with a fixed seed
+        rng = RandomStreams(self._seed,
+                            self._stream_name + '__degrees').generator(0)
+        if self.lib_type == 'Probabilistic':
+            p = min(max(float(
+                self._rule_properties.property('probability').value), 0.0),
+                1.0)
+            in_degrees[local] = rng.binomial(self._source_size, p,
+                                             size=len(local))
+        elif self.lib_type == 'RandomFanIn':
+            in_degrees[local] = int(
+                self._rule_properties.property('number').value)
+        elif self.lib_type == 'RandomFanOut':
+            N = int(self._rule_properties.property('number').value)
+            in_degrees[:] = rng.multinomial(
+                self._source_size * N,
+                numpy.full(self._destination_size,
+                           1.0 / self._destination_size))
+            if self._destinations is None:
+                out_degrees[:] = N
+                return out_degrees, in_degrees
+            in_degrees[numpy.isin(numpy.arange(self._destination_size),
+                                  local, invert=True)] = 0
+        else:
+            assert False
+        # The sources of the connections are uniformly distributed
+        if self._source_size:
+            out_degrees[:] = rng.multinomial(
+                in_degrees.sum(),
+                numpy.full(self._source_size, 1.0 / self._source_size))
+        return out_degrees, in_degrees
+
+    def _sequential_connections(self):
         if self.lib_type == 'AllToAll':
             conn = self._all_to_all()
         elif self.lib_type == 'OneToOne':
@@ -168,19 +819,19 @@ class Connectivity(BaseConnectivity):
         return ((i, i) for i in range(self._source_size))
 
     def _explicit_connection_list(self):  # @UnusedVariable
-        return zip(
-            self._rule_properties.property('sourceIndices').value.values,
-            self._rule_properties.property('destinationIndices').value.values)
+        return zip(*(a.tolist() for a in self._explicit_indices))
 
     def _probabilistic_connectivity(self):  # @UnusedVariable
         # Reinitialize the connectivity generator with the same RNG so that
         # it selects the same numbers
         rng = self._rng_cls(self._seed)
         p = float(self._rule_properties.property('probability').value)
-        # Get an iterator over all of the source dest pairs to test
-        return chain(*(((s, d) for d in range(self._destination_size)
-                        if rng.random() < p)
-                       for s in range(self._source_size)))
+        # Get an iterator over all of the source dest pairs to test (chained
+        # lazily so that each source index is bound when its pairs are tested)
+        return chain.from_iterable(
+            ((s, d) for d in range(self._destination_size)
+             if rng.random() < p)
+            for s in range(self._source_size))
 
     def _random_fan_in(self):  # @UnusedVariable
         N = int(self._rule_properties.property('number').value)
@@ -211,17 +862,226 @@ class Connectivity(BaseConnectivity):
         return True  # Because seed and RNG class is set at start
 
 
-class InverseConnectivity(BaseNineMLObject):
+class ConnectivityCache(object):
+    """
+    A directory of the index arrays generated by random connection rules
+    (i.e. Probabilistic, RandomFanIn and RandomFanOut), keyed by a hash of
+    the connection rule properties, the source and destination sizes, the
+    random seed and the destinations they were generated for. The arrays
+    are stored as .npy files, which are memory-mapped (read-only) when they
+    are loaded, so repeated runs with the same connectivity (e.g. parameter
+    sweeps that only change cell parameters) don't need to regenerate it.
+
+    Parameters
+    ----------
+    directory : str
+        The path of the cache directory, which is created if it doesn't
+        exist
+    """
+
+    # Incremented when the generation of the connections changes so that
+    # previously cached connectivity isn't used
+    generation_version = 2
+    cached_types = ('Probabilistic', 'RandomFanIn', 'RandomFanOut')
+    # The number of bytes copied at a time when the cached files are written
+    copy_size = 2 ** 24
+
+    def __init__(self, directory):
+        self._directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def key(self, connectivity):
+        "A stable hash of the parameters that determine the connections"
+        digest = hashlib.sha1()
+        for part in (self.generation_version, connectivity.lib_type,
+                     connectivity.rule.standard_library,
+                     connectivity.source_size, connectivity.destination_size,
+                     connectivity._seed, connectivity.stream_name,
+                     connectivity.stream_size):
+            digest.update(repr(part).encode('utf-8'))
+        for prop in sorted(connectivity.rule_properties.properties,
+                           key=attrgetter('name')):
+            value = prop.quantity.value
+            digest.update(prop.name.encode('utf-8'))
+            if value.is_single():
+                digest.update(repr(float(value.value)).encode('utf-8'))
+            elif value.is_array():
+                digest.update(numpy.asarray(value.values,
+                                            dtype=float).tobytes())
+            else:
+                digest.update(repr(value).encode('utf-8'))
+            digest.update(repr((prop.units.name, prop.units.power)).encode(
+                'utf-8'))
+        if connectivity.destinations is not None:
+            digest.update(connectivity.destinations.tobytes())
+        return digest.hexdigest()
+
+    def paths(self, key):
+        "The paths of the source and destination index files of a key"
+        return tuple(os.path.join(self._directory,
+                                  '{}_{}.npy'.format(key, name))
+                     for name in ('sources', 'destinations'))
+
+    def __contains__(self, connectivity):
+        return all(os.path.exists(p)
+                   for p in self.paths(self.key(connectivity)))
+
+    def load(self, connectivity):
+        """
+        Returns the memory-mapped source and destination indices of the
+        connectivity if they are cached, otherwise None
+        """
+        try:
+            return tuple(numpy.load(p, mmap_mode='r')
+                         for p in self.paths(self.key(connectivity)))
+        except IOError:
+            return None
+
+    def save(self, connectivity, sources, destinations):
+        "Saves the connections of the connectivity"
+        self.save_blocks(connectivity, [(sources, destinations)])
+
+    def save_blocks(self, connectivity, blocks):
+        """
+        Saves the connections of the connectivity from blocks of source and
+        destination indices, which are appended to raw files as they are
+        generated so that only one block is held in memory at a time. The
+        .npy files are then written from the raw files in chunks of
+        ``copy_size`` bytes. Temporary files are written first so that
+        partially written files are never loaded
+        """
+        paths = self.paths(self.key(connectivity))
+        raw_paths = ['{}.{}.raw'.format(p, os.getpid()) for p in paths]
+        try:
+            num_connections = 0
+            with open(raw_paths[0], 'wb') as sources_file, \
+                    open(raw_paths[1], 'wb') as destinations_file:
+                for sources, destinations in blocks:
+                    numpy.asarray(sources, dtype=INDEX).tofile(sources_file)
+                    numpy.asarray(destinations, dtype=INDEX).tofile(
+                        destinations_file)
+                    num_connections += len(sources)
+            header = {'descr': npy_format.dtype_to_descr(numpy.dtype(INDEX)),
+                      'fortran_order': False, 'shape': (num_connections,)}
+            for path, raw_path in zip(paths, raw_paths):
+                tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+                with open(tmp_path, 'wb') as f, open(raw_path, 'rb') as raw:
+                    npy_format.write_array_header_1_0(f, header)
+                    shutil.copyfileobj(raw, f, self.copy_size)
+                os.rename(tmp_path, path)
+        finally:
+            for raw_path in raw_paths:
+                if os.path.exists(raw_path):
+                    os.remove(raw_path)
+
+    def connection_arrays(self, connectivity, generate, generate_blocks=None):
+        """
+        Returns the cached connections of the connectivity. If they aren't
+        cached the blocks returned by ``generate_blocks()`` are streamed to
+        the cache and then loaded (memory-mapped), so the full arrays are
+        never held in memory. Connectivity that isn't cached is generated by
+        ``generate()``, which is also used to generate the blocks if
+        ``generate_blocks`` isn't provided
+        """
+        if connectivity.lib_type not in self.cached_types:
+            return generate()
+        cached = self.load(connectivity)
+        if cached is None:
+            if generate_blocks is None:
+                self.save(connectivity, *generate())
+            else:
+                self.save_blocks(connectivity, generate_blocks())
+            cached = self.load(connectivity)
+        return cached
+
+    def clear(self):
+        "Removes all cached connectivity from the directory"
+        for fname in os.listdir(self._directory):
+            if fname.endswith('.npy'):
+                os.remove(os.path.join(self._directory, fname))
+
+
+def connection_values(value, num_connections, offset=None):
+    """
+    Returns the values of a property or quantity (e.g. weights or delays) for
+    each connection as a float array, broadcasting single values to all
+    connections and sampling random values
+
+    Parameters
+    ----------
+    value : Property | Quantity | BaseValue | numpy.ndarray | float
+        The value to expand. Quantities are expressed in their own units
+    num_connections : int
+        The number of connections
+    offset : int | None
+        The index of the first connection when the values of a chunk of the
+        connections are required, in which case array values only need to
+        cover the chunk
+    """
+    try:
+        value = value.quantity  # If a Property
+    except AttributeError:
+        pass
+    if isinstance(value, Quantity):
+        value = value.value
+    if isinstance(value, BaseValue):
+        if value.is_single():
+            value = value.value
+        elif value.is_array():
+            value = value.values
+        else:
+            value = numpy.fromiter(
+                (next(iter(value)) for _ in range(num_connections)),
+                dtype=float, count=num_connections)
+    value = numpy.asarray(value, dtype=float)
+    if value.ndim and offset is not None:
+        value = value[offset:offset + num_connections]
+    if value.ndim and len(value) != num_connections:
+        raise NineMLUsageError(
+            "Number of values ({}) does not match the number of connections "
+            "({})".format(len(value), num_connections))
+    return numpy.array(numpy.broadcast_to(value, (num_connections,)))
+
+
+class InverseConnectivity(BaseConnectivity):
     """
     Inverts the connectivity so that the source and destination are effectively
     flipped. Used when mapping a projection connectivity to a reverse
     connection to from the synapse or post-synaptic cell to the pre-synaptic
-    cell
+    cell.
+
+    The inverse is a transposed view of the forward connectivity, so the
+    connections are in the same order as the forward connections (i.e. the
+    i-th inverse connection is the i-th forward connection reversed). The
+    view doesn't hold any arrays of its own but reuses the (memoized) index
+    arrays of the forward connectivity, so a projection connected in both
+    directions only generates its connections once, and the compressed
+    sparse row (CSR) matrix of the inverse (i.e. the transpose of the
+    compressed sparse column matrix of the forward connectivity) is
+    compressed from the forward arrays without regenerating them.
+
+    Parameters
+    ----------
+    connectivity : BaseConnectivity
+        The forward connectivity
     """
     nineml_type = '_InverseConnectivity'
+    nineml_attr = ()
     nineml_child = {'connectivity': Connectivity}
 
-    def __init__(self, connectivity):  # @UnusedVariable
+    def __init__(self, connectivity, **kwargs):  # @UnusedVariable
+        if not isinstance(connectivity, BaseConnectivity):
+            raise NineMLUsageError(
+                "'connectivity' argument ({}) must be a BaseConnectivity "
+                "instance".format(connectivity))
+        super(InverseConnectivity, self).__init__(
+            connectivity.rule_properties, connectivity.destination_size,
+            connectivity.source_size)
         self._connectivity = connectivity
 
     @property
@@ -229,37 +1089,33 @@ class InverseConnectivity(BaseNineMLObject):
         return self._connectivity
 
     def __eq__(self, other):
-        return self._connectivity == other._connectivity
-
-    @property
-    def rule_properties(self):
-        return self._connectivity._rule_props
-
-    @property
-    def rule(self):
-        return self.rule_properties.component_class
-
-    @property
-    def lib_type(self):
-        return self.rule_properties.lib_type
+        try:
+            return self._connectivity == other._connectivity
+        except AttributeError:
+            return False
 
-    @property
-    def source_size(self):
-        return self._connectivity.destination_size
+    def connections(self):
+        return chain.from_iterable(zip(s.tolist(), d.tolist())
+                                   for s, d in self.connection_chunks())
 
-    @property
-    def destination_size(self):
-        return self._connectivity.source_size
+    def connection_arrays(self):
+        """
+        Returns the source and destination indices of the inverse
+        connections, which are the destination and source indices of the
+        forward connections
+        """
+        sources, destinations = self._connectivity.connection_arrays()
+        return destinations, sources
 
-    def __repr__(self):
-        return ("{}(rule={}, src_size={}, dest_size={})"
-                .format(self.__class__.__name__, self.lib_type,
-                        self.source_size, self.destination_size))
+    def has_been_sampled(self):
+        return self._connectivity.has_been_sampled()
 
-    @abstractmethod
-    def connections(self):
-        return ((j, i) for i, j in self._connectivity.connections)
+    def _connection_blocks(self, block_size):
+        # Stream the forward connections (which are sliced from the forward
+        # arrays if they have already been generated)
+        return ((d, s) for s, d in
+                self._connectivity._connection_blocks(block_size))
 
-    @abstractmethod
-    def has_been_sampled(self):
-        return self._connectivity.has_been_sampled
+    def _degrees(self, exact):
+        out_degrees, in_degrees = self._connectivity._degrees(exact)
+        return in_degrees, out_degrees
@@ -4,3 +4,4 @@ from .port_exposures import (
     AnalogReceivePortExposure, AnalogReducePortExposure, BasePortExposure,
     EventReceivePortExposure, AnalogSendPortExposure, EventSendPortExposure)
 from .namespace import append_namespace, split_namespace
+from .builder import MultiDynamicsBuilder
@@ -0,0 +1,199 @@
+"""
+An incremental builder of MultiDynamics objects, which checks each
+sub-component, port connection and port exposure as it is added instead of
+validating the complete flattened class in one go
+
+:copyright: Copyright 2010-2017 by the NineML Python team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from builtins import object
+from past.builtins import basestring
+from collections import OrderedDict
+from nineml.abstraction import Dynamics, AnalogReceivePort
+from nineml.exceptions import NineMLUsageError, name_error
+from nineml.utils import validate_identifier
+from ..port_connections import BasePortConnection
+from .dynamics import MultiDynamics, SubDynamics
+from .port_exposures import BasePortExposure
+
+
+class MultiDynamicsBuilder(object):
+    """
+    Accumulates the sub-components, port connections and port exposures of a
+    MultiDynamics object. Each addition is validated on its own, i.e. a
+    sub-component's class is validated the first time it is added and a port
+    connection or exposure is checked against the ports it refers to, so the
+    MultiDynamics object can be built without validating its flattened
+    regimes and expressions.
+
+    Parameters
+    ----------
+    name : str
+        The name of the MultiDynamics objects to build
+    validate_dimensions : bool
+        Whether to validate the dimensions of the sub-component classes and
+        of the built MultiDynamics object
+    """
+
+    def __init__(self, name, validate_dimensions=True):
+        self._name = validate_identifier(name)
+        self._validate_dimensions = validate_dimensions
+        self._sub_components = OrderedDict()
+        self._port_connections = OrderedDict()
+        self._port_exposures = OrderedDict()
+        # Analog receive ports, keyed by sub-component and port name, that
+        # need to be connected or exposed before the object can be built
+        self._unconnected = OrderedDict()
+        # Ids of the component classes that have been validated
+        self._validated_classes = set()
+
+    @property
+    def name(self):
+        return self._name
+
+    def __getitem__(self, comp_name):
+        return self._sub_components[comp_name]
+
+    @name_error
+    def sub_component(self, name):
+        return self._sub_components[name]
+
+    @property
+    def sub_components(self):
+        return iter(self._sub_components.values())
+
+    @property
+    def port_connections(self):
+        return iter(self._port_connections.values())
+
+    @property
+    def port_exposures(self):
+        return iter(self._port_exposures.values())
+
+    @property
+    def unconnected_analog_receive_ports(self):
+        """
+        The (sub-component name, port name) pairs of the analog receive
+        ports that are yet to be connected or exposed
+        """
+        return iter(self._unconnected.keys())
+
+    def add_sub_component(self, sub_component, component_class=None):
+        """
+        Adds a sub-component, given either as a SubDynamics object or a name
+        and a component class, validating the component class if it hasn't
+        been added already
+        """
+        if isinstance(sub_component, basestring):
+            sub_component = SubDynamics(sub_component, component_class)
+        if sub_component.name in self._sub_components:
+            raise NineMLUsageError(
+                "Sub-component '{}' has already been added to '{}' builder"
+                .format(sub_component.name, self.name))
+        comp_class = sub_component.component_class
+        if not isinstance(comp_class, Dynamics):
+            raise NineMLUsageError(
+                "Component class of sub-component '{}' must be a Dynamics "
+                "object not {}".format(sub_component.name, comp_class))
+        if id(comp_class) not in self._validated_classes:
+            comp_class.validate(validate_dimensions=self._validate_dimensions)
+            self._validated_classes.add(id(comp_class))
+        self._sub_components[sub_component.name] = sub_component
+        for port in comp_class.analog_receive_ports:
+            if isinstance(port, AnalogReceivePort):
+                self._unconnected[(sub_component.name, port.name)] = port
+        return sub_component
+
+    def connect(self, port_connection):
+        """
+        Adds a port connection, given either as a PortConnection object or a
+        (sender, send-port, receiver, receive-port) tuple, checking the ports
+        it connects
+        """
+        if isinstance(port_connection, tuple):
+            port_connection = BasePortConnection.from_tuple(port_connection,
+                                                            self)
+        if port_connection.key in self._port_connections:
+            raise NineMLUsageError(
+                "Port connection {} has already been added to '{}' builder"
+                .format(port_connection, self.name))
+        port_connection.bind(self)
+        self._claim_receive_port(port_connection.receiver_name,
+                                 port_connection.receive_port,
+                                 'connect {}'.format(port_connection))
+        self._port_connections[port_connection.key] = port_connection
+        return port_connection
+
+    def expose(self, port_exposure):
+        """
+        Adds a port exposure, given either as a PortExposure object or a
+        (sub-component, port[, name]) tuple, checking the port it exposes
+        """
+        if isinstance(port_exposure, tuple):
+            port_exposure = BasePortExposure.from_tuple(port_exposure, self)
+        lower_name = port_exposure.name.lower()
+        if any(e.name.lower() == lower_name
+               for e in self._port_exposures.values()):
+            raise NineMLUsageError(
+                "Port exposure name '{}' clashes with an existing exposure in "
+                "'{}' builder (names are case-insensitive)"
+                .format(port_exposure.name, self.name))
+        port_exposure.bind(self)
+        self._claim_receive_port(port_exposure.sub_component_name,
+                                 port_exposure.port,
+                                 'expose it as {}'.format(port_exposure.name))
+        self._port_exposures[port_exposure.name] = port_exposure
+        return port_exposure
+
+    def build(self, name=None, validate=False, **kwargs):
+        """
+        Builds a MultiDynamics object from the sub-components, port
+        connections and port exposures added so far.
+
+        Parameters
+        ----------
+        name : str | None
+            Name for the MultiDynamics object, the name of the builder is
+            used if None
+        validate : bool
+            Whether to also validate the flattened MultiDynamics object.
+            NB: the regime graph of the product of the sub-component regimes
+            is only checked if this is True (pruning the unreachable regimes
+            ensures that it is connected).
+        kwargs : dict
+            Keyword arguments passed to MultiDynamics.__init__ (e.g.
+            initial_regime and prune_unreachable_regimes)
+        """
+        if self._unconnected:
+            raise NineMLUsageError(
+                "Analog receive port(s) {} were not connected via a "
+                "port-connection or exposed via a port-exposure in '{}' "
+                "builder".format(
+                    ', '.join("'{}' in '{}'".format(p, sc)
+                              for sc, p in self._unconnected),
+                    self.name))
+        # Create new container objects so the MultiDynamics objects created by
+        # subsequent builds don't share them
+        return MultiDynamics(
+            name=(name if name is not None else self.name),
+            sub_components=[SubDynamics(sc.name, sc.component_class)
+                            for sc in self.sub_components],
+            port_connections=[pc.clone() for pc in self.port_connections],
+            port_exposures=[pe.clone() for pe in self.port_exposures],
+            validate_dimensions=self._validate_dimensions, validate=validate,
+            **kwargs)
+
+    def _claim_receive_port(self, sub_component_name, port, action):
+        """
+        Checks that a receive port hasn't already been connected or exposed
+        (unless it is a reduce port or an event port, which can receive from
+        multiple sources)
+        """
+        if isinstance(port, AnalogReceivePort):
+            try:
+                del self._unconnected[(sub_component_name, port.name)]
+            except KeyError:
+                raise NineMLUsageError(
+                    "Cannot {} as analog receive port '{}' in '{}' has "
+                    "already been connected or exposed".format(
+                        action, port.name, sub_component_name))
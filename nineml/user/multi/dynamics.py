@@ -18,6 +18,7 @@ from nineml.exceptions import (
 from ..port_connections import (
     AnalogPortConnection, EventPortConnection, BasePortConnection)
 from nineml.abstraction import BaseALObject
+from nineml.abstraction.expressions import reserved_identifiers
 import nineml.units as un
 from nineml.base import (
     ContainerObject, DocumentLevelObject, DynamicPortsObject)
@@ -53,6 +54,12 @@ class SubDynamics(BaseULObject, DynamicPortsObject):
     nineml_attr = ('name',)
     nineml_child = {'component_class': None}
 
+    # Namespace wrappers of the members of the component class and namespaced
+    # expressions, which are created once per member/expression (see _intern
+    # and namespace_expression)
+    _interned = None
+    _namespaced_exprs = None
+
     def __init__(self, name, component_class):
         assert isinstance(name, basestring)
         assert isinstance(component_class, Dynamics)
@@ -71,61 +78,94 @@ class SubDynamics(BaseULObject, DynamicPortsObject):
     def component_class(self):
         return self._component_class
 
+    def namespace_expression(self, expr):
+        """
+        Returns a copy of the expression with all free symbols (apart from
+        reserved identifiers) suffixed by the namespace of the sub-component,
+        which is memoized as the same expressions are namespaced each time
+        the regimes of the MultiDynamics object are generated
+        """
+        if self._namespaced_exprs is None:
+            self._namespaced_exprs = {}
+        try:
+            return self._namespaced_exprs[expr]
+        except KeyError:
+            namespaced = self._namespaced_exprs[expr] = expr.xreplace(dict(
+                (s, sympy.Symbol(self.append_namespace(s)))
+                for s in expr.free_symbols
+                if str(s) not in reserved_identifiers))
+            return namespaced
+
+    def _intern(self, wrapper_cls, element):
+        """
+        Returns the namespace wrapper of the element, which is only created
+        the first time it is requested (until the component class is
+        replaced)
+        """
+        if (self._interned is None or
+                self._interned[None] is not self._component_class):
+            self._interned = {None: self._component_class}
+        key = (wrapper_cls, id(element))
+        try:
+            wrapper = self._interned[key]
+        except KeyError:
+            wrapper = self._interned[key] = wrapper_cls(self, element, self)
+        return wrapper
+
     @property
     def parameters(self):
-        return (_NamespaceParameter(self, p, self)
+        return (self._intern(_NamespaceParameter, p)
                 for p in self.component_class.parameters)
 
     @property
     def aliases(self):
-        return (_NamespaceAlias(self, a, self)
+        return (self._intern(_NamespaceAlias, a)
                 for a in self.component_class.aliases)
 
     @property
     def state_variables(self):
-        return (_NamespaceStateVariable(self, v, self)
+        return (self._intern(_NamespaceStateVariable, v)
                 for v in self.component_class.state_variables)
 
     @property
     def constants(self):
-        return (_NamespaceConstant(self, p, self)
-                for p in self.component_class.constants)
+        return (self._intern(_NamespaceConstant, c)
+                for c in self.component_class.constants)
 
     @property
     def regimes(self):
-            return (_NamespaceRegime(self, r, self)
-                    for r in self.component_class.regimes)
+        return (self._intern(_NamespaceRegime, r)
+                for r in self.component_class.regimes)
 
     @name_error
     def parameter(self, name):
         elem_name, _ = split_namespace(name)
-        return _NamespaceParameter(
-            self, self.component_class.parameter(elem_name), self)
+        return self._intern(_NamespaceParameter,
+                            self.component_class.parameter(elem_name))
 
     @name_error
     def alias(self, name):
         elem_name, _ = split_namespace(name)
-        return _NamespaceAlias(self, self.component_class.alias(elem_name),
-                               self)
+        return self._intern(_NamespaceAlias,
+                            self.component_class.alias(elem_name))
 
     @name_error
     def state_variable(self, variable):
         elem_name, _ = split_namespace(variable)
-        return _NamespaceStateVariable(
-            self, self.component_class.state_variable(elem_name), self)
+        return self._intern(_NamespaceStateVariable,
+                            self.component_class.state_variable(elem_name))
 
     @name_error
     def constant(self, name):
         elem_name, _ = split_namespace(name)
-        return _NamespaceConstant(self,
-                                  self.component_class.constant(elem_name),
-                                  self)
+        return self._intern(_NamespaceConstant,
+                            self.component_class.constant(elem_name))
 
     @name_error
     def regime(self, name):
         elem_name, _ = split_namespace(name)
-        return _NamespaceRegime(self, self.component_class.regime(elem_name),
-                                self)
+        return self._intern(_NamespaceRegime,
+                            self.component_class.regime(elem_name))
 
     @property
     def num_parameters(self):
@@ -270,6 +310,10 @@ class MultiDynamics(Dynamics):
                        AnalogReducePortExposure, EventSendPortExposure,
                        EventReceivePortExposure)
 
+    # Lists and name-indexes of the flattened members, which are generated on
+    # first access (see _flat_members)
+    _flat_cache = None
+
     def __init__(self, name, sub_components, port_connections=None,
                  analog_port_connections=None, event_port_connections=None,
                  port_exposures=None,
@@ -278,12 +322,14 @@ class MultiDynamics(Dynamics):
                  event_receive_port_exposures=None,
                  analog_receive_port_exposures=None,
                  analog_reduce_port_exposures=None,
-                 validate_dimensions=True,
+                 validate_dimensions=True, initial_regime=None,
+                 prune_unreachable_regimes=False, validate=True,
                  **kwargs):
         self._name = validate_identifier(name)
         BaseALObject.__init__(self)
         DocumentLevelObject.__init__(self)
         ContainerObject.__init__(self)
+        self._flat_cache = {}
         # =====================================================================
         # Create the structures unique to MultiDynamics
         # =====================================================================
@@ -337,9 +383,16 @@ class MultiDynamics(Dynamics):
             port_connection.bind(self)
             self.add(port_connection)
 
+        # =====================================================================
+        # Set the regimes to only include those reachable from the initial
+        # regime if requested
+        # =====================================================================
+        self._initial_regime = initial_regime
+        self._prune_unreachable_regimes = prune_unreachable_regimes
         self.annotations.set((VALIDATION, PY9ML_NS), DIMENSIONALITY,
                              validate_dimensions)
-        self.validate(**kwargs)
+        if validate:
+            self.validate(**kwargs)
 
     def __getitem__(self, comp_name):
         return self._sub_components[comp_name]
@@ -349,6 +402,19 @@ class MultiDynamics(Dynamics):
                 .format(self.name, ', '.join(str(sc)
                                              for sc in self.sub_components)))
 
+    def __getstate__(self):
+        state = copy(self.__dict__)
+        state['_flat_cache'] = {}
+        return state
+
+    def add(self, *elements):
+        self._flat_cache = {}
+        super(MultiDynamics, self).add(*elements)
+
+    def remove(self, *elements):
+        self._flat_cache = {}
+        super(MultiDynamics, self).remove(*elements)
+
     def flatten(self, name=None, **kwargs):
         if name is None:
             name = self.name + '___flat'
@@ -589,10 +655,50 @@ class MultiDynamics(Dynamics):
 
     @property
     def parameters(self):
-        return chain(*[sc.parameters for sc in self.sub_components])
+        return iter(self._flat_members('parameters')[0])
 
     @property
     def aliases(self):
+        return iter(self._flat_members('aliases')[0])
+
+    @property
+    def constants(self):
+        return iter(self._flat_members('constants')[0])
+
+    @property
+    def state_variables(self):
+        return iter(self._flat_members('state_variables')[0])
+
+    def _flat_members(self, member_type):
+        """
+        Returns the list of flattened members of the given type along with a
+        dictionary indexing them by name, which are generated once and then
+        cached until a sub-component, port connection or exposure is added or
+        removed, or a sub-component class is replaced (e.g. by an equivalent
+        object when added to a document). NB: In-place changes to the
+        sub-component classes themselves are not detected
+        """
+        try:
+            return self._valid_flat_cache()[member_type]
+        except KeyError:
+            members = list(getattr(self, '_generate_' + member_type)())
+            index = {}
+            for member in members:
+                index.setdefault(member.name, member)
+            self._flat_cache[member_type] = (members, index)
+            return members, index
+
+    def _valid_flat_cache(self):
+        sub_classes = tuple((id(sc), id(sc.component_class))
+                            for sc in self.sub_components)
+        if self._flat_cache.get('sub_classes') != sub_classes:
+            self._flat_cache = {'sub_classes': sub_classes}
+        return self._flat_cache
+
+    def _generate_parameters(self):
+        return chain(*[sc.parameters for sc in self.sub_components])
+
+    def _generate_aliases(self):
         """
         Adds aliases for analog port connections to analog ports, which
         are treated simply as aliases in the flattened representation,
@@ -603,12 +709,15 @@ class MultiDynamics(Dynamics):
         for sub_comp in self.sub_components:
             for alias in sub_comp.aliases:
                 yield alias
-        # Yield the aliases used to make local analog port connections
+        # Yield the aliases used to make local analog port connections. NB:
+        # ports are identified by the names of their sub-component as well as
+        # their own names as sub-components can share the same class
         connected_ports = defaultdict(list)
         for port_conn in self.analog_port_connections:
-            connected_ports[port_conn.receive_port.id].append(port_conn)
+            connected_ports[(port_conn.receiver.name,
+                             port_conn.receive_port.name)].append(port_conn)
         connected_exposures = []  # Do not need to create a separate alias for
-        for port_conns in connected_ports.values():
+        for (receiver_name, port_name), port_conns in connected_ports.items():
             port = port_conns[0].receive_port
             receiver = port_conns[0].receiver
             # Check to see if receive port is also exposed
@@ -616,7 +725,8 @@ class MultiDynamics(Dynamics):
                 exposure = next(
                     e for e in chain(self.analog_receive_port_exposures,
                                      self.analog_reduce_port_exposures)
-                    if e.port.id == port.id)
+                    if (e.sub_component_name == receiver_name and
+                        e.port_name == port_name))
                 connected_exposures.append(exposure.id)
             except StopIteration:
                 exposure = None
@@ -650,21 +760,20 @@ class MultiDynamics(Dynamics):
                     exposure.id not in connected_exposures):
                 yield exposure.alias
 
-    @property
-    def constants(self):
-        connected_port_ids = [
-            p.id for _, p in self._connected_analog_receive_ports()]
+    def _generate_constants(self):
+        connected_ports = set(
+            (sc.name, p.name) for sc, p in
+            self._connected_analog_receive_ports())
         for sub_comp in self.sub_components:
             for constant in sub_comp.constants:
                 yield constant
             # We need to insert a 0-valued constant for each reduce port that
             # isn't exposed and doesn't receive any connections
             for reduce_port in sub_comp.analog_reduce_ports:
-                if reduce_port.id not in connected_port_ids:
+                if (sub_comp.name, reduce_port.name) not in connected_ports:
                     yield _UnconnectedAnalogReducePort(reduce_port, sub_comp)
 
-    @property
-    def state_variables(self):
+    def _generate_state_variables(self):
         # All statevariables in all subcomponents mapped into the container
         # namespace
         for sub_comp in self.sub_components:
@@ -677,11 +786,57 @@ class MultiDynamics(Dynamics):
 
     @property
     def regimes(self):
+        return iter(self._flat_members('regimes')[0])
+
+    def _generate_regimes(self):
+        if self._prune_unreachable_regimes:
+            return self.reachable_regimes(self._initial_regime)
         # Create multi-regimes for each combination of regimes across the
         # sub components
         combinations = product(*[sc.regimes for sc in self.sub_components])
         return (self._create_multi_regime(comb) for comb in combinations)
 
+    @property
+    def prune_unreachable_regimes(self):
+        return self._prune_unreachable_regimes
+
+    def reachable_regimes(self, initial_regime=None):
+        """
+        Yields the multi-regimes that can be reached from the initial regime
+        by following the OnEvent and OnCondition transitions (including
+        those chained by local event port connections) in breadth-first
+        order, so combinations of sub-regimes that can never occur together
+        are not generated
+
+        Parameters
+        ----------
+        initial_regime : str | dict(str, str) | None
+            The multi-regime name of the initial regime or a dictionary
+            mapping sub-component names to the names of their initial
+            regimes. If None (or a sub-component is missing from the
+            dictionary), the regime with the most time derivatives is used
+            (as in DynamicsProperties)
+        """
+        if initial_regime is None:
+            initial_regime = {}
+        if isinstance(initial_regime, dict):
+            initial_regime = [
+                initial_regime.get(sc_n, None) or max(
+                    self.sub_component(sc_n).component_class.regimes,
+                    key=lambda r: r.num_time_derivatives).name
+                for sc_n in self._sub_component_keys]
+        regime = self.regime(initial_regime)
+        visited = set([regime.name])
+        to_visit = collections.deque([regime])
+        while to_visit:
+            regime = to_visit.popleft()
+            yield regime
+            for transition in chain(regime.on_events, regime.on_conditions):
+                target_name = transition.target_regime_name
+                if target_name not in visited:
+                    visited.add(target_name)
+                    to_visit.append(transition.target_regime)
+
     @property
     def parameter_names(self):
         return (p.name for p in self.parameters)
@@ -702,48 +857,31 @@ class MultiDynamics(Dynamics):
     def regime_names(self):
         return (r.name for r in self.regimes)
 
+    @name_error
     def parameter(self, name):
-        _, comp_name = split_namespace(name)
-        return self.sub_component(comp_name).parameter(name)
+        return self._flat_members('parameters')[1][name]
 
     @name_error
     def state_variable(self, name):
-        try:
-            _, comp_name = split_namespace(name)
-            return self.sub_component(comp_name).state_variable(name)
-        except KeyError:
-            try:
-                return next(sv for sv in self.state_variables
-                            if sv.name == name)
-            except StopIteration:
-                raise KeyError(name)
+        return self._flat_members('state_variables')[1][name]
 
     @name_error
     def alias(self, name):
-        try:
-            _, comp_name = split_namespace(name)
-            return self.sub_component(comp_name).alias(name)
-        except KeyError:
-            try:
-                return next(a for a in self.aliases if a.name == name)
-            except StopIteration:
-                raise KeyError(name)
+        return self._flat_members('aliases')[1][name]
 
     @name_error
     def constant(self, name):
-        try:
-            _, comp_name = split_namespace(name)
-            return self.sub_component(comp_name).constant(name)
-        except KeyError:
-            try:
-                return next(c for c in self.constants if c.name == name)
-            except StopIteration:
-                raise KeyError(name)
+        return self._flat_members('constants')[1][name]
 
     def regime(self, name):
+        # Look up the regime if the regimes have already been generated
         try:
+            return self._valid_flat_cache()['regimes'][1][name]
+        except (KeyError, TypeError):
+            pass
+        if isinstance(name, basestring):
             sub_regime_names = split_multi_regime_name(name)
-        except TypeError:
+        else:
             sub_regime_names = name  # Assume it is already an iterable
         if len(sub_regime_names) != len(self._sub_component_keys):
             raise NineMLNameError(
@@ -759,23 +897,23 @@ class MultiDynamics(Dynamics):
 
     @property
     def num_parameters(self):
-        return len(list(self.parameters))
+        return len(self._flat_members('parameters')[0])
 
     @property
     def num_aliases(self):
-        return len(list(self.aliases))
+        return len(self._flat_members('aliases')[0])
 
     @property
     def num_constants(self):
-        return len(list(self.constants))
+        return len(self._flat_members('constants')[0])
 
     @property
     def num_regimes(self):
-        return len(list(self.regimes))
+        return len(self._flat_members('regimes')[0])
 
     @property
     def num_state_variables(self):
-        return len(list(self.state_variables))
+        return len(self._flat_members('state_variables')[0])
 
     @property
     def _sub_component_keys(self):
@@ -1156,7 +1294,7 @@ class MultiDynamicsProperties(DynamicsProperties):
 
     def __init__(self, name, sub_components, port_connections=[],
                  port_exposures=[], check_initial_values=False,
-                 definition=None):
+                 definition=None, prune_unreachable_regimes=False):
         self._name = validate_identifier(name)
         # Initiate inherited base classes
         BaseULObject.__init__(self)
@@ -1174,7 +1312,8 @@ class MultiDynamicsProperties(DynamicsProperties):
             # This is just until the user layer is split into structure and
             # property layers
             self._definition = self._extract_definition(
-                sub_components, port_exposures, port_connections)
+                sub_components, port_exposures, port_connections,
+                prune_unreachable_regimes)
         else:
             self._definition = definition
         # Check for property/parameter matches
@@ -1183,7 +1322,7 @@ class MultiDynamicsProperties(DynamicsProperties):
             self.check_initial_values()
 
     def _extract_definition(self, sub_components, port_exposures,
-                            port_connections):
+                            port_connections, prune_unreachable_regimes=False):
         sub_dynamics = [
             SubDynamics(sc.name, sc.component.component_class)
             for sc in sub_components]
@@ -1192,6 +1331,9 @@ class MultiDynamicsProperties(DynamicsProperties):
             self.name + '_dynamics', sub_dynamics,
             port_exposures=port_exposures,
             port_connections=port_connections,
+            initial_regime=dict((sc.name, sc.initial_regime)
+                                for sc in sub_components),
+            prune_unreachable_regimes=prune_unreachable_regimes,
             document=self.document))
 
     def flatten(self, name=None):
@@ -1403,11 +1545,12 @@ class _MultiTransition(BaseALObject, ContainerObject):
         return (
             _ExposedOutputEvent(pe, self)
             for pe in self._parent._parent.event_send_ports
-            if pe.port.id in self._sub_output_event_port_ids())
+            if pe.local_port_name in self._sub_output_event_port_names())
 
     def output_event(self, name):
         exposure = self._parent._parent.event_send_port(name)
-        if exposure.port.id not in self._sub_output_event_port_ids():
+        if (exposure.local_port_name not in
+                self._sub_output_event_port_names()):
             raise NineMLNameError(
                 "Output event for '{}' port is not present in transition"
                 .format(name))
@@ -1429,9 +1572,9 @@ class _MultiTransition(BaseALObject, ContainerObject):
     def output_event_port_names(self):
         return (oe.port_name for oe in self.output_events)
 
-    def _sub_output_event_port_ids(self):
+    def _sub_output_event_port_names(self):
         return set(
-            oe.port.id
+            oe.port_name
             for oe in chain(*[t.output_events for t in self.sub_transitions]))
 
 
@@ -13,7 +13,6 @@ from nineml.abstraction import (
     Alias, TimeDerivative, Regime, OnEvent, OnCondition, StateAssignment,
     Trigger, OutputEvent, StateVariable, Constant, Parameter)
 from nineml.exceptions import NineMLImmutableError, NineMLNameError, name_error
-from nineml.abstraction.expressions import reserved_identifiers
 from nineml.base import BaseNineMLObject
 
 
@@ -28,18 +27,57 @@ triple_underscore_re = re.compile(r'(?<!_)___(?!_)')
 # in sub-component suffixes by adding an additional underscore.
 more_than_double_underscore_re = re.compile(r'__(_+)')
 
+# Escaped versions of the namespaces (and other names) that have been
+# appended to identifiers, and the parts of identifiers that have been split,
+# which are memoized as the same names are escaped and split repeatedly when
+# flattening MultiDynamics objects. The tables are cleared when they reach
+# NAMESPACE_CACHE_SIZE entries so that they don't grow without bound
+NAMESPACE_CACHE_SIZE = 10000
+_escaped_names = {}
+_split_identifiers = {}
+
+
+def _memoize(cache, key, value):
+    if len(cache) >= NAMESPACE_CACHE_SIZE:
+        cache.clear()
+    cache[key] = value
+
+
+def clear_namespace_caches():
+    "Clears the memoized escaped names and split identifiers"
+    _escaped_names.clear()
+    _split_identifiers.clear()
+
+
+def _escape(name):
+    """
+    Appends two underscores to each run of multiple underscores in the name,
+    so they can't be confused with the double underscores used to delimit
+    namespaces (9ML names are not allowed to start or end in underscores)
+    """
+    try:
+        return _escaped_names[name]
+    except KeyError:
+        pass
+    escaped = multiple_underscore_re.sub(r'\1__', name)
+    _memoize(_escaped_names, name, escaped)
+    return escaped
+
+
+def _unescape(name):
+    """
+    Reverses the escaping of multiple underscores by '_escape' by removing two
+    underscores from each run of more than two underscores
+    """
+    return more_than_double_underscore_re.sub(r'\1', name)
+
 
 def append_namespace(identifier, namespace):
     """
     Appends a namespace to an identifier in such a way that it avoids name
     clashes and the two parts can be split again using 'split_namespace'
     """
-    # Since double underscores are used to delimit namespaces from names
-    # within the namesapace (and 9ML names are not allowed to start or end
-    # in underscores) we append an underscore to each multiple underscore
-    # to avoid clash with the delimeter in the suffix
-    return (str(identifier) + '__' +
-            multiple_underscore_re.sub(r'\1__', namespace))
+    return str(identifier) + '__' + _escape(namespace)
 
 
 def split_namespace(identifier_in_namespace):
@@ -47,15 +85,18 @@ def split_namespace(identifier_in_namespace):
     Splits an identifer and a namespace that have been concatenated by
     'append_namespace'
     """
+    try:
+        return _split_identifiers[identifier_in_namespace]
+    except KeyError:
+        pass
     parts = double_underscore_re.split(identifier_in_namespace)
     if len(parts) < 2:
         raise NineMLNameError(
             "Identifier '{}' does not belong to a sub-namespace"
             .format(identifier_in_namespace))
-    name = '__'.join(parts[:-1])
-    comp_name = parts[-1]
-    comp_name = more_than_double_underscore_re.sub(r'\1', comp_name)
-    return name, comp_name
+    split = ('__'.join(parts[:-1]), _unescape(parts[-1]))
+    _memoize(_split_identifiers, identifier_in_namespace, split)
+    return split
 
 
 def make_delay_trigger_name(port_conn):
@@ -69,31 +110,29 @@ def make_delay_trigger_name(port_conn):
                 if port_conn.receiver_role is not None
                 else port_conn.receiver_name)
     return '{}___{}__{}___{}'.format(
-        *(multiple_underscore_re.sub(r'\1__', p)
-          for p in (sender, port_conn.send_port_name,
-                    receiver, port_conn.receive_port_name)))
+        *(_escape(p) for p in (sender, port_conn.send_port_name,
+                               receiver, port_conn.receive_port_name)))
 
 
 def split_delay_trigger_name(name):
     snd, rcv = double_underscore_re.split(name)
     sender, send_port = triple_underscore_re.split(snd)
     receiver, receive_port = triple_underscore_re.split(rcv)
-    return tuple(more_than_double_underscore_re.sub(r'\1', p)
+    return tuple(_unescape(p)
                  for p in (sender, send_port, receiver, receive_port))
 
 
 def make_regime_name(sub_regimes_dict):
     sorted_keys = sorted(sub_regimes_dict.keys())
-    return '___'.join(
-        multiple_underscore_re.sub(r'\1__', sub_regimes_dict[k].relative_name)
-        for k in sorted_keys)
+    return '___'.join(_escape(sub_regimes_dict[k].relative_name)
+                      for k in sorted_keys)
 
 
 def split_multi_regime_name(name):
     parts = triple_underscore_re.split(name)
     if not parts:
         raise NineMLNameError("'{}' is not a multi-regime name".format(name))
-    return tuple(more_than_double_underscore_re.sub(r'\1', p) for p in parts)
+    return tuple(_unescape(p) for p in parts)
 
 
 class _NamespaceObject(BaseNineMLObject):
@@ -155,10 +194,7 @@ class _NamespaceExpression(_NamespaceObject):
         Return copy of rhs with all free symbols suffixed by the namespace
         """
         try:
-            return self._object.rhs.xreplace(dict(
-                (s, sympy.Symbol(append_namespace(s, self.sub_component.name)))
-                for s in self._object.rhs.free_symbols
-                if str(s) not in reserved_identifiers))
+            return self.sub_component.namespace_expression(self._object.rhs)
         except AttributeError:  # If rhs has been simplified to ints/floats
             assert float(self._object.rhs)
             return self._object.rhs
@@ -5,7 +5,7 @@ from .component import Property
 import nineml.units as un
 from .population import Population
 from .projection import Projection
-from .selection import Selection
+from .selection import Selection, group_by_component_class
 from . import BaseULObject
 from nineml.exceptions import name_error
 from nineml.base import DocumentLevelObject, ContainerObject
@@ -114,6 +114,14 @@ class Network(BaseULObject, DocumentLevelObject, ContainerObject):
             components.extend(p.all_components())
         return components
 
+    def component_class_groups(self):
+        """
+        Groups the populations of the network by the structural identity of
+        their component classes, so that populations sharing a class can be
+        instantiated together (see group_by_component_class)
+        """
+        return group_by_component_class(self.populations)
+
     def resample_connectivity(self, *args, **kwargs):
         for projection in self.projections:
             projection.resample_connectivity(*args, **kwargs)
@@ -176,20 +184,34 @@ class Network(BaseULObject, DocumentLevelObject, ContainerObject):
         connection_groups : list(ConnectionGroup)
             List of connection groups the projections have been flattened to
         """
+        # Generate the connections of each projection once and share them
+        # between the connection groups of its port connections
+        connection_arrays = dict(
+            (p.name, p.connectivity.connection_arrays())
+            for p in self.projections)
         component_arrays = dict((ca.name, ca) for ca in chain(
             (ComponentArray(p.name + ComponentArray.suffix['post'], len(p),
                             p.cell.flatten())
              for p in self.populations),
-            (ComponentArray(p.name + ComponentArray.suffix['response'], len(p),
+            (ComponentArray(p.name + ComponentArray.suffix['response'],
+                            len(connection_arrays[p.name][0]),
                             p.response.flatten())
              for p in self.projections),
             (ComponentArray(p.name + ComponentArray.suffix['plasticity'],
-                            len(p), p.plasticity.flatten())
+                            len(connection_arrays[p.name][0]),
+                            p.plasticity.flatten())
              for p in self.projections if p.plasticity is not None)))
-        connection_groups = list(chain(*(
-            (BaseConnectionGroup.from_port_connection(pc, p, component_arrays)
-             for pc in p.port_connections)
-            for p in self.projections)))
+        # Check the port connections against the current populations and
+        # synapses of the projections, which are only resolved once for each
+        # pair of component classes (see BasePortConnection.resolution_cache)
+        for projection in self.projections:
+            for port_connection in projection.port_connections:
+                port_connection.bind(projection, to_roles=True)
+        connection_groups = [
+            BaseConnectionGroup.from_port_connection(
+                pc, p, component_arrays,
+                connection_arrays=connection_arrays[p.name])
+            for p in self.projections for pc in p.port_connections]
         return list(component_arrays.values()), connection_groups
 
     def scale(self, scale):
@@ -1,4 +1,5 @@
 from past.builtins import basestring
+import weakref
 from . import BaseULObject
 from abc import ABCMeta, abstractmethod
 import nineml.units as un
@@ -13,6 +14,124 @@ from future.utils import with_metaclass
 from nineml.utils import validate_identifier
 
 
+_send_port_accessors = ('event_send_port', 'analog_send_port')
+_receive_port_accessors = ('event_receive_port', 'analog_receive_port',
+                           'analog_reduce_port')
+
+
+def _component_classes(obj):
+    """
+    Returns the component classes of a population, selection, component or
+    sub-component
+    """
+    try:
+        return tuple(obj.component_classes)
+    except AttributeError:
+        return (obj.component_class,)
+
+
+def _class_ports(component_classes, name, accessors):
+    """
+    Returns the accessor that looks up the named port in each component
+    class along with the port it returns (or None if it isn't found)
+    """
+    class_ports = []
+    for component_class in component_classes:
+        for accessor in accessors:
+            try:
+                class_ports.append(
+                    (accessor, getattr(component_class, accessor)(name)))
+                break
+            except NineMLNameError:
+                pass
+        else:
+            return None
+    return tuple(class_ports)
+
+
+class PortResolutionCache(object):
+    """
+    The ports resolved by previous bindings of port connections, along with
+    the error raised if they couldn't be connected, keyed on the type of the
+    port connection, the port names and the identities of the sender and
+    receiver component classes (see BasePortConnection.bind).
+
+    Only weak references to the component classes are held and the entries
+    for a class are dropped when it is garbage collected. Entries are only
+    used while each class returns the same port objects they were resolved
+    from, so replacing a port forces it to be resolved and checked again.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def get(self, port_connection, sender_classes, receiver_classes):
+        """
+        Returns the cached (send_port, receive_port, error) tuple for the
+        connection between the component classes, or None if there isn't a
+        valid entry
+        """
+        key = self._key(port_connection, sender_classes, receiver_classes)
+        try:
+            (refs, send_class_ports, receive_class_ports,
+             resolution) = self._entries[key]
+        except KeyError:
+            return None
+        try:
+            if not (
+                all(r() is c for r, c in zip(
+                    refs, sender_classes + receiver_classes)) and
+                all(getattr(c, a)(port_connection.send_port_name) is p
+                    for c, (a, p) in zip(sender_classes,
+                                         send_class_ports)) and
+                all(getattr(c, a)(port_connection.receive_port_name) is p
+                    for c, (a, p) in zip(receiver_classes,
+                                         receive_class_ports))):
+                return None
+        except NineMLNameError:
+            return None
+        return resolution
+
+    def set(self, port_connection, sender_classes, receiver_classes,
+            send_port, receive_port, error=None):
+        """
+        Caches the ports resolved for the connection between the component
+        classes along with the error raised when checking them (if any)
+        """
+        send_class_ports = _class_ports(
+            sender_classes, port_connection.send_port_name,
+            _send_port_accessors)
+        receive_class_ports = _class_ports(
+            receiver_classes, port_connection.receive_port_name,
+            _receive_port_accessors)
+        if send_class_ports is None or receive_class_ports is None:
+            return  # The ports aren't accessed directly from the classes
+        key = self._key(port_connection, sender_classes, receiver_classes)
+        entries = self._entries
+
+        def remove(ref):
+            if key in entries and any(r is ref for r in entries[key][0]):
+                del entries[key]
+
+        refs = tuple(weakref.ref(c, remove)
+                     for c in sender_classes + receiver_classes)
+        entries[key] = (refs, send_class_ports, receive_class_ports,
+                        (send_port, receive_port, error))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    @classmethod
+    def _key(cls, port_connection, sender_classes, receiver_classes):
+        return (type(port_connection), port_connection.send_port_name,
+                port_connection.receive_port_name,
+                tuple(id(c) for c in sender_classes),
+                tuple(id(c) for c in receiver_classes))
+
+
 class BasePortConnection(with_metaclass(ABCMeta, BaseULObject)):
 
     nineml_attr = ('send_port_name', 'receive_port_name',
@@ -21,6 +140,10 @@ class BasePortConnection(with_metaclass(ABCMeta, BaseULObject)):
 
     _projection_roles = ('pre', 'post', 'response', 'plasticity')
 
+    # Shared between all port connections so connections between the same
+    # ports of the same classes are only resolved and checked once
+    resolution_cache = PortResolutionCache()
+
     def __init__(self, send_port_name, receive_port_name,
                  sender_role=None, receiver_role=None,
                  sender_name=None, receiver_name=None):
@@ -279,6 +402,25 @@ class BasePortConnection(with_metaclass(ABCMeta, BaseULObject)):
         else:
             self._sender = container[self.sender_name]
             self._receiver = container[self.receiver_name]
+        self._resolve_ports()
+
+    def _resolve_ports(self):
+        """
+        Looks up the ports in the sender and receiver and checks they can be
+        connected, reusing the ports (and verdict) of a previous binding of a
+        connection between the same ports of the same component classes
+        """
+        sender_classes = _component_classes(self._sender)
+        receiver_classes = _component_classes(self._receiver)
+        resolution = self.resolution_cache.get(self, sender_classes,
+                                               receiver_classes)
+        if resolution is not None:
+            self._send_port, self._receive_port, error = resolution
+            if error is not None:
+                raise type(error)(*error.args)
+            return
+        # Missing ports aren't cached as looking them up in the classes is
+        # all that would be needed to check the cached entry was still valid
         try:
             self._send_port = self._sender.send_port(self.send_port_name)
         except NineMLNameError:
@@ -292,7 +434,15 @@ class BasePortConnection(with_metaclass(ABCMeta, BaseULObject)):
             raise NineMLNameError(
                 "Could not bind {} to missing receive port, '{}', in '{}'"
                 .format(self, self.receive_port_name, self.receiver.name))
-        self._check_ports()
+        try:
+            self._check_ports()
+        except NineMLUsageError as e:
+            self.resolution_cache.set(
+                self, sender_classes, receiver_classes, self._send_port,
+                self._receive_port, error=e)
+            raise
+        self.resolution_cache.set(self, sender_classes, receiver_classes,
+                                  self._send_port, self._receive_port)
 
     def is_bound(self):
         if self._sender is None:
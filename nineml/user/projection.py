@@ -105,6 +105,9 @@ class Projection(BaseULObject, ContainerObject, DocumentLevelObject):
                     "connection_rule_properties as kwargs to projection class")
             self._connectivity = connectivity
         else:
+            # Key the random streams by the projection so that projections
+            # that share rule properties and a seed are independent
+            kwargs.setdefault('stream_name', name)
             self._connectivity = connectivity_class(
                 connection_rule_properties, pre.size, post.size, **kwargs)
         self._delay = delay
@@ -124,7 +127,7 @@ class Projection(BaseULObject, ContainerObject, DocumentLevelObject):
             self.add(port_connection)
 
     def __len__(self):
-        return sum(1 for _ in self.connectivity.connections())
+        return self.connectivity.num_connections(exact=True)
 
     @property
     def name(self):
@@ -200,6 +203,7 @@ class Projection(BaseULObject, ContainerObject, DocumentLevelObject):
     def resample_connectivity(self, connectivity_class=None, **kwargs):
         if connectivity_class is None:
             connectivity_class = type(self.connectivity)
+        kwargs.setdefault('stream_name', self.name)
         self._connectivity = connectivity_class(
             self.connectivity.rule_properties, self.connectivity.source_size,
             self.connectivity.destination_size, **kwargs)
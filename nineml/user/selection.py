@@ -6,9 +6,14 @@ from .population import Population
 from nineml.exceptions import NineMLNameError, NineMLUsageError
 from nineml.utils import validate_identifier
 from .component_array import ComponentArray
+from .component import Property
+from .dynamics import DynamicsProperties, Initial
+from nineml.units import Quantity
+from nineml.values import ArrayValue
 from nineml.exceptions import name_error
 from itertools import chain
 from collections import defaultdict
+import numpy
 
 
 def combined_port_accessor(population_accessor):
@@ -45,6 +50,220 @@ def combined_ports_property(population_property):
     return property(combined_property)
 
 
+def leaf_populations(populations):
+    """
+    Iterates through the populations (or component arrays), expanding any
+    selections into the populations they contain
+    """
+    for population in populations:
+        if isinstance(population, Selection):
+            for p in leaf_populations(population.populations):
+                yield p
+        else:
+            yield population
+
+
+def group_by_component_class(populations):
+    """
+    Buckets populations (or component arrays) by the structural identity of
+    their component classes, i.e. populations with equal but separately
+    created classes are placed in the same group. Selections are expanded
+    into the populations they contain.
+
+    Parameters
+    ----------
+    populations : iterable(Population | ComponentArray | Selection)
+        The populations to group
+
+    Returns
+    -------
+    groups : list(ComponentClassGroup)
+        The groups in the order their component classes first appear
+    """
+    buckets = []
+    for population in leaf_populations(populations):
+        component_class = _properties_of(population).component_class
+        # Check identity before the (more costly) structural equality
+        try:
+            bucket = next(b for b in buckets if b[0] is component_class)
+        except StopIteration:
+            try:
+                bucket = next(b for b in buckets if b[0] == component_class)
+            except StopIteration:
+                bucket = (component_class, [])
+                buckets.append(bucket)
+        bucket[1].append(population)
+    return [ComponentClassGroup(c, p) for c, p in buckets]
+
+
+def _convert(value, from_units, to_units):
+    """
+    Converts a value (or array of values) between units of the same
+    dimension, including any offsets between them (e.g. degC to K)
+    """
+    if from_units.offset == to_units.offset:
+        return value * 10 ** (from_units.power - to_units.power)
+    return ((value * 10 ** from_units.power + from_units.offset -
+             to_units.offset) / 10 ** to_units.power)
+
+
+def _properties_of(population):
+    try:
+        return population.cell
+    except AttributeError:
+        return population.dynamics_properties  # If a ComponentArray
+
+
+class ComponentClassGroup(object):
+    """
+    A group of populations (or component arrays) that share the same
+    component class, which can be instantiated as a single array of
+    components with the properties and initial values of each population
+    concatenated into ArrayValues
+
+    Parameters
+    ----------
+    component_class : Dynamics
+        The component class shared by the populations
+    populations : list(Population | ComponentArray)
+        The populations in the group
+    """
+
+    def __init__(self, component_class, populations):
+        self._component_class = component_class
+        self._populations = list(populations)
+        self._concatenation = Concatenate(self._populations)
+
+    def __repr__(self):
+        return "ComponentClassGroup({}, populations=['{}'])".format(
+            self.component_class.name,
+            "', '".join(p.name for p in self.populations))
+
+    @property
+    def component_class(self):
+        return self._component_class
+
+    @property
+    def populations(self):
+        return iter(self._populations)
+
+    @property
+    def num_populations(self):
+        return len(self._populations)
+
+    @property
+    def size(self):
+        return self._concatenation.size
+
+    @property
+    def offsets(self):
+        "The index of the first element of each population in the group"
+        return self._concatenation.offsets
+
+    def global_to_local(self, indices):
+        """
+        Maps indices into the group to the indices of the populations and
+        the indices within them (see Concatenate.global_to_local)
+        """
+        return self._concatenation.global_to_local(indices)
+
+    def local_to_global(self, population_indices, local_indices):
+        """
+        Maps the indices of populations in the group and indices within them
+        to indices into the group (see Concatenate.local_to_global)
+        """
+        return self._concatenation.local_to_global(population_indices,
+                                                   local_indices)
+
+    @property
+    def property_names(self):
+        return _properties_of(self._populations[0]).property_names
+
+    @property
+    def initial_value_names(self):
+        return _properties_of(self._populations[0]).initial_value_names
+
+    @property
+    def properties(self):
+        return (self.property(n) for n in self.property_names)
+
+    @property
+    def initial_values(self):
+        return (self.initial_value(n) for n in self.initial_value_names)
+
+    def initial_value(self, name):
+        """
+        The initial value of the populations in the group, with the values of
+        each population concatenated into an ArrayValue (unless they all
+        share the same single value)
+        """
+        return Initial(name, self._concatenate_quantities(
+            [_properties_of(p).initial_value(name).quantity
+             for p in self._populations]))
+
+    @property
+    def initial_regime(self):
+        regimes = set(_properties_of(p).initial_regime
+                      for p in self._populations)
+        if len(regimes) > 1:
+            raise NineMLUsageError(
+                "Populations in {} have different initial regimes ('{}')"
+                .format(self, "', '".join(sorted(regimes))))
+        return next(iter(regimes))
+
+    def dynamics_properties(self, name=None):
+        """
+        Returns a DynamicsProperties object with the concatenated properties
+        and initial values of the populations in the group
+        """
+        if name is None:
+            name = self.component_class.name + 'GroupProperties'
+        return DynamicsProperties(
+            name=name, definition=self.component_class,
+            properties=list(self.properties),
+            initial_values=list(self.initial_values),
+            initial_regime=self.initial_regime)
+
+    def _concatenate_quantities(self, quantities):
+        units = quantities[0].units
+        if all(q.value.is_single() for q in quantities):
+            values = set(_convert(q.value.value, q.units, units)
+                         for q in quantities)
+            if len(values) == 1:
+                return Quantity(values.pop(), units)
+        arrays = []
+        for population, quantity in zip(self._populations, quantities):
+            value = quantity.value
+            if value.is_single():
+                array = numpy.repeat(value.value, population.size)
+            elif value.is_array():
+                array = numpy.asarray(value.values, dtype=float)
+                if len(array) != population.size:
+                    raise NineMLUsageError(
+                        "Size of array value ({}) does not match the size of "
+                        "'{}' population ({})".format(len(array),
+                                                      population.name,
+                                                      population.size))
+            else:
+                raise NineMLUsageError(
+                    "Cannot concatenate random distribution value in '{}' "
+                    "population".format(population.name))
+            arrays.append(_convert(array, quantity.units, units))
+        return Quantity(ArrayValue(numpy.concatenate(arrays)), units)
+
+    # Property is declared last so as not to overwrite the 'property' decorator
+
+    def property(self, name):
+        """
+        The property of the populations in the group, with the values of each
+        population concatenated into an ArrayValue (unless they all share the
+        same single value)
+        """
+        return Property(name, self._concatenate_quantities(
+            [_properties_of(p).property(name).quantity
+             for p in self._populations]))
+
+
 class Item(BaseULObject):
 
     nineml_type = 'Item'
@@ -92,6 +311,10 @@ class Concatenate(BaseULObject, ContainerObject):
     nineml_type = 'Concatenate'
     nineml_children = (Item,)
 
+    # The offsets of the first elements of the concatenated populations (see
+    # 'offsets'), cleared whenever items are added or removed
+    _offsets_cache = None
+
     def __init__(self, items, **kwargs):
         BaseULObject.__init__(self, **kwargs)
         ContainerObject.__init__(self, **kwargs)
@@ -113,6 +336,14 @@ class Concatenate(BaseULObject, ContainerObject):
             self.add(*(Item(i, p) for i, p in enumerate(items)))
         assert(self.num_items)
 
+    def add(self, *items):
+        self._offsets_cache = None
+        super(Concatenate, self).add(*items)
+
+    def remove(self, *items):
+        self._offsets_cache = None
+        super(Concatenate, self).remove(*items)
+
     def __repr__(self):
         return "Concatenate({})".format(
             ", ".join(repr(item) for item in self.items))
@@ -163,6 +394,88 @@ class Concatenate(BaseULObject, ContainerObject):
         """Return a list of the items in the concatenation."""
         return len(self._items)
 
+    @property
+    def size(self):
+        return int(self.offsets[-1])
+
+    @property
+    def offsets(self):
+        """
+        The index of the first element of each item in the concatenation
+        (ordered by item index) followed by the total size. The array is
+        cached until items are added or removed, so the populations should
+        not be resized after they are concatenated.
+        """
+        if self._offsets_cache is None:
+            sizes = [self._items[k].population.size
+                     for k in sorted(self._items, key=int)]
+            offsets = numpy.zeros(len(sizes) + 1, dtype=int)
+            numpy.cumsum(sizes, out=offsets[1:])
+            offsets.flags.writeable = False
+            self._offsets_cache = offsets
+        return self._offsets_cache
+
+    def global_to_local(self, indices):
+        """
+        Maps indices into the concatenation to the indices of the items they
+        belong to and the indices within the populations of those items
+
+        Parameters
+        ----------
+        indices : int | numpy.ndarray(int)
+            Indices into the concatenation
+
+        Returns
+        -------
+        item_indices : int | numpy.ndarray(int)
+            Indices of the items the elements belong to
+        local_indices : int | numpy.ndarray(int)
+            Indices of the elements within the populations of the items
+        """
+        offsets = self.offsets
+        indices = numpy.asarray(indices, dtype=int)
+        if indices.size and (indices.min() < 0 or
+                             indices.max() >= offsets[-1]):
+            raise NineMLUsageError(
+                "Indices out of range for concatenation of size {} ({})"
+                .format(offsets[-1], indices))
+        item_indices = numpy.searchsorted(offsets, indices, side='right') - 1
+        return item_indices, indices - offsets[item_indices]
+
+    def local_to_global(self, item_indices, local_indices):
+        """
+        Maps indices within the populations of items to indices into the
+        concatenation
+
+        Parameters
+        ----------
+        item_indices : int | numpy.ndarray(int)
+            Indices of the items the elements belong to
+        local_indices : int | numpy.ndarray(int)
+            Indices of the elements within the populations of the items
+
+        Returns
+        -------
+        indices : int | numpy.ndarray(int)
+            Indices into the concatenation
+        """
+        offsets = self.offsets
+        item_indices = numpy.asarray(item_indices, dtype=int)
+        local_indices = numpy.asarray(local_indices, dtype=int)
+        if item_indices.size and (item_indices.min() < 0 or
+                                  item_indices.max() >= len(offsets) - 1):
+            raise NineMLUsageError(
+                "Item indices out of range for concatenation of {} items "
+                "({})".format(len(offsets) - 1, item_indices))
+        if local_indices.size and (
+                local_indices.min() < 0 or
+                numpy.any(local_indices >= (offsets[item_indices + 1] -
+                                            offsets[item_indices]))):
+            raise NineMLUsageError(
+                "Local indices out of range for items {} ({})"
+                .format(item_indices, local_indices))
+        return offsets[item_indices] + local_indices
+
     def serialize_node(self, node, **options):  # @UnusedVariable
         node.children(self.items, **options)
 
@@ -237,9 +550,36 @@ class Selection(BaseULObject, DocumentLevelObject, DynamicPortsObject):
     def component_classes(self):
         return (p.component_class for p in self.populations)
 
+    def component_class_groups(self):
+        """
+        Groups the populations in the selection by the structural identity
+        of their component classes (see group_by_component_class)
+        """
+        return group_by_component_class(self.populations)
+
     @property
     def size(self):
-        return sum(p.size for p in self.populations)
+        return self.operation.size
+
+    @property
+    def offsets(self):
+        return self.operation.offsets
+
+    def global_to_local(self, indices):
+        """
+        Maps indices into the selection to the indices of the items of the
+        concatenation they belong to and their indices within the populations
+        of those items (see Concatenate.global_to_local)
+        """
+        return self.operation.global_to_local(indices)
+
+    def local_to_global(self, item_indices, local_indices):
+        """
+        Maps the indices of items of the concatenation and indices within
+        their populations to indices into the selection (see
+        Concatenate.local_to_global)
+        """
+        return self.operation.local_to_global(item_indices, local_indices)
 
     port = combined_port_accessor(Population.port)
     ports = combined_ports_property(Population.ports)
@@ -0,0 +1,177 @@
+"""
+Counter-based random streams for generating connectivity and sampling random
+distribution values reproducibly in independent blocks (e.g. across the
+processes of a distributed simulation)
+"""
+from __future__ import absolute_import
+from builtins import object
+import binascii
+import math
+import numpy
+from ..exceptions import NineMLUsageError
+
+
+class RandomStreams(object):
+    """
+    Independent streams of random numbers generated by the counter-based
+    Philox bit generator. The key of the generator is derived from a seed and
+    an optional name (e.g. of a projection or a property), and each stream is
+    given a separate range of the counter by its index (e.g. of a block of
+    source or destination indices). Any stream can therefore be generated
+    without generating the others, in any order and in any process.
+
+    Parameters
+    ----------
+    seed : int
+        The random seed the streams are derived from
+    name : str | None
+        A name that distinguishes the streams from those derived from the
+        same seed for other objects
+    """
+
+    def __init__(self, seed, name=None):
+        self._seed = seed
+        self._name = name
+        entropy = [seed]
+        if name is not None:
+            entropy.append(int(binascii.hexlify(name.encode('utf-8')), 16))
+        self._key = numpy.random.SeedSequence(entropy).generate_state(
+            2, numpy.uint64)
+
+    @property
+    def seed(self):
+        return self._seed
+
+    @property
+    def name(self):
+        return self._name
+
+    def generator(self, stream):
+        """
+        Returns a numpy Generator for the stream with the given index, which
+        starts from the beginning of the stream each time it is called
+        """
+        return numpy.random.Generator(numpy.random.Philox(
+            key=self._key, counter=[0, 0, 0, stream]))
+
+    def sample(self, draw, indices, size, block_size=1024):
+        """
+        Draws a value for each of the given indices, where the values for
+        each block of ``block_size`` consecutive indices are drawn from the
+        stream of that block. The value drawn for an index is therefore the
+        same whichever other indices are drawn with it.
+
+        Parameters
+        ----------
+        draw : callable
+            Called with a Generator and the number of values to draw
+            (``draw(rng, n)``), e.g. a sampler returned by `sampler`
+        indices : iterable(int) | None
+            The indices to draw values for. If None all indices up to size are
+            drawn
+        size : int
+            The number of indices, i.e. one greater than the largest index
+        block_size : int
+            The number of indices that share a stream
+        """
+        if indices is None:
+            indices = numpy.arange(size)
+        else:
+            indices = numpy.asarray(indices, dtype=numpy.int64)
+            if indices.size and (indices.min() < 0 or indices.max() >= size):
+                raise NineMLUsageError(
+                    "Indices must be between 0 and {}".format(size - 1))
+        values = numpy.empty(len(indices))
+        blocks = indices // block_size
+        for block in numpy.unique(blocks).tolist():
+            start = block * block_size
+            in_block = blocks == block
+            block_values = numpy.asarray(draw(
+                self.generator(block), min(start + block_size, size) - start))
+            values[in_block] = block_values[indices[in_block] - start]
+        return values
+
+
+def _parameter(props, *names):
+    "Returns the value of the first of the named properties that is present"
+    for name in names:
+        if name in props.property_names:
+            return float(props.property(name).value)
+    raise NineMLUsageError(
+        "'{}' random distribution properties require a '{}' property".format(
+            props.name, "' or '".join(names)))
+
+
+def _normal(rng, props, size):
+    mean = _parameter(props, 'mean')
+    if 'stddev' in props.property_names:
+        stddev = _parameter(props, 'stddev')
+    else:
+        stddev = math.sqrt(_parameter(props, 'variance'))
+    return rng.normal(mean, stddev, size)
+
+
+def _log_normal(rng, props, size):
+    return rng.lognormal(_parameter(props, 'logScale'),
+                         _parameter(props, 'shape'), size)
+
+
+# Draw functions for the UncertML distributions in the 9ML standard library,
+# using the UncertML parameter names
+_samplers = {
+    'uniform': lambda rng, props, size: rng.uniform(
+        _parameter(props, 'minimum'), _parameter(props, 'maximum'), size),
+    'normal': _normal,
+    'exponential': lambda rng, props, size: rng.exponential(
+        1.0 / _parameter(props, 'rate'), size),
+    'gamma': lambda rng, props, size: rng.gamma(
+        _parameter(props, 'shape'), _parameter(props, 'scale'), size),
+    'poisson': lambda rng, props, size: rng.poisson(
+        _parameter(props, 'rate', 'mean'), size),
+    'log-normal': _log_normal,
+    'bernoulli': lambda rng, props, size: rng.binomial(
+        1, _parameter(props, 'probabilities', 'probability'), size),
+    'binomial': lambda rng, props, size: rng.binomial(
+        int(_parameter(props, 'numberOfTrials')),
+        _parameter(props, 'probabilityOfSuccess'), size),
+    'geometric': lambda rng, props, size: rng.geometric(
+        _parameter(props, 'probability'), size),
+    'laplace': lambda rng, props, size: rng.laplace(
+        _parameter(props, 'location'), _parameter(props, 'scale'), size),
+    'logistic': lambda rng, props, size: rng.logistic(
+        _parameter(props, 'location'), _parameter(props, 'scale'), size),
+    'cauchy': lambda rng, props, size: (
+        _parameter(props, 'location') +
+        _parameter(props, 'scale') * rng.standard_cauchy(size)),
+    'weibull': lambda rng, props, size: (
+        _parameter(props, 'scale') *
+        rng.weibull(_parameter(props, 'shape'), size)),
+    'pareto': lambda rng, props, size: (
+        _parameter(props, 'scale') *
+        (1.0 + rng.pareto(_parameter(props, 'shape'), size))),
+    'beta': lambda rng, props, size: rng.beta(
+        _parameter(props, 'alpha'), _parameter(props, 'beta'), size),
+    'chi-square': lambda rng, props, size: rng.chisquare(
+        _parameter(props, 'degreesOfFreedom'), size)}
+
+
+def sampler(distribution):
+    """
+    Returns a function that draws values from a random distribution with a
+    numpy Generator (``draw(rng, n)``)
+
+    Parameters
+    ----------
+    distribution : RandomDistributionProperties
+        The random distribution, which must be one of the UncertML
+        distributions of the standard library with its properties named as in
+        UncertML
+    """
+    dist_type = distribution.standard_library.split('/')[-1]
+    try:
+        draw = _samplers[dist_type]
+    except KeyError:
+        raise NineMLUsageError(
+            "Sampling of '{}' distributions is not supported".format(
+                dist_type))
+    return lambda rng, size: draw(rng, distribution, size)
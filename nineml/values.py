@@ -14,6 +14,7 @@ import numpy  # @IgnorePep8
 import nineml  # @IgnorePep8
 from nineml.exceptions import (  # @IgnorePep8
     NineMLUsageError, NineMLValueError, NineMLSerializationError)
+from nineml.utils.random_streams import RandomStreams, sampler  # @IgnorePep8
 from future.utils import with_metaclass  # @IgnorePep8
 
 # =============================================================================
@@ -263,6 +264,34 @@ class ArrayValue(BaseValue):
         else:
             self._datafile = self.DataFile(*datafile)
 
+    @classmethod
+    def indices(cls, values):
+        """
+        Creates an array value of integer indices (e.g. the source and
+        destination indices of an Explicit connection rule), which are held
+        as int64 instead of being converted to floats. If the values are
+        already an int64 array they aren't copied, and the value holds a
+        read-only view of them
+
+        Parameters
+        ----------
+        values : numpy.ndarray | iterable(int)
+            The indices
+        """
+        array = numpy.asarray(values)
+        if array.dtype.kind in 'iu':
+            indices = array.astype(numpy.int64, copy=False).view()
+        else:
+            indices = array.astype(numpy.int64)
+            if not numpy.array_equal(indices, array):
+                raise NineMLValueError(
+                    "Values provided to ArrayValue.indices ({}) are not all "
+                    "integers".format(type(values)))
+        indices.flags.writeable = False
+        array_value = cls([])
+        array_value._values = indices
+        return array_value
+
     @property
     def values(self):
         return self._values
@@ -297,12 +326,16 @@ class ArrayValue(BaseValue):
 
     def serialize_node(self, node, **options):  # @UnusedVariable
         if self._datafile is None:
+            if node.visitor.supports_arrays:
+                node.visitor.set_array(node.serial_element, 'values',
+                                       numpy.asarray(self._values), **options)
+                return
             for i, value in enumerate(self._values):
                 row_elem = node.visitor.create_elem(
                     'ArrayValueRow', parent=node.serial_element, multiple=True,
                     **options)
                 node.visitor.set_attr(row_elem, 'index', i)
-                node.visitor.set_attr(row_elem, 'value', value)
+                node.visitor.set_attr(row_elem, 'value', float(value))
         else:
             node.attr('url', self.url, **options)
             node.attr('mimetype', self.mimetype, **options)
@@ -319,6 +352,13 @@ class ArrayValue(BaseValue):
                                 node.attr('mimetype', **options),
                                 node.attr('columnName', **options)))
         else:
+            if node.visitor.supports_arrays:
+                values = node.visitor.get_array(node.serial_element, 'values',
+                                                **options)
+                if values is not None:
+                    if values.dtype.kind in 'iu':
+                        return cls.indices(values)
+                    return cls(values)
             rows = []
             for name, elem in node.visitor.get_all_children(
                     node.serial_element, **options):
@@ -533,6 +573,31 @@ class RandomDistributionValue(BaseValue):
                 .format(self))
         yield self._generator()
 
+    def sample(self, size, seed, indices=None, name=None):
+        """
+        Samples values from the distribution with counter-based random
+        streams, so that the value sampled for each index (e.g. of a cell in
+        a population or a connection in a projection) only depends on the
+        seed and the index, and any subset of the indices can be sampled
+        independently (e.g. on each process of a distributed simulation).
+
+        Parameters
+        ----------
+        size : int
+            The number of indices (e.g. the size of the population)
+        seed : int
+            The random seed
+        indices : iterable(int) | None
+            The indices to sample the values for, all indices if None
+        name : str | None
+            The name used to key the random streams (e.g. the name of the
+            property), which defaults to the name of the distribution
+        """
+        if name is None:
+            name = self.distribution.name
+        return RandomStreams(seed, name).sample(
+            sampler(self.distribution), indices, size)
+
     def set_generator(self, generator_cls):
         """
         Generator class can be supplied by the implementing package to allow
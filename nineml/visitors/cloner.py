@@ -1,5 +1,6 @@
 from .base import BaseChildResultsVisitor
 from copy import copy
+import numpy
 from nineml.exceptions import NineMLNotBoundException, NineMLUsageError
 
 
@@ -65,6 +66,10 @@ class Cloner(BaseChildResultsVisitor):
 
     def default_action(self, obj, nineml_cls, child_results,
                        children_results, **kwargs):  # @UnusedVariable @IgnorePep8
+        return nineml_cls(**self._init_args(obj, nineml_cls, child_results,
+                                            children_results))
+
+    def _init_args(self, obj, nineml_cls, child_results, children_results):
         init_args = {}
         for attr_name in nineml_cls.nineml_attr:
             try:
@@ -81,7 +86,7 @@ class Cloner(BaseChildResultsVisitor):
                 child_type]
         if hasattr(nineml_cls, 'validate') and not self.validate:
             init_args['validate'] = False
-        return nineml_cls(**init_args)
+        return init_args
 
     def action_definition(self, definition, nineml_cls, child_results,
                           children_results, **kwargs):  # @UnusedVariable
@@ -104,11 +109,36 @@ class Cloner(BaseChildResultsVisitor):
         clone = nineml_cls(
             child_results['rule_properties'],
             random_seed=random_seed,
+            rng_cls=connectivity._rng_cls,
+            destinations=connectivity._destinations,
+            cache=connectivity._cache,
+            allow_duplicates=connectivity._allow_duplicates,
+            stream_name=connectivity._stream_name,
             source_size=connectivity.source_size,
             destination_size=connectivity.destination_size,
             **kwargs)
         return clone
 
+    def action_arrayvalue(self, array_value, nineml_cls, child_results,
+                          children_results, **kwargs):  # @UnusedVariable
+        values = array_value.values
+        if isinstance(values, numpy.ndarray) and values.dtype.kind in 'iu':
+            # Index arrays are read-only so they can be shared by the clone
+            return nineml_cls.indices(values)
+        return self.default_action(array_value, nineml_cls, child_results,
+                                   children_results, **kwargs)
+
+    def action_multidynamics(self, multi_dynamics, nineml_cls, child_results,
+                             children_results, **kwargs):
+        # Options that restrict the generated regimes aren't part of the
+        # serialized structure so are passed separately
+        return nineml_cls(
+            initial_regime=copy(multi_dynamics._initial_regime),
+            prune_unreachable_regimes=(
+                multi_dynamics.prune_unreachable_regimes),
+            **self._init_args(multi_dynamics, nineml_cls, child_results,
+                              children_results))
+
     def action_reference(self, reference, nineml_cls, **kwargs):  # @UnusedVariable @IgnorePep8
         """
         Typically won't be called unless Reference is created and referenced
@@ -45,7 +45,7 @@ setup(
                       'h5py>=2.7.0',
                       'PyYAML>=3.1',
                       'sympy>=1.5.1',
-                      'numpy>=1.11.0'],
+                      'numpy>=1.17.0'],
     python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, <4',
     tests_require=['nose']
 )
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the namespace escaping and splitting routines used when
+flattening MultiDynamics objects.
+
+The escaped names and split identifiers are memoized, so each call is given
+names that haven't been seen before (and the memo tables are cleared before
+each repeat) to time the escaping and splitting themselves. The time taken
+to look up names that have already been memoized is reported separately.
+"""
+from __future__ import print_function
+import timeit
+from nineml.user.multi.namespace import (
+    append_namespace, split_namespace, make_regime_name,
+    split_multi_regime_name, clear_namespace_caches)
+
+
+class DummyRegime(object):
+
+    def __init__(self, relative_name):
+        self.relative_name = relative_name
+
+
+namespaces = ['cell', 'syn__ampa', 'syn__nmda___x', 'dend__comp__branch1']
+identifiers = ['v', 'g_max', 'tau__rise', 'A___B']
+
+number = 10000
+# Distinct names for every call
+fresh_namespaces = [['{}{}'.format(n, i) for n in namespaces]
+                    for i in range(number)]
+fresh_sub_regimes = [
+    dict((n, DummyRegime('{}{}'.format(r, i)))
+         for n, r in zip(namespaces, identifiers))
+    for i in range(number)]
+
+
+class Calls(object):
+    "Feeds the next set of names to each call"
+
+    def __init__(self, fresh):
+        self.fresh = fresh
+        self.reset()
+
+    def reset(self):
+        clear_namespace_caches()
+        self.names = iter(self.fresh)
+
+    def append_and_split(self):
+        for namespace in next(self.names):
+            for identifier in identifiers:
+                split_namespace(append_namespace(identifier, namespace))
+
+    def regime_names(self):
+        split_multi_regime_name(make_regime_name(next(self.names)))
+
+
+for name, fresh in (('append_and_split', fresh_namespaces),
+                    ('regime_names', fresh_sub_regimes)):
+    calls = Calls(fresh)
+    function = getattr(calls, name)
+    time = min(timeit.repeat(function, setup=calls.reset, number=number,
+                             repeat=3))
+    print("{}: {:.2f} us per call".format(name, time / number * 1e6))
+    # Repeated calls with the same names, which are served from the memos
+    calls.fresh = fresh[:1] * number
+    time = min(timeit.repeat(function, setup=calls.reset, number=number,
+                             repeat=3))
+    print("{} (memoized): {:.2f} us per call".format(name,
+                                                      time / number * 1e6))
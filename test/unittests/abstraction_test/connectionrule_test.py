@@ -2,13 +2,26 @@ from __future__ import division
 from itertools import groupby
 import unittest
 import random
+import shutil
+import tempfile
+import numpy
 import nineml.units as un
 from nineml.utils.comprehensive_example import conA
 from nineml.abstraction.connectionrule import (
     all_to_all_connection_rule, one_to_one_connection_rule,
     explicit_connection_rule, probabilistic_connection_rule,
     random_fan_in_connection_rule, random_fan_out_connection_rule)
-from nineml.user.connectionrule import (ConnectionRuleProperties, Connectivity)
+from nineml.user.connectionrule import (
+    ConnectionRuleProperties, Connectivity, ConnectivityCache,
+    InverseConnectivity)
+from nineml.values import ArrayValue
+from nineml.abstraction import (
+    Dynamics, Regime, AnalogReceivePort, AnalogSendPort, Parameter,
+    StateVariable)
+from nineml.user import (
+    DynamicsProperties, AnalogConnectionGroup, Property)
+from nineml.user.component_array import ComponentArray
+from nineml.exceptions import NineMLUsageError
 
 # Fix seed to remove stochasticity from probabilistic connectivity
 random.seed(12345)
@@ -44,6 +57,28 @@ class Connectivity_test(unittest.TestCase):
         self.assertEqual(
             connections, [(0, 2), (0, 4), (1, 2), (3, 4), (5, 5)])
 
+    def test_explicit_validation(self):
+        def explicit(sources, destinations, **kwargs):
+            return Connectivity(
+                ConnectionRuleProperties(
+                    'explicit', explicit_connection_rule,
+                    {'sourceIndices': sources,
+                     'destinationIndices': destinations}), 4, 3, **kwargs)
+        sources = numpy.array([0, 3, 3], dtype=numpy.int64)
+        connectivity = explicit(ArrayValue.indices(sources), [2, 0, 2])
+        # Int64 indices are used without being copied
+        self.assertTrue(numpy.shares_memory(
+            connectivity.connection_arrays()[0], sources))
+        self.assertEqual(list(connectivity.connections()),
+                         [(0, 2), (3, 0), (3, 2)])
+        self.assertRaises(NineMLUsageError, explicit, [0, 1.5], [0, 1])
+        self.assertRaises(NineMLUsageError, explicit, [0, 4], [0, 1])
+        self.assertRaises(NineMLUsageError, explicit, [0, 1], [-1, 1])
+        self.assertRaises(NineMLUsageError, explicit, [0, 1, 2], [0, 1])
+        explicit([0, 1, 0], [1, 2, 1])
+        self.assertRaises(NineMLUsageError, explicit, [0, 1, 0], [1, 2, 1],
+                          allow_duplicates=False)
+
     def test_random_fan_in(self):
         number = 5
         connectivity = Connectivity(
@@ -83,3 +118,459 @@ class Connectivity_test(unittest.TestCase):
         num_conns = len(list(connectivity.connections()))
         self.assertAlmostEqual(num_conns / size ** 2, p, 2)
 
+    def test_connection_arrays(self):
+        for rule, props, sizes in (
+                (all_to_all_connection_rule, {}, (3, 5)),
+                (one_to_one_connection_rule, {}, (4, 4)),
+                (explicit_connection_rule,
+                 {'sourceIndices': [0, 0, 1, 3, 5],
+                  'destinationIndices': [2, 4, 2, 4, 5]}, (6, 6)),
+                (probabilistic_connection_rule, {'probability': 0.3},
+                 (20, 30)),
+                (random_fan_in_connection_rule, {'number': 3}, (7, 9)),
+                (random_fan_out_connection_rule, {'number': 3}, (7, 9))):
+            connectivity = Connectivity(
+                ConnectionRuleProperties('props', rule, props), *sizes,
+                random_seed=123)
+            sources, destinations = connectivity.connection_arrays()
+            self.assertEqual(sources.dtype, numpy.int64)
+            self.assertEqual(destinations.dtype, numpy.int64)
+            self.assertEqual(list(zip(sources, destinations)),
+                             list(connectivity.connections()))
+            # The same connections are generated each time
+            self.assertEqual(list(connectivity.connections()),
+                             list(connectivity.connections()))
+        # Probabilistic connectivity sampled in multiple blocks
+        connectivity = Connectivity(
+            ConnectionRuleProperties(
+                'probabilistic', probabilistic_connection_rule,
+                {'probability': 0.5}), 20, 30, random_seed=123)
+        connectivity.max_block_size = 50
+        sources, destinations = connectivity.connection_arrays()
+        self.assertTrue(numpy.all(numpy.diff(destinations) >= 0))
+        self.assertAlmostEqual(len(sources) / 600, 0.5, 1)
+
+    def test_order_independent_of_stream_size(self):
+        for rule, props in ((probabilistic_connection_rule,
+                             {'probability': 0.2}),
+                            (probabilistic_connection_rule,
+                             {'probability': 1.0}),
+                            (random_fan_in_connection_rule, {'number': 3})):
+            for stream_size in (1, 7, 1024):
+                connectivity = Connectivity(
+                    ConnectionRuleProperties('props', rule, props), 20, 30,
+                    random_seed=11)
+                connectivity.stream_size = stream_size
+                connectivity.max_block_size = 13
+                sources, destinations = connectivity.connection_arrays()
+                # Connections are ordered by destination (then by source for
+                # probabilistic connectivity) whatever the stream size, so
+                # array values of weights follow the same order
+                self.assertTrue(numpy.all(numpy.diff(destinations) >= 0))
+                if rule is probabilistic_connection_rule:
+                    self.assertTrue(numpy.all(numpy.diff(
+                        destinations * 20 + sources) > 0))
+
+    def test_stream_names(self):
+        props = ConnectionRuleProperties(
+            'probabilistic', probabilistic_connection_rule,
+            {'probability': 0.3})
+        other_props = ConnectionRuleProperties(
+            'other', probabilistic_connection_rule, {'probability': 0.3})
+
+        def sources(rule_props, **kwargs):
+            return Connectivity(rule_props, 20, 30, random_seed=5,
+                                **kwargs).connection_arrays()[0]
+        self.assertEqual(Connectivity(props, 2, 3).stream_name,
+                         'probabilistic')
+        self.assertTrue(numpy.array_equal(sources(props), sources(props)))
+        # Connectivities that share a seed are keyed by their stream names
+        self.assertFalse(numpy.array_equal(sources(props),
+                                           sources(other_props)))
+        self.assertFalse(numpy.array_equal(
+            sources(props, stream_name='ProjA'),
+            sources(props, stream_name='ProjB')))
+        self.assertTrue(numpy.array_equal(
+            sources(props, stream_name='ProjA'),
+            sources(other_props, stream_name='ProjA')))
+
+    def test_sparse_matrices(self):
+        connectivity = Connectivity(
+            ConnectionRuleProperties('explicit', explicit_connection_rule,
+                                     {'sourceIndices': [3, 0, 1, 0, 3],
+                                      'destinationIndices': [4, 4, 2, 2, 0]}),
+            4, 5)
+        dense = numpy.zeros((4, 5))
+        dense[[3, 0, 1, 0, 3], [4, 4, 2, 2, 0]] = 1.0
+        for matrix in (connectivity.to_coo(), connectivity.to_csr(),
+                       connectivity.to_csc()):
+            self.assertEqual(matrix.shape, (4, 5))
+            self.assertTrue(numpy.array_equal(matrix.toarray(), dense))
+        self.assertEqual(connectivity.to_csr().format, 'csr')
+        self.assertEqual(list(connectivity.to_csr().indptr), [0, 2, 3, 3, 5])
+        self.assertEqual(list(connectivity.to_csc().indptr),
+                         [0, 1, 1, 3, 3, 5])
+        # Weights and delays from array and single values
+        weights = ArrayValue([1.0, 2.0, 3.0, 4.0, 5.0]) * un.nA
+        weight_matrix, delay_matrix = connectivity.to_csr(weights,
+                                                          1.5 * un.ms)
+        self.assertEqual(weight_matrix[0, 2], 4.0)
+        self.assertEqual(weight_matrix[3, 0], 5.0)
+        self.assertTrue(numpy.all(delay_matrix.data == 1.5))
+        self.assertTrue(numpy.array_equal(
+            connectivity.to_coo(weights).data, [1.0, 2.0, 3.0, 4.0, 5.0]))
+        self.assertRaises(NineMLUsageError, connectivity.to_csc,
+                          ArrayValue([1.0, 2.0]) * un.nA)
+
+    def test_rank_partitions(self):
+        num_ranks = 3
+        for rule, props in (
+                (all_to_all_connection_rule, {}),
+                (one_to_one_connection_rule, {}),
+                (probabilistic_connection_rule, {'probability': 0.1}),
+                (random_fan_in_connection_rule, {'number': 3}),
+                (random_fan_out_connection_rule, {'number': 3})):
+            rule_props = ConnectionRuleProperties('props', rule, props)
+            full = Connectivity(rule_props, 50, 50, random_seed=7)
+            full.stream_size = 8
+            expected = sorted(full.connections())
+            partitioned = []
+            for rank in range(num_ranks):
+                local = Connectivity(rule_props, 50, 50, random_seed=7,
+                                     rank=rank, num_ranks=num_ranks)
+                local.stream_size = 8
+                sources, destinations = local.connection_arrays()
+                self.assertTrue(numpy.all(
+                    (destinations >= rank * 50 // num_ranks) &
+                    (destinations < (rank + 1) * 50 // num_ranks)))
+                partitioned.extend(zip(sources.tolist(),
+                                       destinations.tolist()))
+            # The union of the partitions is identical to the full
+            # connectivity
+            self.assertEqual(sorted(partitioned), expected,
+                             "Mismatch for {} rule".format(rule.lib_type))
+            # Arbitrary subsets of destinations
+            subset = Connectivity(rule_props, 50, 50, random_seed=7,
+                                  destinations=[45, 3, 17])
+            subset.stream_size = 8
+            self.assertEqual(
+                sorted(subset.connections()),
+                [c for c in expected if c[1] in (3, 17, 45)])
+        self.assertRaises(NineMLUsageError, Connectivity, rule_props, 50, 50,
+                          rank=3, num_ranks=3)
+        self.assertRaises(NineMLUsageError, Connectivity, rule_props, 50, 50,
+                          destinations=[50])
+        self.assertRaises(NineMLUsageError, Connectivity, rule_props, 50, 50,
+                          destinations=[0], rank=0, num_ranks=2)
+
+    def test_connection_chunks(self):
+        for rule, props in (
+                (all_to_all_connection_rule, {}),
+                (one_to_one_connection_rule, {}),
+                (probabilistic_connection_rule, {'probability': 0.2}),
+                (random_fan_in_connection_rule, {'number': 3}),
+                (random_fan_out_connection_rule, {'number': 3})):
+            connectivity = Connectivity(
+                ConnectionRuleProperties('props', rule, props), 40, 40,
+                random_seed=11, rank=1, num_ranks=2)
+            connectivity.stream_size = 16
+            sources, destinations = connectivity.connection_arrays()
+            chunks = list(connectivity.connection_chunks(chunk_size=7))
+            self.assertTrue(all(len(s) == 7 for s, _ in chunks[:-1]))
+            self.assertTrue(0 < len(chunks[-1][0]) <= 7)
+            self.assertTrue(numpy.array_equal(
+                numpy.concatenate([s for s, _ in chunks]), sources))
+            self.assertTrue(numpy.array_equal(
+                numpy.concatenate([d for _, d in chunks]), destinations))
+            # The chunk size is limited by the memory ceiling (16 bytes per
+            # connection)
+            self.assertTrue(all(len(s) <= 4 for s, _ in
+                                connectivity.connection_chunks(
+                                    max_memory=64)))
+        self.assertRaises(NineMLUsageError, connectivity.connection_chunks,
+                          chunk_size=0)
+
+    def test_connection_group_chunks(self):
+        dynamics = Dynamics(
+            name='Cell', regimes=[Regime('dv/dt = i / C', name='default')],
+            analog_ports=[AnalogReceivePort('i', dimension=un.current),
+                          AnalogSendPort('v', dimension=un.voltage)],
+            parameters=[Parameter('C', dimension=un.capacitance)],
+            state_variables=[StateVariable('v', dimension=un.voltage)])
+        props = DynamicsProperties('CellProps', dynamics,
+                                   properties={'C': 1.0 * un.nF})
+        group = AnalogConnectionGroup(
+            'Group', ComponentArray('Source', 5, props),
+            ComponentArray('Destination', 5, props), 'v', 'i',
+            delay=ArrayValue(numpy.arange(25.0)) * un.ms,
+            connection_rule_properties=ConnectionRuleProperties(
+                'all_to_all', all_to_all_connection_rule))
+        chunks = list(group.connection_chunks(weights=2.0 * un.nA,
+                                              chunk_size=10))
+        self.assertEqual([len(c[0]) for c in chunks], [10, 10, 5])
+        self.assertTrue(numpy.array_equal(
+            numpy.concatenate([c[3] for c in chunks]), numpy.arange(25.0)))
+        self.assertTrue(all(numpy.all(c[2] == 2.0) for c in chunks))
+        # 32 bytes per connection with weights and delays
+        chunks = list(group.connection_chunks(weights=2.0 * un.nA,
+                                              max_memory=32 * 8))
+        self.assertEqual([len(c[0]) for c in chunks], [8, 8, 8, 1])
+        self.assertIsNone(next(group.connection_chunks())[2])
+
+    def test_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            props = ConnectionRuleProperties(
+                'probabilistic', probabilistic_connection_rule,
+                {'probability': 0.1})
+            connectivity = Connectivity(props, 30, 40, random_seed=3,
+                                        cache=cache_dir)
+            self.assertNotIn(connectivity, connectivity.cache)
+            # The connections are streamed to the cache in blocks on a miss
+            # instead of being concatenated in memory
+            connectivity.max_block_size = 7
+            connectivity._concatenate = None
+            connectivity.cache.copy_size = 16
+            sources, destinations = connectivity.connection_arrays()
+            self.assertIsInstance(sources, numpy.memmap)
+            self.assertIn(connectivity, connectivity.cache)
+            uncached_sources, uncached_destinations = Connectivity(
+                props, 30, 40, random_seed=3).connection_arrays()
+            self.assertTrue(numpy.array_equal(sources, uncached_sources))
+            self.assertTrue(numpy.array_equal(destinations,
+                                              uncached_destinations))
+            # A new connectivity object with the same rule, sizes and seed
+            # loads the connections from the cache instead of generating them
+            cached = Connectivity(props.clone(), 30, 40, random_seed=3,
+                                  cache=ConnectivityCache(cache_dir))
+            cached._generate_blocks = None
+            cached_sources, cached_destinations = cached.connection_arrays()
+            self.assertIsInstance(cached_sources, numpy.memmap)
+            self.assertTrue(numpy.array_equal(cached_sources, sources))
+            self.assertTrue(numpy.array_equal(cached_destinations,
+                                              destinations))
+            self.assertTrue(numpy.array_equal(
+                numpy.concatenate([s for s, _ in cached.connection_chunks(
+                    chunk_size=10)]), sources))
+            # Changes to the seed or the properties change the key
+            keys = set(connectivity.cache.key(c) for c in (
+                connectivity,
+                Connectivity(props, 30, 40, random_seed=4),
+                Connectivity(ConnectionRuleProperties(
+                    'probabilistic', probabilistic_connection_rule,
+                    {'probability': 0.2}), 30, 40, random_seed=3),
+                Connectivity(props, 30, 40, random_seed=3, rank=0,
+                             num_ranks=2)))
+            self.assertEqual(len(keys), 4)
+            # Deterministic rules aren't cached
+            all_to_all = Connectivity(
+                ConnectionRuleProperties('all_to_all',
+                                         all_to_all_connection_rule),
+                3, 5, cache=cache_dir)
+            all_to_all.connection_arrays()
+            self.assertNotIn(all_to_all, all_to_all.cache)
+            connectivity.cache.clear()
+            self.assertNotIn(connectivity, connectivity.cache)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_degrees(self):
+        for rule, props, exact_sampled in (
+                (all_to_all_connection_rule, {}, True),
+                (one_to_one_connection_rule, {}, True),
+                (explicit_connection_rule,
+                 {'sourceIndices': [0, 0, 1, 3, 5],
+                  'destinationIndices': [2, 4, 2, 4, 5]}, True),
+                (probabilistic_connection_rule, {'probability': 0.1}, False),
+                (random_fan_in_connection_rule, {'number': 3}, False),
+                (random_fan_out_connection_rule, {'number': 3}, False)):
+            for kwargs in ({}, {'destinations': [1, 2, 4]}):
+                connectivity = Connectivity(
+                    ConnectionRuleProperties('props', rule, props), 6, 6,
+                    random_seed=9, **kwargs)
+                sources, destinations = connectivity.connection_arrays()
+                out_degrees = numpy.bincount(sources, minlength=6)
+                in_degrees = numpy.bincount(destinations, minlength=6)
+                self.assertTrue(numpy.array_equal(
+                    connectivity.out_degrees(exact=True), out_degrees))
+                self.assertTrue(numpy.array_equal(
+                    connectivity.in_degrees(exact=True), in_degrees))
+                self.assertEqual(connectivity.num_connections(exact=True),
+                                 len(sources))
+                # Sampled degrees are consistent and reproducible
+                sampled_out = connectivity.out_degrees()
+                sampled_in = connectivity.in_degrees()
+                self.assertEqual(sampled_out.sum(), sampled_in.sum())
+                self.assertTrue(numpy.array_equal(connectivity.in_degrees(),
+                                                  sampled_in))
+                if 'destinations' in kwargs:
+                    self.assertFalse(numpy.any(sampled_in[[0, 3, 5]]))
+                if exact_sampled:
+                    self.assertTrue(numpy.array_equal(sampled_out,
+                                                      out_degrees))
+                    self.assertTrue(numpy.array_equal(sampled_in,
+                                                      in_degrees))
+                elif rule is random_fan_in_connection_rule:
+                    self.assertTrue(numpy.array_equal(sampled_in,
+                                                      in_degrees))
+        # Sampled in-degrees of probabilistic connectivity are binomial
+        connectivity = Connectivity(
+            ConnectionRuleProperties(
+                'probabilistic', probabilistic_connection_rule,
+                {'probability': 0.05}), 2000, 3000, random_seed=9)
+        in_degrees = connectivity.in_degrees()
+        self.assertAlmostEqual(in_degrees.mean(), 100.0, delta=1.0)
+        self.assertAlmostEqual(in_degrees.var(), 95.0, delta=10.0)
+        self.assertEqual(connectivity.memory_estimate(),
+                         16 * in_degrees.sum())
+
+    def test_sequential_rng(self):
+        connectivity = Connectivity(
+            ConnectionRuleProperties(
+                'random_fan_in', random_fan_in_connection_rule,
+                {'number': 4}), 10, 6, random_seed=5, rng_cls=random.Random)
+        connections = list(connectivity.connections())
+        self.assertEqual(len(connections), 24)
+        self.assertEqual(connections, list(connectivity.connections()))
+        # The arrays hold the same connections as the sequential generator
+        self.assertEqual(list(zip(*connectivity.connection_arrays())),
+                         connections)
+
+    def test_inverse(self):
+        connectivity = Connectivity(
+            ConnectionRuleProperties(
+                'probabilistic', probabilistic_connection_rule,
+                {'probability': 0.3}), 20, 30, random_seed=7)
+        inverse = InverseConnectivity(connectivity)
+        self.assertEqual((inverse.source_size, inverse.destination_size),
+                         (30, 20))
+        sources, destinations = connectivity.connection_arrays()
+        inv_sources, inv_destinations = inverse.connection_arrays()
+        # The forward connections are reversed in the same order
+        self.assertTrue(numpy.array_equal(inv_sources, destinations))
+        self.assertTrue(numpy.array_equal(inv_destinations, sources))
+        self.assertEqual(list(inverse.connections()),
+                         [(d, s) for s, d in connectivity.connections()])
+        # The inverse reuses the arrays of the forward connectivity, which
+        # are only generated once
+        self.assertIs(inv_sources, destinations)
+        self.assertIs(inverse.connection_arrays()[0], inv_sources)
+        self.assertEqual(inverse.to_csr().format, 'csr')
+        self.assertTrue(numpy.array_equal(inverse.to_csr().toarray(),
+                                          connectivity.to_csc().toarray().T))
+        self.assertTrue(numpy.array_equal(inverse.to_csc().indptr,
+                                          connectivity.to_csr().indptr))
+        self.assertTrue(numpy.array_equal(inverse.out_degrees(),
+                                          connectivity.in_degrees()))
+        self.assertEqual(inverse.num_connections(exact=True), len(sources))
+        chunks = list(InverseConnectivity(connectivity).connection_chunks(
+            chunk_size=7))
+        self.assertTrue(numpy.array_equal(
+            numpy.concatenate([s for s, _ in chunks]), destinations))
+        self.assertEqual(inverse, InverseConnectivity(connectivity))
+        self.assertRaises(NineMLUsageError, InverseConnectivity, 'invalid')
+
+
+    def test_memoized_arrays(self):
+        props = ConnectionRuleProperties(
+            'probabilistic', probabilistic_connection_rule,
+            {'probability': 0.3})
+        connectivity = Connectivity(props, 20, 30, random_seed=7)
+        sources, destinations = connectivity.connection_arrays()
+        self.assertIs(connectivity.connection_arrays()[0], sources)
+        self.assertFalse(sources.flags.writeable)
+        self.assertFalse(destinations.flags.writeable)
+        # The chunks are sliced from the memoized arrays
+        chunk = next(connectivity.connection_chunks(chunk_size=5))[0]
+        self.assertTrue(numpy.shares_memory(chunk, sources))
+        # The arrays are regenerated when the rule changes
+        props.set(Property('probability', 0.6 * un.unitless))
+        self.assertIsNot(connectivity.connection_arrays()[0], sources)
+        self.assertGreater(len(connectivity.connection_arrays()[0]),
+                           len(sources))
+
+    def test_lazy_connections(self):
+        # The connections are streamed without generating all of them
+        connectivity = Connectivity(
+            ConnectionRuleProperties('all_to_all',
+                                     all_to_all_connection_rule),
+            10 ** 5, 10 ** 5)
+        connections = connectivity.connections()
+        self.assertEqual(next(connections), (0, 0))
+        self.assertEqual(next(connections), (0, 1))
+        self.assertEqual(next(InverseConnectivity(connectivity).connections()),
+                         (0, 0))
+
+
+class ProbabilisticSampling_test(unittest.TestCase):
+    """
+    Compares the degree distributions of probabilistic connectivity sampled
+    with geometric skips to those sampled by testing each pair in turn
+    """
+
+    num_sources = 400
+    num_destinations = 500
+    probability = 0.02
+    # Critical value of the two-sample Kolmogorov-Smirnov statistic for a
+    # significance level of 0.001
+    ks_coefficient = 1.95
+
+    def setUp(self):
+        props = ConnectionRuleProperties(
+            'probabilistic', probabilistic_connection_rule,
+            {'probability': self.probability})
+        self.skip_sampled = Connectivity(
+            props, self.num_sources, self.num_destinations, random_seed=1)
+        self.pair_sampled = Connectivity(
+            props, self.num_sources, self.num_destinations, random_seed=1,
+            rng_cls=random.Random)
+
+    def _degrees(self, connectivity):
+        sources, destinations = (numpy.array(a, dtype=int) for a in zip(
+            *connectivity.connections()))
+        return (numpy.bincount(sources, minlength=self.num_sources),
+                numpy.bincount(destinations, minlength=self.num_destinations))
+
+    def _assert_same_distribution(self, a, b):
+        values = numpy.union1d(a, b)
+        cdf_a = numpy.searchsorted(numpy.sort(a), values, side='right')
+        cdf_b = numpy.searchsorted(numpy.sort(b), values, side='right')
+        statistic = numpy.max(numpy.abs(cdf_a / len(a) - cdf_b / len(b)))
+        critical = self.ks_coefficient * numpy.sqrt(
+            (len(a) + len(b)) / (len(a) * len(b)))
+        self.assertLess(statistic, critical)
+
+    def test_connections(self):
+        sources, destinations = self.skip_sampled.connection_arrays()
+        pair_indices = destinations * self.num_sources + sources
+        # Connections are unique and ordered by destination then source
+        self.assertTrue(numpy.all(numpy.diff(pair_indices) > 0))
+        self.assertGreaterEqual(sources.min(), 0)
+        self.assertLess(sources.max(), self.num_sources)
+        self.assertGreaterEqual(destinations.min(), 0)
+        self.assertLess(destinations.max(), self.num_destinations)
+
+    def test_degree_distributions(self):
+        skip_out, skip_in = self._degrees(self.skip_sampled)
+        pair_out, pair_in = self._degrees(self.pair_sampled)
+        for degrees, n in ((skip_out, self.num_destinations),
+                           (pair_out, self.num_destinations),
+                           (skip_in, self.num_sources),
+                           (pair_in, self.num_sources)):
+            # The degrees are binomially distributed
+            mean = n * self.probability
+            std = numpy.sqrt(n * self.probability * (1 - self.probability))
+            self.assertAlmostEqual(degrees.mean(), mean,
+                                   delta=4 * std / numpy.sqrt(len(degrees)))
+            self.assertAlmostEqual(degrees.std(), std, delta=0.1 * std)
+        self._assert_same_distribution(skip_out, pair_out)
+        self._assert_same_distribution(skip_in, pair_in)
+
+    def test_limits(self):
+        for p, num_conns in ((0.0, 0), (1.0, 12)):
+            connectivity = Connectivity(
+                ConnectionRuleProperties(
+                    'probabilistic', probabilistic_connection_rule,
+                    {'probability': p}), 3, 4)
+            self.assertEqual(len(connectivity.connection_arrays()[0]),
+                             num_conns)
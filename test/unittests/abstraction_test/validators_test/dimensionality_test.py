@@ -153,3 +153,21 @@ class Dimensionality_test(unittest.TestCase):
             parameters=[Parameter('P1', dimension=un.voltage),
                         Parameter('P2', dimension=un.time)],
         )
+
+    def test_cached_dimensions(self):
+        # Validating a class with the same expressions but different symbol
+        # dimensions should not pick up the dimensions cached for the first
+        kwargs = dict(
+            name='A',
+            state_variables=[StateVariable('SV1', dimension=un.voltage)],
+            aliases=['A1 := P1 * P2'],
+            regimes=[Regime('dSV1/dt = A1', name='R1')])
+        Dynamics(parameters=[Parameter('P1', dimension=un.voltage),
+                             Parameter('P2', dimension=un.per_time)],
+                 **kwargs)
+        self.assertRaises(
+            NineMLDimensionError,
+            Dynamics,
+            parameters=[Parameter('P1', dimension=un.voltage),
+                        Parameter('P2', dimension=un.time)],
+            **kwargs)
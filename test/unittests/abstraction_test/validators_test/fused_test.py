@@ -0,0 +1,101 @@
+from __future__ import division
+import unittest
+from nineml.abstraction import (
+    Parameter, Dynamics, Regime, On, OutputEvent, StateVariable, Alias)
+from nineml.abstraction.ports import (
+    AnalogSendPort, AnalogReceivePort, EventSendPort, EventReceivePort)
+from nineml.abstraction.dynamics.visitors.validators import DynamicsValidator
+from nineml.abstraction.dynamics.visitors.validators.fused import (
+    FusedDynamicsValidator)
+from nineml.user import MultiDynamics
+from nineml.utils.comprehensive_example import instances_of_all_types
+from nineml import units as un
+
+
+def _make_dynamics(**kwargs):
+    kw = dict(
+        name='A',
+        aliases=['A1 := P1 * SV1', 'A2 := ARP1 + SV2'],
+        state_variables=[StateVariable('SV1', dimension=un.voltage),
+                         StateVariable('SV2', dimension=un.current)],
+        regimes=[
+            Regime('dSV1/dt = -SV1 / P2',
+                   'dSV2/dt = -SV2 / P2',
+                   transitions=[On('SV1 > P3', do=[OutputEvent('emit')],
+                                   to='R2'),
+                                On('spikein', do=['SV2 = SV2 + ARP1'])],
+                   name='R1'),
+            Regime('dSV1/dt = -SV1 / P2',
+                   name='R2', transitions=On('SV1 < P3', to='R1'))],
+        analog_ports=[AnalogReceivePort('ARP1', dimension=un.current),
+                      AnalogSendPort('A1', dimension=un.voltage ** 2),
+                      AnalogSendPort('A2', dimension=un.current)],
+        event_ports=[EventSendPort('emit'), EventReceivePort('spikein')],
+        parameters=[Parameter('P1', dimension=un.voltage),
+                    Parameter('P2', dimension=un.time),
+                    Parameter('P3', dimension=un.voltage)],
+        validate=False, strict_unused=False)
+    kw.update(kwargs)
+    return Dynamics(**kw)
+
+
+class FusedDynamicsValidator_test(unittest.TestCase):
+
+    def _errors(self, component_class):
+        errors = []
+        for validate in (DynamicsValidator.validate_componentclass_by_parts,
+                         FusedDynamicsValidator):
+            try:
+                validate(component_class)
+            except Exception as e:
+                errors.append((type(e), str(e)))
+            else:
+                errors.append(None)
+        return errors
+
+    def test_valid_classes(self):
+        for cc in (list(instances_of_all_types['Dynamics'].values()) +
+                   list(instances_of_all_types[
+                       MultiDynamics.nineml_type].values()) +
+                   [_make_dynamics()]):
+            self.assertEqual(self._errors(cc), [None, None],
+                             "Mismatching validation of {}".format(cc))
+
+    def test_invalid_classes(self):
+        invalid = [
+            # Case-insensitive name conflict
+            _make_dynamics(parameters=[
+                Parameter('P1', dimension=un.voltage),
+                Parameter('P2', dimension=un.time),
+                Parameter('P3', dimension=un.voltage),
+                Parameter('sv1', dimension=un.voltage)]),
+            # Conflicting dimension names
+            _make_dynamics(parameters=[
+                Parameter('P1', dimension=un.voltage),
+                Parameter('P2', dimension=un.Dimension('voltage', t=1)),
+                Parameter('P3', dimension=un.voltage)]),
+            # Analog send port without matching alias or state variable
+            _make_dynamics(analog_ports=[
+                AnalogReceivePort('ARP1', dimension=un.current),
+                AnalogSendPort('A3', dimension=un.current)]),
+            # Recursive aliases
+            _make_dynamics(aliases=['A1 := P1 * A2', 'A2 := ARP1 * A1']),
+            # Regime island
+            _make_dynamics(regimes=[
+                Regime('dSV1/dt = -SV1 / P2', 'dSV2/dt = -SV2 / P2',
+                       transitions=[On('SV1 > P3', do=[OutputEvent('emit')]),
+                                    On('spikein', do=['SV2 = SV2 + ARP1'])],
+                       name='R1'),
+                Regime('dSV1/dt = -SV1 / P2', name='R2')]),
+            # Regime scope alias equal to the outer scope alias
+            _make_dynamics(regimes=[
+                Regime('dSV1/dt = -SV1 / P2', 'dSV2/dt = -SV2 / P2',
+                       transitions=[On('SV1 > P3', do=[OutputEvent('emit')]),
+                                    On('spikein', do=['SV2 = SV2 + ARP1'])],
+                       aliases=[Alias('A1', 'P1 * SV1')],
+                       name='R1')])]
+        for cc in invalid:
+            legacy_error, fused_error = self._errors(cc)
+            self.assertIsNotNone(legacy_error,
+                                 "{} was not found to be invalid".format(cc))
+            self.assertEqual(legacy_error, fused_error)
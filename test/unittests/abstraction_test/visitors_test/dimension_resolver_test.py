@@ -35,3 +35,9 @@ class DynamicsRequiredDefinitions_test(unittest.TestCase):
         self.assertEqual(self.a.dimension_of('A1'), un.current)
         self.assertEqual(self.a.dimension_of('A2'), un.charge)
         self.assertEqual(self.a.dimension_of('A3'), un.dimensionless)
+
+    def test_cloned_dimension_resolutions(self):
+        clone = self.a.clone()
+        for name in ('P1', 'SV1', 'A1', 'A2', 'A3'):
+            self.assertEqual(clone.dimension_of(name),
+                             self.a.dimension_of(name))
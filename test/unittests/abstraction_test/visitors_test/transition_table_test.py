@@ -0,0 +1,77 @@
+import unittest
+from nineml.abstraction.dynamics import Dynamics, Regime, On, OutputEvent
+from nineml.abstraction import Parameter
+from nineml import units as un
+from nineml.user.multi import MultiDynamics
+from nineml.exceptions import NineMLNameError
+
+
+class DynamicsTransitionTable_test(unittest.TestCase):
+
+    def setUp(self):
+        self.a = Dynamics(
+            name='A',
+            regimes=[
+                Regime('dSV1/dt = -SV1 / P1',
+                       transitions=[On('SV1 > P2', do=[OutputEvent('emit')],
+                                       to='R2'),
+                                    On('spikein', 'SV1 = SV1 + 1')],
+                       name='R1'),
+                Regime(transitions=[On('SV1 < P2', to='R1'),
+                                    On('SV1 < 0', 'SV1 = 0', to='R3'),
+                                    On('reset', to='R1')],
+                       name='R2'),
+                Regime('dSV1/dt = 1 / P1', name='R3')],
+            parameters=[Parameter('P1', dimension=un.time),
+                        Parameter('P2', dimension=un.dimensionless)])
+        self.b = Dynamics(
+            name='B',
+            regimes=[
+                Regime('dSV2/dt = -SV2 / P3',
+                       transitions=[On('toggle', to='closed')], name='open'),
+                Regime(transitions=[On('toggle', to='open')],
+                       name='closed')],
+            parameters=[Parameter('P3', dimension=un.time)])
+
+    def test_transition_table(self):
+        table = self.a.transition_table()
+        self.assertEqual(table.regime_names, ('R1', 'R2', 'R3'))
+        self.assertEqual(table.regime_index('R3'), 2)
+        self.assertRaises(NineMLNameError, table.regime_index, 'R4')
+        self.assertEqual(list(table.condition_sources), [0, 1, 1])
+        self.assertEqual(list(table.condition_targets), [1, 0, 2])
+        self.assertEqual(list(table.condition_offsets), [0, 1, 3, 3])
+        self.assertEqual([oc.trigger.rhs_str
+                          for oc in table.regime_on_conditions(1)],
+                         [oc.trigger.rhs_str
+                          for oc in self.a.regime('R2').on_conditions])
+        self.assertEqual(table.regime_on_conditions(2), [])
+        self.assertEqual(list(table.event_targets['spikein']), [0, -1, -1])
+        self.assertEqual(list(table.event_targets['reset']), [-1, 0, -1])
+        self.assertIs(table.on_event('spikein', 0),
+                      self.a.regime('R1').on_event('spikein'))
+        self.assertIsNone(table.on_event('reset', 0))
+        self.assertRaises(NineMLNameError, table.on_event, 'missing', 0)
+
+    def test_multi_transition_table(self):
+        multi = MultiDynamics(
+            name='M', sub_components={'a': self.a, 'b': self.b},
+            port_exposures=[('a', 'spikein'), ('a', 'reset'),
+                            ('b', 'toggle'), ('a', 'emit')])
+        table = multi.transition_table()
+        self.assertEqual(table.num_regimes, 6)
+        self.assertEqual(set(table.regime_names), set(multi.regime_names))
+        # The transitions of the multi-regimes are looked up by ID
+        index = table.regime_index('R2___open')
+        self.assertEqual(
+            table.regime_names[table.event_targets['toggle__b'][index]],
+            'R2___closed')
+        self.assertEqual(
+            table.regime_names[table.event_targets['reset__a'][index]],
+            'R1___open')
+        on_conditions = table.regime_on_conditions(index)
+        self.assertEqual(len(on_conditions), 2)
+        self.assertEqual(
+            set(table.regime_names[t] for t in table.condition_targets[
+                table.condition_sources == index]),
+            set(['R1___open', 'R3___open']))
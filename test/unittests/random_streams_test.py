@@ -0,0 +1,74 @@
+import unittest
+import numpy
+from nineml.abstraction import RandomDistribution, Parameter
+from nineml.user import RandomDistributionProperties
+from nineml.values import RandomDistributionValue
+from nineml.utils.random_streams import RandomStreams
+from nineml.exceptions import NineMLUsageError
+from nineml import units as un
+
+
+class RandomStreams_test(unittest.TestCase):
+
+    def test_streams(self):
+        streams = RandomStreams(42, 'proj')
+        first = streams.generator(3).random(10)
+        # Streams restart from the beginning and don't depend on the order
+        # they are generated in
+        streams.generator(7).random(100)
+        self.assertTrue(numpy.array_equal(
+            RandomStreams(42, 'proj').generator(3).random(10), first))
+        self.assertFalse(numpy.array_equal(streams.generator(4).random(10),
+                                           first))
+        self.assertFalse(numpy.array_equal(
+            RandomStreams(42, 'other').generator(3).random(10), first))
+        self.assertFalse(numpy.array_equal(
+            RandomStreams(43, 'proj').generator(3).random(10), first))
+
+    def test_sample_subsets(self):
+        streams = RandomStreams(1)
+        draw = lambda rng, n: rng.random(n)  # @IgnorePep8
+        full = streams.sample(draw, None, 3000, block_size=100)
+        indices = [2999, 5, 1234, 5]
+        self.assertTrue(numpy.array_equal(
+            streams.sample(draw, indices, 3000, block_size=100),
+            full[indices]))
+        self.assertRaises(NineMLUsageError, streams.sample, draw, [3000],
+                          3000)
+
+
+class RandomDistributionValueSample_test(unittest.TestCase):
+
+    def setUp(self):
+        normal = RandomDistribution(
+            name="Normal",
+            parameters=[Parameter('mean', dimension=un.dimensionless),
+                        Parameter('variance', dimension=un.dimensionless)],
+            standard_library='http://www.uncertml.org/distributions/normal')
+        self.value = RandomDistributionValue(RandomDistributionProperties(
+            name="NormalProps", definition=normal,
+            properties={'mean': 5.0, 'variance': 4.0}))
+
+    def test_sample(self):
+        values = self.value.sample(10000, seed=3)
+        self.assertAlmostEqual(values.mean(), 5.0, delta=0.1)
+        self.assertAlmostEqual(values.std(), 2.0, delta=0.1)
+        self.assertTrue(numpy.array_equal(
+            self.value.sample(10000, seed=3, indices=[9999, 17]),
+            values[[9999, 17]]))
+        self.assertFalse(numpy.array_equal(
+            self.value.sample(10000, seed=3, name='weight'), values))
+
+    def test_unsupported(self):
+        for dist_type in ('pareto', 'dirichlet'):
+            distribution = RandomDistribution(
+                name="Dist",
+                parameters=[Parameter('P1', dimension=un.dimensionless)],
+                standard_library=(
+                    'http://www.uncertml.org/distributions/' + dist_type))
+            value = RandomDistributionValue(RandomDistributionProperties(
+                name="DistProps", definition=distribution,
+                properties={'P1': 1.0}))
+            # Pareto distributions require 'scale' and 'shape' properties and
+            # sampling of Dirichlet distributions isn't supported
+            self.assertRaises(NineMLUsageError, value.sample, 10, seed=1)
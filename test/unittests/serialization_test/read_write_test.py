@@ -2,9 +2,14 @@ from __future__ import unicode_literals
 import unittest
 import tempfile
 import os
+import numpy
 from nineml import read, write
 from nineml import DynamicsProperties
 from nineml.utils.comprehensive_example import dynA, dynB
+from nineml.abstraction.connectionrule import explicit_connection_rule
+from nineml.user import ConnectionRuleProperties
+from nineml.user.connectionrule import Connectivity
+from nineml.values import ArrayValue
 
 
 class TestReadWrite(unittest.TestCase):
@@ -23,3 +28,37 @@ class TestReadWrite(unittest.TestCase):
             definition='{}#dynB'.format(os.path.join(tmp_dir, self.tmp_path)),
             properties={'P1': 1, 'P2': 2, 'P3': 3})
         self.assertEqual(dynB, dynBProps.component_class)
+
+    def test_explicit_index_arrays(self):
+        tmp_dir = tempfile.mkdtemp()
+        sources = numpy.arange(1000, dtype=numpy.int64)
+        destinations = sources[::-1].copy()
+        props = ConnectionRuleProperties(
+            'ExplicitProps', explicit_connection_rule,
+            {'sourceIndices': ArrayValue.indices(sources),
+             'destinationIndices': ArrayValue.indices(destinations)})
+        # Int64 indices are held in a read-only view instead of being copied
+        # or converted to floats
+        values = props.property('sourceIndices').value.values
+        self.assertTrue(numpy.shares_memory(values, sources))
+        self.assertFalse(values.flags.writeable)
+        # General array values are still converted to floats
+        self.assertEqual(ArrayValue(sources).values.dtype, numpy.float64)
+        # Only the dataset layout stores the indices as integers
+        for fname, kwargs, dtype in (
+                ('rows.h5', {}, numpy.float64),
+                ('datasets.h5', {'array_datasets': True}, numpy.int64),
+                ('rows.xml', {}, numpy.float64)):
+            path = os.path.join(tmp_dir, fname)
+            write(path, explicit_connection_rule, props, **kwargs)
+            reread = read(path + '#ExplicitProps', reload=True)
+            for name in ('sourceIndices', 'destinationIndices'):
+                self.assertEqual(reread.property(name), props.property(name))
+            self.assertEqual(numpy.asarray(
+                reread.property('sourceIndices').value.values).dtype, dtype)
+            connectivity = Connectivity(reread, 1000, 1000)
+            reread_sources, reread_destinations = (
+                connectivity.connection_arrays())
+            self.assertTrue(numpy.array_equal(reread_sources, sources))
+            self.assertTrue(numpy.array_equal(reread_destinations,
+                                              destinations))
@@ -0,0 +1,82 @@
+from __future__ import division
+import gc
+import unittest
+import numpy
+from nineml.user import DynamicsProperties, Property, Initial
+from nineml.values import ArrayValue
+from nineml.exceptions import NineMLUsageError
+from nineml.simulation import DynamicsSimulator
+from nineml.simulation.dynamics import compiled_dynamics
+from nineml import units as un
+from .linear_test import liaf, alpha, liaf_properties
+
+
+class DynamicsSimulator_test(unittest.TestCase):
+
+    def test_liaf_firing(self):
+        size = 4
+        sim = DynamicsSimulator(liaf_properties, size, 0.01 * un.ms)
+        self.assertEqual(sim.regime_names, ('refractory', 'subthreshold'))
+        self.assertTrue(numpy.all(sim.regimes == 1))
+        currents = numpy.array([0.0, 2e-8, 3e-8, 4e-8])
+        sim.set_input('i_synaptic', currents)
+        indices, times = sim.run(0.1)['spike_output']
+        # Instance without input shouldn't spike and the others should
+        # spike more often with increasing input
+        counts = numpy.bincount(indices, minlength=size)
+        self.assertEqual(counts[0], 0)
+        self.assertTrue(numpy.all(numpy.diff(counts[1:]) > 0))
+        # Compare inter-spike intervals with the analytical solution
+        for i in range(1, size):
+            v_inf = currents[i] * 1.5e6
+            isi = 0.002 + 0.02 * numpy.log((v_inf - 0.01) / (v_inf - 0.02))
+            self.assertAlmostEqual(numpy.diff(times[indices == i]).mean(),
+                                   isi, delta=2e-5)
+
+    def test_heterogeneous_properties(self):
+        props = liaf_properties.clone()
+        props.set(Property('tau', ArrayValue([10.0, 20.0, 40.0]) * un.ms))
+        for method in ('euler', 'rk4'):
+            sim = DynamicsSimulator(props, 3, 0.1 * un.ms, method=method)
+            sim.set_input('i_synaptic', 1e-8)
+            sim.run(5 * un.ms)
+            expected = 0.015 * (1 - numpy.exp(-0.005 / numpy.array(
+                [0.01, 0.02, 0.04])))
+            self.assertTrue(numpy.allclose(sim.state('v'), expected,
+                                           rtol=(1e-2 if method == 'euler'
+                                                 else 1e-6)))
+
+    def test_receive_events(self):
+        props = DynamicsProperties(
+            name='SampleAlpha', definition=alpha,
+            properties=[Property('tau', 20.0 * un.ms)],
+            initial_values=[Initial('A', 0.0 * un.nA),
+                            Initial('B', 0.0 * un.nA)])
+        sim = DynamicsSimulator(props, 3, 0.1 * un.ms)
+        sim.set_input('q', 1e-9)
+        sim.receive_events('spike', [0, 2, 2])
+        self.assertTrue(numpy.allclose(sim.state('B'), [1e-9, 0.0, 2e-9]))
+        sim.run(10 * un.ms)
+        self.assertTrue(numpy.allclose(
+            sim.analog_output('Isyn'),
+            numpy.array([1e-9, 0.0, 2e-9]) * 0.5 * numpy.exp(-0.5)))
+
+    def test_cache_releases_classes(self):
+        compiled_dynamics.clear()
+        props = liaf_properties.clone()
+        sim = DynamicsSimulator(props, 2, 0.1 * un.ms)
+        sim.run(1 * un.ms)
+        self.assertEqual(len(compiled_dynamics), 1)
+        del props, sim
+        gc.collect()
+        self.assertEqual(len(compiled_dynamics), 0)
+
+    def test_missing_initial_value(self):
+        props = DynamicsProperties(
+            name='SampleLIAF', definition=liaf,
+            properties=liaf_properties.properties)
+        self.assertRaises(NineMLUsageError, DynamicsSimulator, props, 1,
+                          0.1 * un.ms)
+        sim = DynamicsSimulator(props, 2, 0.1 * un.ms, initial_states={
+            'v': numpy.array([0.0, 0.005]), 'refractory_end': 0.0})
+        self.assertTrue(numpy.all(sim.state('v') == [0.0, 0.005]))
@@ -0,0 +1,95 @@
+from __future__ import division
+import unittest
+import numpy
+from nineml.abstraction import ConnectionRule
+from nineml.user import (
+    DynamicsProperties, Property, Initial, Population, Projection,
+    ConnectionRuleProperties, Network, EventConnectionGroup)
+from nineml.values import ArrayValue
+from nineml.simulation import DynamicsSimulator
+from nineml.simulation.events import EventDelivery, EventRingBuffer
+from nineml import units as un
+from .linear_test import alpha, liaf_properties
+
+
+all_to_all = ConnectionRuleProperties(
+    'AllToAll', ConnectionRule(
+        'AllToAllClass', standard_library=(
+            "http://nineml.net/9ML/1.0/connectionrules/AllToAll")), {})
+
+alpha_properties = DynamicsProperties(
+    name='SampleAlpha', definition=alpha,
+    properties=[Property('tau', 20.0 * un.ms)],
+    initial_values=[Initial('A', 0.0 * un.nA), Initial('B', 0.0 * un.nA)])
+
+
+def event_connection_group(delay):
+    projection = Projection(
+        'Proj', Population('Pre', 3, liaf_properties),
+        Population('Post', 2, liaf_properties), response=alpha_properties,
+        delay=delay, connection_rule_properties=all_to_all,
+        port_connections=[('pre', 'spike_output', 'response', 'spike'),
+                          ('response', 'Isyn', 'post', 'i_synaptic')])
+    network = Network('Net', populations=[projection.pre, projection.post],
+                      projections=[projection])
+    _, connection_groups = network.flatten()
+    return next(cg for cg in connection_groups
+                if isinstance(cg, EventConnectionGroup))
+
+
+class EventRingBuffer_test(unittest.TestCase):
+
+    def test_push_pop(self):
+        buff = EventRingBuffer(4)
+        buff.push(numpy.array([2, 0, 2, 3]), numpy.array([5, 6, 7, 8]),
+                  numpy.array([0.5, 0.6, 0.7, 0.8]))
+        buff.push(2, numpy.array([9]), numpy.array([0.9]))
+        self.assertEqual(len(buff), 5)
+        popped = [buff.pop() for _ in range(4)]
+        self.assertEqual(list(popped[0][0]), [6])
+        self.assertEqual(list(popped[1][0]), [])
+        self.assertEqual(list(popped[2][0]), [5, 7, 9])
+        self.assertEqual(list(popped[2][1]), [0.5, 0.7, 0.9])
+        self.assertEqual(list(popped[3][0]), [8])
+        self.assertEqual(len(buff), 0)
+        # Wraps around the end of the buffer
+        buff.push(3, numpy.array([1]), None)
+        for _ in range(3):
+            self.assertEqual(len(buff.pop()[0]), 0)
+        self.assertEqual(list(buff.pop()[0]), [1])
+
+
+class EventDelivery_test(unittest.TestCase):
+
+    def test_csr(self):
+        delivery = EventDelivery(event_connection_group(1.5 * un.ms),
+                                 0.1 * un.ms)
+        self.assertEqual(list(delivery.indptr), [0, 2, 4, 6])
+        self.assertEqual(list(delivery.destinations), [0, 1, 2, 3, 4, 5])
+        self.assertEqual(delivery.delays, 15)
+        self.assertEqual(list(delivery.connection_indices([2, 0, 2])),
+                         [4, 5, 0, 1, 4, 5])
+
+    def test_delayed_delivery(self):
+        group = event_connection_group(
+            ArrayValue([1.0, 1.0, 2.0, 2.0, 1.0, 3.0]) * un.ms)
+        delivery = EventDelivery(group, 0.5 * un.ms,
+                                 weights=numpy.arange(1, 7) * 1e-9,
+                                 weight_port='q')
+        simulator = DynamicsSimulator(alpha_properties, group.destination.size,
+                                      0.5 * un.ms)
+        delivery.send([0, 2])
+        delivery.send([1, 2])
+        self.assertEqual(delivery.num_pending, 8)
+        expected = [[], [], [0, 1, 4, 4], [], [2, 3], [], [5, 5]]
+        for step, destinations in enumerate(expected):
+            received = numpy.zeros(6)
+            numpy.add.at(received, destinations, 1)
+            before = simulator.state('B').copy()
+            delivery.deliver(simulator)
+            # Each event increments B by the weight of its connection
+            self.assertTrue(numpy.allclose(
+                simulator.state('B') - before,
+                received * numpy.arange(1, 7) * 1e-9), "step {}".format(step))
+            simulator.step()
+        self.assertEqual(delivery.num_pending, 0)
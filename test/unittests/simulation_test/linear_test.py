@@ -0,0 +1,163 @@
+from __future__ import division
+import gc
+import unittest
+import numpy
+from nineml.abstraction import (
+    Dynamics, Regime, On, OutputEvent, StateVariable, StateAssignment,
+    Parameter, AnalogReceivePort, AnalogReducePort, AnalogSendPort)
+from nineml.user import DynamicsProperties, Property, Initial
+from nineml.exceptions import NineMLUsageError
+from nineml.simulation import LinearDynamicsIntegrator
+from nineml.simulation.linear import matrix_exponential
+from nineml.simulation.utils import SI_value
+from nineml.values import ArrayValue
+import nineml.simulation.linear
+from nineml import units as un
+
+
+alpha = Dynamics(
+    name="Alpha",
+    aliases=["Isyn := A"],
+    regimes=[
+        Regime(
+            name="default",
+            time_derivatives=["dA/dt = (B - A)/tau", "dB/dt = -B/tau"],
+            transitions=On('spike', do=["B = B + q"]))],
+    state_variables=[StateVariable('A', dimension=un.current),
+                     StateVariable('B', dimension=un.current)],
+    analog_ports=[AnalogSendPort("Isyn", dimension=un.current),
+                  AnalogReceivePort("q", dimension=un.current)],
+    parameters=[Parameter('tau', dimension=un.time)])
+
+liaf = Dynamics(
+    name='LeakyIntegrateAndFire',
+    regimes=[
+        Regime('dv/dt = (i_synaptic*R - v)/tau',
+               transitions=[On('v > v_threshold',
+                               do=[OutputEvent('spike_output'),
+                                   StateAssignment('refractory_end',
+                                                   't + refractory_period'),
+                                   StateAssignment('v', 'v_reset')],
+                               to='refractory')],
+               name='subthreshold'),
+        Regime(transitions=[On('t > refractory_end', to='subthreshold')],
+               name='refractory')],
+    state_variables=[StateVariable('v', dimension=un.voltage),
+                     StateVariable('refractory_end', dimension=un.time)],
+    parameters=[Parameter('R', un.resistance),
+                Parameter('refractory_period', un.time),
+                Parameter('v_reset', un.voltage),
+                Parameter('v_threshold', un.voltage),
+                Parameter('tau', un.time)],
+    analog_ports=[AnalogReducePort('i_synaptic', un.current, operator='+'),
+                  AnalogSendPort('v', un.voltage)])
+
+liaf_properties = DynamicsProperties(
+    name='SampleLeakyIntegrateAndFire',
+    definition=liaf,
+    properties=[Property('tau', 20.0 * un.ms),
+                Property('v_threshold', 20.0 * un.mV),
+                Property('refractory_period', 2.0 * un.ms),
+                Property('v_reset', 10.0 * un.mV),
+                Property('R', 1.5 * un.Mohm)],
+    initial_values=[Initial('v', 0.0 * un.mV),
+                    Initial('refractory_end', 0.0 * un.ms)])
+
+
+class LinearDynamicsIntegrator_test(unittest.TestCase):
+
+    def test_alpha(self):
+        tau = 0.02
+        props = DynamicsProperties(
+            name='SampleAlpha', definition=alpha,
+            properties=[Property('tau', 20.0 * un.ms)],
+            initial_values=[Initial('A', 0.0 * un.nA),
+                            Initial('B', 1.0 * un.nA)])
+        integrator = LinearDynamicsIntegrator(props)
+        self.assertEqual(integrator.state_variable_names, ('A', 'B'))
+        states = integrator.initial_states(3)
+        states[:, 1] *= numpy.arange(1, 4)
+        b0 = states[:, 1].copy()
+        dt = 0.1 * un.ms
+        for _ in range(100):
+            states = integrator.step(states, numpy.zeros((3, 1)), dt)
+        t = 0.01
+        # Analytical solution of alpha function with A(0) = 0
+        self.assertTrue(numpy.allclose(states[:, 1], b0 * numpy.exp(-t / tau)))
+        self.assertTrue(numpy.allclose(states[:, 0],
+                                       b0 * t / tau * numpy.exp(-t / tau)))
+
+    def test_liaf_subthreshold(self):
+        integrator = LinearDynamicsIntegrator(liaf_properties,
+                                              regime_name='subthreshold')
+        self.assertEqual(integrator.state_variable_names,
+                         ('refractory_end', 'v'))
+        self.assertEqual(integrator.input_names, ('i_synaptic',))
+        states = integrator.initial_states(2)
+        inputs = numpy.array([[0.0], [1e-8]])  # 10 nA
+        for _ in range(10):
+            states = integrator.step(states, inputs, 0.001)
+        v_inf = 1e-8 * 1.5e6
+        self.assertTrue(numpy.allclose(
+            states[:, 1], [0.0, v_inf * (1 - numpy.exp(-0.01 / 0.02))]))
+        # States without time derivatives are held constant
+        self.assertTrue(numpy.all(states[:, 0] == 0.0))
+        # The propagator is cached for the time step
+        self.assertIs(integrator.propagator(0.001)[0],
+                      integrator.propagator(1.0 * un.ms)[0])
+
+    def test_default_regime(self):
+        self.assertEqual(
+            LinearDynamicsIntegrator(liaf_properties).regime_name,
+            'subthreshold')
+
+    def test_nonlinear(self):
+        nonlinear = Dynamics(
+            name='NonLinear',
+            state_variables=[StateVariable('v', dimension=un.voltage)],
+            regimes=[Regime('dv/dt = v * v / (P1 * P2)', name='R1')],
+            parameters=[Parameter('P1', dimension=un.voltage),
+                        Parameter('P2', dimension=un.time)])
+        props = DynamicsProperties(
+            name='NonLinearProps', definition=nonlinear,
+            properties=[Property('P1', 1.0 * un.mV),
+                        Property('P2', 1.0 * un.ms)])
+        # The dynamics are rejected when the integrator is created
+        self.assertRaises(NineMLUsageError, LinearDynamicsIntegrator, props)
+
+    def test_cache_releases_classes(self):
+        linear_systems = nineml.simulation.linear.linear_systems
+        linear_systems.clear()
+        props = DynamicsProperties(
+            name='SampleAlpha', definition=alpha.clone(),
+            properties=[Property('tau', 20.0 * un.ms)],
+            initial_values=[Initial('A', 0.0 * un.nA),
+                            Initial('B', 1.0 * un.nA)])
+        integrator = LinearDynamicsIntegrator(props)
+        integrator.step(integrator.initial_states(1), numpy.zeros((1, 1)),
+                        0.001)
+        self.assertEqual(len(linear_systems), 1)
+        del props, integrator
+        gc.collect()
+        self.assertEqual(len(linear_systems), 0)
+
+    def test_offset_units(self):
+        self.assertAlmostEqual(SI_value(un.Quantity(25.0, un.degC)), 298.15)
+        values = SI_value(un.Quantity(ArrayValue([0.0, 10.0]), un.degC))
+        self.assertTrue(numpy.allclose(values, [273.15, 283.15]))
+        self.assertAlmostEqual(SI_value(un.Quantity(25.0, un.K)), 25.0)
+
+    def test_matrix_exponential_fallback(self):
+        matrix = numpy.array([[-2.0, 1.0, 0.5], [0.0, -50.0, 3.0],
+                              [0.0, 0.0, 0.0]])
+        # Compare against the eigen-decomposition of a diagonalisable matrix
+        vals, vecs = numpy.linalg.eig(matrix)
+        reference = vecs.dot(numpy.diag(numpy.exp(vals))).dot(
+            numpy.linalg.inv(vecs))
+        expm = nineml.simulation.linear.expm
+        nineml.simulation.linear.expm = None
+        try:
+            self.assertTrue(numpy.allclose(matrix_exponential(matrix),
+                                           reference))
+        finally:
+            nineml.simulation.linear.expm = expm
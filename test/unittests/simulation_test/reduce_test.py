@@ -0,0 +1,85 @@
+from __future__ import division
+import unittest
+import numpy
+from nineml.abstraction import ConnectionRule
+from nineml.abstraction.connectionrule import explicit_connection_rule
+from nineml.user import (
+    Population, Projection, ConnectionRuleProperties, Network,
+    AnalogConnectionGroup)
+from nineml.simulation import (
+    DynamicsSimulator, AnalogReduction, compile_analog_reductions)
+from nineml.exceptions import NineMLUsageError
+from nineml import units as un
+from .linear_test import liaf_properties
+from .events_test import alpha_properties
+
+
+all_to_all = ConnectionRuleProperties(
+    'AllToAll', ConnectionRule(
+        'AllToAllClass', standard_library=(
+            "http://nineml.net/9ML/1.0/connectionrules/AllToAll")), {})
+
+
+class AnalogReduction_test(unittest.TestCase):
+
+    def setUp(self):
+        # Recurrent projections within a single population
+        self.pop = Population('Pop', 3, liaf_properties)
+        explicit = ConnectionRuleProperties(
+            'Explicit', explicit_connection_rule,
+            {'sourceIndices': [0, 2, 2, 1], 'destinationIndices': [1, 0, 1, 2]})
+        port_connections = [('pre', 'spike_output', 'response', 'spike'),
+                            ('response', 'Isyn', 'post', 'i_synaptic')]
+        self.projections = [
+            Projection('ProjA', self.pop, self.pop,
+                       response=alpha_properties, delay=1.0 * un.ms,
+                       connection_rule_properties=all_to_all,
+                       port_connections=port_connections),
+            Projection('ProjB', self.pop, self.pop,
+                       response=alpha_properties, delay=1.0 * un.ms,
+                       connection_rule_properties=explicit,
+                       port_connections=port_connections)]
+        network = Network('Net', populations=[self.pop],
+                          projections=self.projections)
+        self.component_arrays, self.connection_groups = network.flatten()
+
+    def test_compile(self):
+        reductions = compile_analog_reductions(self.connection_groups)
+        self.assertEqual(len(reductions), 1)
+        reduction = reductions[0]
+        self.assertEqual(reduction.destination.name, 'Pop__cell')
+        self.assertEqual(reduction.destination_port, 'i_synaptic')
+        self.assertEqual(reduction.shape, (3, 13))
+        self.assertEqual(list(reduction.offsets), [0, 9, 13])
+        # Each synapse of the projections connects to its post-synaptic cell
+        values = [numpy.arange(9), numpy.array([10.0, 20.0, 30.0, 40.0])]
+        expected = numpy.zeros(3)
+        for group, vals in zip(reduction.connection_groups, values):
+            for src, dest in group.connections:
+                expected[int(dest)] += vals[int(src)]
+        self.assertTrue(numpy.allclose(reduction.reduce(values), expected))
+        self.assertRaises(NineMLUsageError, reduction.reduce, values[:1])
+
+    def test_update(self):
+        reduction = compile_analog_reductions(self.connection_groups)[0]
+        dt = 0.1 * un.ms
+        simulators = dict(
+            (ca.name, DynamicsSimulator(ca.dynamics_properties, ca.size, dt))
+            for ca in self.component_arrays)
+        for ca in self.component_arrays:
+            if ca.name != 'Pop__cell':
+                simulators[ca.name].states[:] = numpy.arange(ca.size) * 1e-9
+        reduction.update(simulators)
+        expected = reduction.reduce(
+            [numpy.arange(9) * 1e-9, numpy.arange(4) * 1e-9])
+        post = simulators['Pop__cell']
+        self.assertTrue(numpy.allclose(
+            post._inputs[post._input_index('i_synaptic')], expected))
+
+    def test_invalid_groups(self):
+        groups = [cg for cg in self.connection_groups
+                  if isinstance(cg, AnalogConnectionGroup)]
+        self.assertRaises(NineMLUsageError, AnalogReduction, [])
+        event_groups = [cg for cg in self.connection_groups
+                        if cg not in groups]
+        self.assertRaises(NineMLUsageError, AnalogReduction, event_groups)
@@ -34,6 +34,18 @@ class TestUnitsDimensions(unittest.TestCase):
                 self.assertEqual(getattr(dim, abbrev), dim._dims[i])
                 self.assertEqual(getattr(dim, name), dim._dims[i])
 
+    def test_sympy_caches_bounded(self):
+        orig_size = un.DIMENSION_CACHE_SIZE
+        un.DIMENSION_CACHE_SIZE = 5
+        try:
+            for i in range(1, 20):
+                dim = un.Dimension('test{}'.format(i), m=i, t=-i)
+                self.assertEqual(un.Dimension.from_sympy(sympify(dim)), dim)
+                self.assertLessEqual(len(un.Dimension._sympy_cache), 5)
+                self.assertLessEqual(len(un.Dimension._from_sympy_cache), 5)
+        finally:
+            un.DIMENSION_CACHE_SIZE = orig_size
+
 # FIXME: Currently the 'scale' attribute isn't supported, need to work out
 #        whether we want to do this or not.
 units_xml_str = """<?xml version="1.0" encoding="UTF-8"?>
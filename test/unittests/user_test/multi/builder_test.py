@@ -0,0 +1,90 @@
+import unittest
+from nineml import units as un
+from nineml.user.multi import MultiDynamics, MultiDynamicsBuilder
+from nineml.abstraction import (
+    Dynamics, Regime, AnalogReceivePort, AnalogReducePort, AnalogSendPort,
+    On, OutputEvent, StateAssignment, Parameter, StateVariable)
+from nineml.exceptions import NineMLUsageError, NineMLNameError
+
+
+class MultiDynamicsBuilder_test(unittest.TestCase):
+
+    def setUp(self):
+        self.cell = Dynamics(
+            name='Cell',
+            regimes=[
+                Regime('dv/dt = (i_ext + i_syn - v / R) / C',
+                       transitions=[On('v > v_thresh',
+                                       do=[OutputEvent('spike'),
+                                           StateAssignment('v', 'v_reset')])],
+                       name='default')],
+            analog_ports=[AnalogReceivePort('i_ext', dimension=un.current),
+                          AnalogReducePort('i_syn', dimension=un.current,
+                                           operator='+'),
+                          AnalogSendPort('v', dimension=un.voltage)],
+            parameters=[Parameter('R', dimension=un.resistance),
+                        Parameter('C', dimension=un.capacitance),
+                        Parameter('v_reset', dimension=un.voltage),
+                        Parameter('v_thresh', dimension=un.voltage)],
+            state_variables=[StateVariable('v', dimension=un.voltage)])
+        self.synapse = Dynamics(
+            name='Synapse',
+            regimes=[
+                Regime('dg/dt = -g / tau',
+                       transitions=[On('spike', do=['g = g + weight'])],
+                       name='default')],
+            aliases=['i := g * (e_rev - v)'],
+            analog_ports=[AnalogReceivePort('v', dimension=un.voltage),
+                          AnalogSendPort('i', dimension=un.current)],
+            parameters=[Parameter('tau', dimension=un.time),
+                        Parameter('e_rev', dimension=un.voltage),
+                        Parameter('weight', dimension=un.conductance)],
+            state_variables=[StateVariable('g', dimension=un.conductance)])
+
+    def _builder(self, num_synapses):
+        builder = MultiDynamicsBuilder('CellWithSynapses')
+        builder.add_sub_component('cell', self.cell)
+        builder.expose(('cell', 'i_ext'))
+        for i in range(num_synapses):
+            name = 'syn{}'.format(i)
+            builder.add_sub_component(name, self.synapse.clone())
+            builder.connect(('cell', 'v', name, 'v'))
+            builder.connect((name, 'i', 'cell', 'i_syn'))
+            builder.expose((name, 'spike'))
+        return builder
+
+    def test_build(self):
+        builder = self._builder(3)
+        multi = builder.build()
+        self.assertIsInstance(multi, MultiDynamics)
+        self.assertEqual(multi.num_sub_components, 4)
+        self.assertEqual(multi.num_analog_port_connections, 6)
+        # The built object is equivalent to the validated one
+        validated = builder.build(validate=True)
+        self.assertEqual(multi, validated)
+        self.assertEqual(multi.flatten(), validated.flatten())
+        # Adding another synapse doesn't modify previously built objects
+        builder.add_sub_component('syn3', self.synapse)
+        builder.connect(('cell', 'v', 'syn3', 'v'))
+        builder.connect(('syn3', 'i', 'cell', 'i_syn'))
+        builder.expose(('syn3', 'spike'))
+        self.assertEqual(builder.build().num_sub_components, 5)
+        self.assertEqual(multi.num_sub_components, 4)
+        self.assertEqual(multi.num_analog_port_connections, 6)
+
+    def test_incremental_errors(self):
+        builder = self._builder(1)
+        self.assertRaises(NineMLUsageError, builder.add_sub_component,
+                          'syn0', self.synapse)
+        # Analog receive port is already connected
+        self.assertRaises(NineMLUsageError, builder.connect,
+                          ('syn0', 'i', 'cell', 'i_ext'))
+        self.assertRaises(NineMLUsageError, builder.expose, ('syn0', 'v'))
+        self.assertRaises(NineMLNameError, builder.connect,
+                          ('cell', 'v', 'syn0', 'missing'))
+        builder.add_sub_component('syn1', self.synapse)
+        self.assertEqual(list(builder.unconnected_analog_receive_ports),
+                         [('syn1', 'v')])
+        self.assertRaises(NineMLUsageError, builder.build)
+        builder.connect(('cell', 'v', 'syn1', 'v'))
+        self.assertEqual(builder.build().num_sub_components, 3)
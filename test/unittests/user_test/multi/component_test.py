@@ -5,11 +5,13 @@ import sympy
 from nineml import units as un, Document
 from nineml.serialization.xml import XMLUnserializer
 from nineml.user.multi.dynamics import (
-    MultiDynamicsProperties, MultiDynamics)
+    MultiDynamicsProperties, MultiDynamics, SubDynamics)
 from nineml.abstraction import (
     Dynamics, Regime, AnalogReceivePort, AnalogReducePort, OutputEvent,
-    AnalogSendPort, On, StateAssignment, Constant)
+    AnalogSendPort, On, StateAssignment, Constant, EventReceivePort,
+    Parameter, StateVariable)
 from nineml.user.dynamics import DynamicsProperties
+from nineml.exceptions import NineMLUsageError, NineMLNameError
 from nineml.user.multi.port_exposures import _ReceivePortExposureAlias
 from nineml.user.multi.port_connections import (
     _LocalAnalogReceivePortConnection, _LocalAnalogReducePortConnections)
@@ -268,3 +270,193 @@ class MultiDynamicsFlattening_test(unittest.TestCase):
                      in test_multi.constants,
                      "Zero-valued constant wasn't inserted for unused reduce "
                      "port")
+
+
+class GatedMultiDynamicsTestCase(unittest.TestCase):
+    """
+    Fixtures shared by the tests of a cell with multiple gates that switch
+    on its spikes
+    """
+
+    def setUp(self):
+        self.cell = Dynamics(
+            name='Cell',
+            regimes=[
+                Regime('dv/dt = (i - v)/tau',
+                       transitions=[On('v > v_thresh',
+                                       do=[OutputEvent('spike'),
+                                           StateAssignment('v', 'v_reset')],
+                                       to='refractory')],
+                       name='subthreshold'),
+                Regime(transitions=[On('v < v_thresh', to='subthreshold')],
+                       name='refractory')],
+            analog_ports=[AnalogReceivePort('i', dimension=un.voltage)],
+            parameters=[Parameter('tau', dimension=un.time),
+                        Parameter('v_reset', dimension=un.voltage),
+                        Parameter('v_thresh', dimension=un.voltage)],
+            state_variables=[StateVariable('v', dimension=un.voltage)])
+        # A gate that toggles between open and closed on each spike
+        self.gate = Dynamics(
+            name='Gate',
+            regimes=[
+                Regime('dg/dt = -g/tau',
+                       transitions=[On('spike', to='open')], name='closed'),
+                Regime('dg/dt = (1 - g)/tau',
+                       transitions=[On('spike', to='closed')], name='open')],
+            event_ports=[EventReceivePort('spike')],
+            parameters=[Parameter('tau', dimension=un.time)],
+            state_variables=[StateVariable('g', dimension=un.dimensionless)])
+
+    def _multi(self, num_gates, **kwargs):
+        gate_names = ['gate{}'.format(i) for i in range(num_gates)]
+        sub_components = dict((n, self.gate) for n in gate_names)
+        sub_components['cell'] = self.cell
+        return MultiDynamics(
+            name='Gated', sub_components=sub_components,
+            port_exposures=[('cell', 'i', 'i')],
+            port_connections=[('cell', 'spike', n, 'spike')
+                              for n in gate_names], **kwargs)
+
+
+class MultiDynamicsReachableRegimes_test(GatedMultiDynamicsTestCase):
+
+    def test_reachable_regimes(self):
+        multi = self._multi(3, prune_unreachable_regimes=True)
+        # The gates all switch on the same events so they are always in the
+        # same regime as each other
+        self.assertEqual(set(multi.regime_names), set([
+            'subthreshold___closed___closed___closed',
+            'refractory___open___open___open',
+            'subthreshold___open___open___open',
+            'refractory___closed___closed___closed']))
+        self.assertEqual(
+            set(r.name for r in multi.reachable_regimes(
+                {'gate1': 'open'})),
+            set(['subthreshold___closed___open___closed',
+                 'refractory___open___closed___open',
+                 'subthreshold___open___closed___open',
+                 'refractory___closed___open___closed']))
+
+    def test_prune_unreachable_regimes(self):
+        # The full product of sub-regimes contains islands that aren't
+        # connected to the initial regime
+        self.assertRaises(NineMLUsageError, self._multi, 3)
+        multi = self._multi(
+            3, initial_regime='subthreshold___closed___closed___open',
+            prune_unreachable_regimes=True)
+        self.assertEqual(multi.num_regimes, 4)
+        self.assertIn('refractory___open___open___closed',
+                      list(multi.regime_names))
+        flat = multi.flatten()
+        self.assertEqual(set(flat.regime_names), set(multi.regime_names))
+        self.assertEqual(set(multi.clone().regime_names),
+                         set(multi.regime_names))
+
+
+class MultiDynamicsFlatMembersCache_test(GatedMultiDynamicsTestCase):
+
+    def test_flat_members_cache(self):
+        multi = self._multi(2, prune_unreachable_regimes=True)
+        alias_names = set(multi.alias_names)
+        self.assertIs(multi.state_variable('g__gate0'),
+                      multi.state_variable('g__gate0'))
+        self.assertIs(next(multi.regimes),
+                      multi.regime(next(multi.regimes).name))
+        self.assertRaises(NineMLNameError, multi.state_variable, 'g__gate2')
+        # Adding a sub-component invalidates the cached members
+        multi.add(SubDynamics('gate2', self.gate))
+        self.assertEqual(multi.state_variable('g__gate2').name, 'g__gate2')
+        self.assertEqual(set(multi.alias_names), alias_names)
+        self.assertEqual(multi.num_state_variables, 4)
+
+
+class SubDynamicsInterning_test(GatedMultiDynamicsTestCase):
+
+    def test_interned_namespace_members(self):
+        sub_component = SubDynamics('gate0', self.gate)
+        self.assertIs(sub_component.state_variable('g__gate0'),
+                      next(sub_component.state_variables))
+        regime = sub_component.regime('open__gate0')
+        self.assertIs(regime, sub_component.regime('open__gate0'))
+        # The namespaced expressions are only substituted once
+        td = next(regime.time_derivatives)
+        self.assertIs(td.rhs, next(regime.time_derivatives).rhs)
+        self.assertEqual(
+            set(str(s) for s in td.rhs.free_symbols),
+            set(sub_component.append_namespace(str(s))
+                for s in td._object.rhs.free_symbols))
+
+
+class MultiDynamicsSharedClassPorts_test(unittest.TestCase):
+    """
+    Tests port connections and exposures of sub-components that share the
+    same Dynamics class, and therefore the same port objects
+    """
+
+    def setUp(self):
+        self.cell = Dynamics(
+            name='Cell',
+            regimes=[Regime('dv/dt = (i_syn - v / R) / C', name='default')],
+            analog_ports=[AnalogReducePort('i_syn', dimension=un.current,
+                                           operator='+'),
+                          AnalogSendPort('v', dimension=un.voltage)],
+            parameters=[Parameter('R', dimension=un.resistance),
+                        Parameter('C', dimension=un.capacitance)],
+            state_variables=[StateVariable('v', dimension=un.voltage)])
+        self.synapse = Dynamics(
+            name='Synapse',
+            regimes=[
+                Regime('dg/dt = -g / tau + g_in',
+                       transitions=[On('g > g_max',
+                                       do=[OutputEvent('saturated')])],
+                       name='default')],
+            aliases=['i := g * (e_rev - v)'],
+            analog_ports=[AnalogReceivePort('v', dimension=un.voltage),
+                          AnalogReducePort('g_in', operator='+',
+                                           dimension=(un.conductance /
+                                                      un.time)),
+                          AnalogSendPort('i', dimension=un.current)],
+            parameters=[Parameter('tau', dimension=un.time),
+                        Parameter('e_rev', dimension=un.voltage),
+                        Parameter('g_max', dimension=un.conductance)],
+            state_variables=[StateVariable('g', dimension=un.conductance)])
+    def _multi(self, connect_v=True, expose_g_in=('syn0',)):
+        port_connections = [('syn0', 'i', 'cell', 'i_syn'),
+                            ('syn1', 'i', 'cell', 'i_syn')]
+        port_exposures = [('syn0', 'saturated', 'saturated')]
+        port_exposures.extend((n, 'g_in', 'g_in_' + n) for n in expose_g_in)
+        for name in ('syn0', 'syn1'):
+            if connect_v:
+                port_connections.append(('cell', 'v', name, 'v'))
+            else:
+                port_exposures.append((name, 'v', 'v_' + name))
+        return MultiDynamics(
+            name='CellWithSynapses',
+            sub_components={'cell': self.cell, 'syn0': self.synapse,
+                            'syn1': self.synapse},
+            port_connections=port_connections, port_exposures=port_exposures)
+
+    def test_connected_receive_ports(self):
+        # Each receive port gets its own alias even though the sub-components
+        # share the same port objects
+        multi = self._multi()
+        self.assertIn('v__syn0', multi.alias_names)
+        self.assertIn('v__syn1', multi.alias_names)
+        self.assertEqual(multi.alias('v__syn1').rhs, sympy.Symbol('v__cell'))
+
+    def test_unconnected_reduce_ports(self):
+        # Only the reduce port of the sub-component that isn't exposed is
+        # replaced by a zero-valued constant
+        multi = self._multi(connect_v=False)
+        self.assertEqual(list(multi.constant_names), ['g_in__syn1'])
+
+    def test_exposed_output_events(self):
+        # The exposed event is only emitted by syn0's transitions
+        multi = self._multi(connect_v=False, expose_g_in=('syn0', 'syn1'))
+        for regime in multi.regimes:
+            for trans in regime.on_conditions:
+                self.assertEqual(
+                    list(trans.output_event_port_names),
+                    ['saturated'] if 'g__syn0' in str(trans.trigger.rhs)
+                    else [])
+        self.assertEqual(multi.flatten().num_constants, 0)
@@ -1,8 +1,11 @@
 import unittest
 import collections
+from nineml.exceptions import NineMLNameError
 from nineml.user.multi.namespace import (
     append_namespace, split_namespace, make_delay_trigger_name, 
-    split_delay_trigger_name, make_regime_name, split_multi_regime_name)
+    split_delay_trigger_name, make_regime_name, split_multi_regime_name,
+    clear_namespace_caches, NAMESPACE_CACHE_SIZE)
+from nineml.user.multi import namespace
 
 
 DummyRegime = collections.namedtuple('DummyNamespaceRegime',
@@ -47,6 +50,24 @@ class TestConcatenationFunctions(unittest.TestCase):
         self.assertEqual(split_namespace(append_namespace('a__x', 'b____x')),
                           ('a__x', 'b____x'))
 
+    def test_split_namespace_memoized(self):
+        name = append_namespace('a___x', 'b__x___y')
+        self.assertEqual(split_namespace(name), ('a___x', 'b__x___y'))
+        self.assertIs(split_namespace(name), split_namespace(name))
+        self.assertRaises(NineMLNameError, split_namespace, 'a___x')
+        self.assertRaises(NineMLNameError, split_namespace, 'a_x')
+
+    def test_memo_tables_bounded(self):
+        clear_namespace_caches()
+        for i in range(NAMESPACE_CACHE_SIZE + 10):
+            split_namespace(append_namespace('a', 'b__{}'.format(i)))
+        self.assertLessEqual(len(namespace._escaped_names),
+                             NAMESPACE_CACHE_SIZE)
+        self.assertLessEqual(len(namespace._split_identifiers),
+                             NAMESPACE_CACHE_SIZE)
+        clear_namespace_caches()
+        self.assertFalse(namespace._split_identifiers)
+
     def test_make_regime_name(self):
         self.assertEqual(make_regime_name(
             {'a': DummyRegime('R1'), 'b': DummyRegime('R2')}),
@@ -24,7 +24,8 @@ from nineml.user import (
     Network, Selection, Concatenate)
 from nineml.values import RandomDistributionValue
 import nineml.units as un
-from nineml.exceptions import NineMLRandomDistributionDelayException
+from nineml.exceptions import (
+    NineMLRandomDistributionDelayException, NineMLDimensionError)
 
 
 src_dir = os.path.dirname(__file__)
@@ -319,6 +320,26 @@ class TestNetwork(unittest.TestCase):
             NineMLRandomDistributionDelayException,
             rand_distr_network.delay_limits)
 
+    def test_flatten_checks_port_connections(self):
+        pop1 = Population("Pop1", 3, self.celltype)
+        pop2 = Population("Pop2", 3, self.celltype)
+        psr = self.psr.clone()
+        projection = Projection(
+            "Proj", pre=pop1, post=pop2, response=psr,
+            plasticity=self.static_ext,
+            connection_rule_properties=self.one_to_one, delay=self.delay,
+            port_connections=[('response', 'Isyn', 'post', 'Isyn'),
+                              ('plasticity', 'weight', 'response', 'weight')])
+        network = Network('flat_net', populations=[pop1, pop2],
+                          projections=[projection])
+        _, connection_groups = network.flatten()
+        self.assertEqual(len(connection_groups), 2)
+        # Port connections are checked against the current classes
+        psr_class = psr.component_class
+        psr_class.remove(psr_class.analog_send_port('Isyn'))
+        psr_class.add(AnalogSendPort(name='Isyn', dimension=un.voltage))
+        self.assertRaises(NineMLDimensionError, network.flatten)
+
     def test_components(self):
         names = set(c.name for c in self.model.all_components())
         self.assertEqual(
@@ -1,3 +1,4 @@
+import gc
 import os.path
 import unittest
 from nineml import Document
@@ -9,6 +10,9 @@ from nineml.abstraction.ports import (
     EventSendPort, EventReceivePort, AnalogSendPort, AnalogReceivePort,
     AnalogReducePort)
 from nineml.user.multi.port_exposures import AnalogReducePortExposure
+from nineml.user.multi import SubDynamics
+from nineml.abstraction import Dynamics, Regime, Parameter, StateVariable
+from nineml.exceptions import NineMLDimensionError
 
 
 examples_dir = os.path.join(os.path.dirname(__file__), '..', '..', '..',
@@ -115,3 +119,51 @@ class TestPortConnection(unittest.TestCase):
         self.assertEqual(apc_receive_exp.sub_component_name, 'post_cell')
         self.assertEqual(apc_receive_exp.port_name, 'ARP1')
 
+    def test_resolution_cache(self):
+        sender = Dynamics(
+            name='Sender', aliases=['V := SV1 * P1'],
+            regimes=[Regime('dSV1/dt = -SV1 / P2', name='R1')],
+            analog_ports=[AnalogSendPort('V', dimension=un.voltage)],
+            parameters=[Parameter('P1', dimension=un.voltage),
+                        Parameter('P2', dimension=un.time)],
+            state_variables=[StateVariable('SV1',
+                                           dimension=un.dimensionless)])
+        receiver = Dynamics(
+            name='Receiver',
+            regimes=[Regime('dSV1/dt = ARP1 / P1', name='R1')],
+            analog_ports=[AnalogReceivePort('ARP1', dimension=un.voltage)],
+            parameters=[Parameter('P1', dimension=un.voltage * un.time)],
+            state_variables=[StateVariable('SV1',
+                                           dimension=un.dimensionless)])
+        container = {'a': SubDynamics('a', sender),
+                     'b': SubDynamics('b', receiver),
+                     'c': SubDynamics('c', receiver)}
+        cache = AnalogPortConnection.resolution_cache
+        cache.clear()
+        pc1 = AnalogPortConnection('V', 'ARP1', sender_name='a',
+                                   receiver_name='b')
+        pc1.bind(container)
+        # A connection between the same ports of the same classes reuses the
+        # resolved ports without checking them again
+        pc2 = AnalogPortConnection('V', 'ARP1', sender_name='a',
+                                   receiver_name='c')
+        pc2._check_ports = None
+        pc2.bind(container)
+        self.assertIs(pc2.send_port, pc1.send_port)
+        self.assertIs(pc2.receive_port, pc1.receive_port)
+        # The cached ports are not used if the port has been replaced
+        receiver.remove(receiver.analog_receive_port('ARP1'))
+        receiver.add(AnalogReceivePort('ARP1', dimension=un.current))
+        pc3 = AnalogPortConnection('V', 'ARP1', sender_name='a',
+                                   receiver_name='b')
+        self.assertRaises(NineMLDimensionError, pc3.bind, container)
+        # The verdict is cached along with the ports
+        pc4 = AnalogPortConnection('V', 'ARP1', sender_name='a',
+                                   receiver_name='c')
+        pc4._check_ports = None
+        self.assertRaises(NineMLDimensionError, pc4.bind, container)
+        # Entries are dropped when their classes are garbage collected
+        self.assertEqual(len(cache), 1)
+        del container, receiver, pc1, pc2, pc3, pc4
+        gc.collect()
+        self.assertEqual(len(cache), 0)
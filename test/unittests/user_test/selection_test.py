@@ -0,0 +1,113 @@
+import unittest
+import numpy
+from nineml.abstraction import Dynamics, Regime, Parameter, StateVariable
+from nineml.user import (
+    DynamicsProperties, Property, Initial, Population, Selection,
+    Concatenate)
+from nineml.user.selection import Item
+from nineml.values import ArrayValue
+from nineml.exceptions import NineMLUsageError
+from nineml import units as un
+
+
+class Selection_test(unittest.TestCase):
+
+    def _decay(self, name='Decay'):
+        return Dynamics(
+            name=name,
+            regimes=[Regime('dx/dt = -x / tau', name='default')],
+            parameters=[Parameter('tau', dimension=un.time)],
+            state_variables=[StateVariable('x', dimension=un.dimensionless)])
+
+    def setUp(self):
+        props = DynamicsProperties(
+            name='DecayProps', definition=self._decay(),
+            properties=[Property('tau', 10.0 * un.ms)],
+            initial_values=[Initial('x', 0.0 * un.unitless)])
+        self.pops = [Population('P{}'.format(i), size, props)
+                     for i, size in enumerate((3, 0, 5, 2))]
+        self.selection = Selection('All', Concatenate(self.pops))
+
+    def test_offsets(self):
+        self.assertEqual(list(self.selection.offsets), [0, 3, 3, 8, 10])
+        self.assertEqual(self.selection.size, 10)
+        # The offsets are cached until items are added or removed
+        concat = self.selection.operation
+        self.assertIs(self.selection.offsets, concat.offsets)
+        concat.add(Item(4, Population('P4', 4, self.pops[0].cell)))
+        self.assertEqual(list(self.selection.offsets), [0, 3, 3, 8, 10, 14])
+        concat.remove(concat.item('4'))
+        self.assertEqual(list(self.selection.offsets), [0, 3, 3, 8, 10])
+        # Items are concatenated in the order of their indices
+        concat = Concatenate([Item(1, self.pops[0]), Item(0, self.pops[2])])
+        self.assertEqual(list(concat.offsets), [0, 5, 8])
+
+    def test_index_mapping(self):
+        indices = numpy.arange(10)
+        item_indices, local_indices = self.selection.global_to_local(indices)
+        self.assertEqual(list(item_indices), [0, 0, 0, 2, 2, 2, 2, 2, 3, 3])
+        self.assertEqual(list(local_indices), [0, 1, 2, 0, 1, 2, 3, 4, 0, 1])
+        self.assertEqual(
+            list(self.selection.local_to_global(item_indices, local_indices)),
+            list(indices))
+        self.assertEqual(self.selection.global_to_local(8), (3, 0))
+        self.assertEqual(self.selection.local_to_global(2, 4), 7)
+        self.assertRaises(NineMLUsageError, self.selection.global_to_local,
+                          [0, 10])
+        self.assertRaises(NineMLUsageError, self.selection.local_to_global,
+                          [0, 1], [1, 0])
+        self.assertRaises(NineMLUsageError, self.selection.local_to_global,
+                          4, 0)
+
+    def test_component_class_groups(self):
+        # A structurally identical but separately created class
+        other_props = DynamicsProperties(
+            name='OtherProps', definition=self._decay(),
+            properties=[Property('tau', ArrayValue([0.02, 0.03]) * un.s)],
+            initial_values=[Initial('x', 0.0 * un.unitless)])
+        different_props = DynamicsProperties(
+            name='DifferentProps', definition=self._decay('Different'),
+            properties=[Property('tau', 10.0 * un.ms)],
+            initial_values=[Initial('x', 1.0 * un.unitless)])
+        selection = Selection('Mixed', Concatenate(
+            [self.selection, Population('Other', 2, other_props),
+             Population('Different', 4, different_props)]))
+        groups = selection.component_class_groups()
+        self.assertEqual(len(groups), 2)
+        self.assertEqual([p.name for p in groups[0].populations],
+                         ['P0', 'P1', 'P2', 'P3', 'Other'])
+        self.assertEqual(groups[0].size, 12)
+        tau = groups[0].property('tau')
+        self.assertEqual(tau.units, un.ms)
+        self.assertTrue(numpy.allclose(tau.value.values,
+                                       [10.0] * 10 + [20.0, 30.0]))
+        # Values that are the same in all populations aren't expanded
+        self.assertEqual(groups[0].initial_value('x').value.value, 0.0)
+        props = groups[0].dynamics_properties()
+        self.assertEqual(props.component_class, self.pops[0].component_class)
+        self.assertEqual(groups[0].global_to_local(10), (4, 0))
+        self.assertEqual(groups[1].size, 4)
+        self.assertEqual(groups[1].property('tau').value.value, 10.0)
+
+    def test_offset_units(self):
+        dynamics = Dynamics(
+            name='Heat',
+            regimes=[Regime('dx/dt = (T - x) / tau', name='default')],
+            parameters=[Parameter('tau', dimension=un.time),
+                        Parameter('T', dimension=un.temperature)],
+            state_variables=[StateVariable('x', dimension=un.temperature)])
+        pops = []
+        for i, T in enumerate((un.Quantity(25.0, un.degC),
+                               un.Quantity(300.0, un.K),
+                               un.Quantity(ArrayValue([0.0, 100.0]),
+                                           un.degC))):
+            props = DynamicsProperties(
+                name='HeatProps{}'.format(i), definition=dynamics,
+                properties=[Property('tau', 10.0 * un.ms), Property('T', T)],
+                initial_values=[Initial('x', un.Quantity(0.0, un.K))])
+            pops.append(Population('H{}'.format(i), 2, props))
+        group = Selection('Heats', Concatenate(pops)).component_class_groups()
+        T = group[0].property('T')
+        self.assertEqual(T.units, un.degC)
+        self.assertTrue(numpy.allclose(T.value.values,
+                                       [25.0, 25.0, 26.85, 26.85, 0.0, 100.0]))